@@ -0,0 +1,172 @@
+"""
+Measures the throughput of the crawler against a local synthetic server.
+
+Run with ``python benchmarks/bench_crawler.py``, see ``--help`` for the shape
+of the sitemap tree. Use ``--json`` to save the results and compare them
+between changes.
+"""
+
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+from typing import Callable, Dict
+
+from sitemap_server import SyntheticSitemapServer
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.retry_policy import RetryPolicy
+from mr_apollo_2n.utils.website_node_crawler import WebsiteNodeCrawler
+
+
+def peak_rss_mib() -> float:
+    """
+    Returns the peak resident set size of the process, in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def timed(repeat: int, function: Callable[[], object]) -> float:
+    """
+    Returns the best secs of ``repeat`` runs of the function.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def build_crawler(server: SyntheticSitemapServer) -> WebsiteNodeCrawler:
+    crawler = WebsiteNodeCrawler(server.base_url, sleep_time=0)
+    # Keep the injected errors from dominating the timings with backoff
+    crawler.session_request.retry_policy = RetryPolicy(
+        max_tries=5, base_delay=0.01, max_delay=0.1
+    )
+    return crawler
+
+
+def run(args) -> Dict:
+    server = SyntheticSitemapServer(
+        depth=args.depth,
+        fanout=args.fanout,
+        urls_per_sitemap=args.urls,
+        use_gzip=args.gzip,
+        latency=args.latency,
+        error_rate=args.error_rate,
+    )
+    phases: Dict[str, Dict] = {}
+    with server:
+        crawler = build_crawler(server)
+
+        secs = timed(args.repeat, crawler.extract_sitemaps)
+        phases["extract_sitemaps"] = {"secs": secs}
+
+        leaf_url = server.leaf_url()
+        secs = timed(args.repeat, lambda: crawler.fetch_and_parse(leaf_url))
+        phases["fetch_and_parse"] = {
+            "secs": secs,
+            "urls_per_sec": args.urls / secs,
+        }
+
+        root_url = f"{server.base_url}/sitemap.xml"
+        nodes = []
+
+        def process_sitemap():
+            nodes[:] = build_crawler(server).process_sitemap(root_url) or []
+
+        secs = timed(args.repeat, process_sitemap)
+        phases["process_sitemap"] = {
+            "secs": secs,
+            "nodes": len(nodes),
+            "urls_per_sec": len(nodes) / secs,
+        }
+        del nodes[:]
+
+    url_data = {
+        "loc": "https://example.com/page",
+        "lastmod": "2024-01-01T10:00:00+00:00",
+        "changefreq": "daily",
+        "priority": "0.5",
+    }
+    meta = {"processed_by": "bench"}
+    total_models = args.models
+
+    def build_models():
+        for _ in range(total_models):
+            WebsiteNodeModel(
+                url_data["loc"],
+                "https://example.com/sitemap.xml",
+                "URL",
+                dict(url_data),
+                meta=meta,
+            )
+
+    secs = timed(args.repeat, build_models)
+    phases["WebsiteNodeModel"] = {
+        "secs": secs,
+        "models_per_sec": total_models / secs,
+    }
+
+    return {
+        "python": platform.python_version(),
+        "tree": {
+            "depth": args.depth,
+            "fanout": args.fanout,
+            "urls_per_sitemap": args.urls,
+            "total_urls": server.total_urls,
+            "total_sitemaps": server.total_sitemaps,
+            "gzip": args.gzip,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+        },
+        "sitemap_requests": server.requests,
+        "injected_errors": server.errors,
+        "phases": phases,
+        "peak_rss_mib": peak_rss_mib(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--depth", type=int, default=1)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--urls", type=int, default=5000)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--models", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", metavar="PATH", help="Save the results as JSON")
+    args = parser.parse_args()
+
+    results = run(args)
+    tree = results["tree"]
+    print(
+        f"Tree: {tree['total_sitemaps']} sitemaps, {tree['total_urls']:,} URLs"
+        f" (gzip={tree['gzip']}, latency={tree['latency']}s,"
+        f" error_rate={tree['error_rate']})"
+    )
+    for name, phase in results["phases"].items():
+        rate = next(
+            (
+                f"{value:>12,.0f} {key}"
+                for key, value in phase.items()
+                if "_per_" in key
+            ),
+            "",
+        )
+        print(f"{name:<18} {phase['secs'] * 1000:>10.1f} ms  {rate}")
+    print(f"Peak RSS: {results['peak_rss_mib']:.1f} MiB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
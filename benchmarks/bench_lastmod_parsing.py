@@ -0,0 +1,46 @@
+"""
+Compares the speed of the lastmod parsers.
+
+Run with ``python benchmarks/bench_lastmod_parsing.py``.
+"""
+
+import timeit
+
+from dateutil.parser import parse  # type: ignore
+
+from mr_apollo_2n.utils.utils import parse_w3c_datetime
+
+SAMPLES = [
+    "2023-05-01",
+    "2023-05",
+    "2023-05-01T10:30:00Z",
+    "2023-05-01T10:30:00+02:00",
+    "2023-05-01T10:30:00.123456+00:00",
+    "2023-05-01T10:30:00.5Z",
+    "2023-05-01T10:30+01:00",
+]
+NUMBER = 20000
+
+
+def bench(parser) -> float:
+    """
+    Returns the secs taken to parse every sample NUMBER times.
+    """
+    return timeit.timeit(
+        "for sample in SAMPLES: parser(sample)",
+        globals={"SAMPLES": SAMPLES, "parser": parser},
+        number=NUMBER,
+    )
+
+
+def main():
+    total = NUMBER * len(SAMPLES)
+    slow = bench(parse)
+    fast = bench(parse_w3c_datetime)
+    print(f"dateutil.parser.parse: {total / slow:>12,.0f} values/s")
+    print(f"parse_w3c_datetime:    {total / fast:>12,.0f} values/s")
+    print(f"speedup:               {slow / fast:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
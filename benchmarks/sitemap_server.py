@@ -0,0 +1,227 @@
+"""
+Local HTTP server that generates synthetic robots.txt files and sitemaps.
+
+The sitemap tree is a complete tree: the root ``/sitemap.xml`` and every
+index up to ``depth`` list ``fanout`` child sitemaps, and the leaves are url
+sets of ``urls_per_sitemap`` URLs. With ``depth=0`` the root is a url set.
+
+Run ``python benchmarks/sitemap_server.py --help`` to serve a tree by hand.
+"""
+
+import argparse
+import gzip
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class SyntheticSitemapServer:
+    def __init__(
+        self,
+        depth: int = 1,
+        fanout: int = 10,
+        urls_per_sitemap: int = 1000,
+        use_gzip: bool = False,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Serves a synthetic sitemap tree in a background thread.
+
+        Parameters
+        ----------
+        depth : int, optional
+                The number of levels of sitemap indexes (default is 1).
+        fanout : int, optional
+                The child sitemaps listed by each index (default is 10).
+        urls_per_sitemap : int, optional
+                The URLs listed by each url set (default is 1000).
+        use_gzip : bool, optional
+                Whether the child sitemaps are served gzip-compressed as
+                ``.xml.gz`` (default is False).
+        latency : float, optional
+                The secs added to every response (default is 0.0).
+        error_rate : float, optional
+                The fraction of sitemap requests answered with a 503 (default
+                is 0.0).
+        seed : int, optional
+                The seed of the error injection (default is 0).
+        host : str, optional
+                The address to listen on (default is '127.0.0.1').
+        port : int, optional
+                The port to listen on (default is 0, a free port).
+        """
+        self.depth = depth
+        self.fanout = fanout
+        self.urls_per_sitemap = urls_per_sitemap
+        self.use_gzip = use_gzip
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0  # Sitemap requests only
+        self.errors = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_urls(self) -> int:
+        """
+        The number of page URLs of the tree.
+        """
+        return self.fanout**self.depth * self.urls_per_sitemap
+
+    @property
+    def total_sitemaps(self) -> int:
+        """
+        The number of sitemaps of the tree, including the root.
+        """
+        return sum(self.fanout**level for level in range(self.depth + 1))
+
+    def leaf_url(self) -> str:
+        """
+        Returns the URL of a url set of the tree.
+        """
+        return self._sitemap_url("-".join(["0"] * self.depth))
+
+    def _sitemap_url(self, path: str) -> str:
+        if not path:
+            return f"{self.base_url}/sitemap.xml"
+        extension = ".xml.gz" if self.use_gzip else ".xml"
+        return f"{self.base_url}/sitemap-{path}{extension}"
+
+    def robots_txt(self) -> str:
+        return (
+            "User-agent: *\n"
+            "Disallow: /private/\n"
+            f"Sitemap: {self._sitemap_url('')}\n"
+        )
+
+    def sitemap_xml(self, path: str) -> Optional[str]:
+        """
+        Returns the XML of the sitemap at a path of the tree.
+
+        Parameters
+        ----------
+        path : str
+                The dash-separated indexes of the sitemap, empty for the root.
+        """
+        indexes = path.split("-") if path else []
+        if len(indexes) > self.depth or not all(i.isdigit() for i in indexes):
+            return None
+        namespace = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+        if len(indexes) < self.depth:
+            prefix = f"{path}-" if path else ""
+            entries = "".join(
+                f"<sitemap><loc>{self._sitemap_url(f'{prefix}{i}')}</loc>"
+                "<lastmod>2024-01-01</lastmod></sitemap>"
+                for i in range(self.fanout)
+            )
+            return f"<sitemapindex {namespace}>{entries}</sitemapindex>"
+        entries = "".join(
+            f"<url><loc>{self.base_url}/{path or 'root'}/page-{i}</loc>"
+            "<lastmod>2024-01-01T10:00:00+00:00</lastmod>"
+            "<changefreq>daily</changefreq><priority>0.5</priority></url>"
+            for i in range(self.urls_per_sitemap)
+        )
+        return f"<urlset {namespace}>{entries}</urlset>"
+
+    def _fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            self.errors += fail
+        return fail
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                body = None
+                name = self.path.split("?", 1)[0].lstrip("/")
+                if name == "robots.txt":
+                    body = server.robots_txt().encode()
+                elif name == "sitemap.xml" or name.startswith("sitemap-"):
+                    if server._fail():
+                        self.send_error(503)
+                        return
+                    path = name[len("sitemap-") :] if name != "sitemap.xml" else ""
+                    path = path.removesuffix(".gz").removesuffix(".xml")
+                    xml = server.sitemap_xml(path)
+                    if xml is not None:
+                        body = xml.encode()
+                        if name.endswith(".gz"):
+                            body = gzip.compress(body, compresslevel=6)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "SyntheticSitemapServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--depth", type=int, default=1)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--urls", type=int, default=1000)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = SyntheticSitemapServer(
+        depth=args.depth,
+        fanout=args.fanout,
+        urls_per_sitemap=args.urls,
+        use_gzip=args.gzip,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        port=args.port,
+    )
+    print(f"Serving {server.total_urls:,} URLs at {server.base_url}/robots.txt")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
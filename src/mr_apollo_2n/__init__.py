@@ -1,4 +1,8 @@
-# read version from installed package
-from importlib.metadata import version
+# read version from installed package, on first access, to keep the import fast
+def __getattr__(name):
+    if name == "__version__":
+        from importlib.metadata import version
 
-__version__ = version("mr_apollo_2n")
+        globals()["__version__"] = version("mr_apollo_2n")
+        return globals()["__version__"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,508 @@
+import calendar
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from urllib.parse import urlparse
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+
+# Missing lastmod, stored as the NaT of numpy's datetime64
+NAT = -(2**63)
+MISSING = -1
+
+
+def _numpy():
+    try:
+        import numpy as np  # type: ignore
+    except ImportError as err:
+        raise ImportError(
+            "The analysis of a NodeBatch requires numpy, install it with "
+            "'pip install mr_apollo_2n[analysis]'."
+        ) from err
+    return np
+
+
+class StringTable:
+    """
+    Append-only table of unique strings, used to encode a column as codes.
+
+    Attributes:
+            values (List[str]): The unique strings, indexed by their code.
+    """
+
+    def __init__(self, values: Optional[Iterable[str]] = None):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in values or ():
+            self.encode(value)
+
+    def encode(self, value: str) -> int:
+        """
+        Returns the code of the string, adding it to the table if needed.
+
+        Parameters
+        ----------
+        value : str
+                The string to encode.
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value: str) -> int:
+        """
+        Returns the code of the string, or -1 if it is not in the table.
+
+        Parameters
+        ----------
+        value : str
+                The string to look up.
+        """
+        return self._codes.get(value, MISSING)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class NodeBatch:
+    """
+    Columnar container of crawled nodes, built for bulk analysis.
+
+    The string columns (``loc``, ``parent``, ``domain``) are stored as codes
+    into string tables, ``element_type`` and ``changefreq`` as categorical
+    codes, ``lastmod`` as microseconds since the epoch (UTC) and ``priority``
+    as float32. The columns are compact ``array.array`` buffers while the batch
+    is filled, and they are exposed as zero-copy NumPy arrays for vectorized
+    filters and aggregations. NumPy is only required by the analysis methods.
+    The arrays are views of the buffers, so they must be released before more
+    nodes are appended to the batch.
+
+    Examples
+    --------
+    >>> batch = NodeBatch()
+    >>> batch.append("https://example.com/a", "https://example.com/sitemap.xml",
+    ...              "URL", priority=0.5)
+    >>> len(batch), batch.count_by_domain()
+    (1, {'example.com': 1})
+    """
+
+    def __init__(
+        self,
+        locs: Optional[StringTable] = None,
+        parents: Optional[StringTable] = None,
+        domains: Optional[StringTable] = None,
+        element_types: Optional[StringTable] = None,
+        changefreqs: Optional[StringTable] = None,
+    ):
+        """
+        Initializes an empty NodeBatch.
+
+        Parameters
+        ----------
+        locs, parents, domains, element_types, changefreqs : StringTable, optional
+                The string tables of the columns, shared with other batches
+                (default is new tables).
+        """
+        self.locs = locs if locs is not None else StringTable()
+        self.parents = parents if parents is not None else StringTable()
+        self.domains = domains if domains is not None else StringTable()
+        self.element_types = (
+            element_types
+            if element_types is not None
+            else StringTable(["URL", "SITEMAP"])
+        )
+        self.changefreqs = (
+            changefreqs
+            if changefreqs is not None
+            else StringTable(
+                ["always", "hourly", "daily", "weekly", "monthly", "yearly", "never"]
+            )
+        )
+        self._loc = array("i")
+        self._parent = array("i")
+        self._domain = array("i")
+        self._element_type = array("b")
+        self._lastmod = array("q")
+        self._priority = array("f")
+        self._changefreq = array("i")
+
+    def __len__(self):
+        return len(self._loc)
+
+    def append(
+        self,
+        loc: str,
+        parent: str,
+        element_type: str,
+        lastmod: Optional[datetime] = None,
+        priority: Optional[float] = None,
+        changefreq: Optional[str] = None,
+        domain: Optional[str] = None,
+    ):
+        """
+        Appends a node to the batch.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the element.
+        parent : str
+                The URL of the sitemap from which the element was extracted.
+        element_type : str
+                The type of the element.
+        lastmod : Optional[datetime], optional
+                The last modification date. Naive datetimes are taken as UTC.
+        priority : Optional[float], optional
+                The priority of the element.
+        changefreq : Optional[str], optional
+                The change frequency of the element.
+        domain : Optional[str], optional
+                The domain of the element (default is the netloc of ``loc``).
+        """
+        # All the fields are encoded first, so that a failure leaves the
+        # columns of the same length
+        row = (
+            self.locs.encode(loc),
+            self.parents.encode(parent),
+            self.domains.encode(domain if domain is not None else urlparse(loc).netloc),
+            self.element_types.encode(element_type),
+            NAT if lastmod is None else _to_epoch_micros(lastmod),
+            float("nan") if priority is None else float(priority),
+            MISSING if changefreq is None else self.changefreqs.encode(changefreq),
+        )
+        columns = (
+            self._loc,
+            self._parent,
+            self._domain,
+            self._element_type,
+            self._lastmod,
+            self._priority,
+            self._changefreq,
+        )
+        for column, value in zip(columns, row):
+            column.append(value)
+
+    def append_node(self, node: WebsiteNodeModel):
+        """
+        Appends a WebsiteNodeModel to the batch.
+
+        Parameters
+        ----------
+        node : WebsiteNodeModel
+                The node to append.
+        """
+        self.append(
+            node.loc,
+            node.parent,
+            node.element_type,
+            node.lastmod,
+            node.priority,
+            node.changefreq,
+            node.domain,
+        )
+
+    def extend(self, nodes: Iterable[WebsiteNodeModel]):
+        """
+        Appends several WebsiteNodeModel objects to the batch.
+
+        Parameters
+        ----------
+        nodes : Iterable[WebsiteNodeModel]
+                The nodes to append.
+        """
+        for node in nodes:
+            self.append_node(node)
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable[WebsiteNodeModel]) -> "NodeBatch":
+        """
+        Builds a NodeBatch from WebsiteNodeModel objects.
+
+        Parameters
+        ----------
+        nodes : Iterable[WebsiteNodeModel]
+                The nodes of the batch.
+        """
+        batch = cls()
+        batch.extend(nodes)
+        return batch
+
+    # Columns
+
+    @property
+    def loc_codes(self):
+        """
+        The codes of the ``loc`` column into ``locs``, as an int32 array.
+        """
+        return _numpy().frombuffer(self._loc, dtype="int32")
+
+    @property
+    def parent_codes(self):
+        """
+        The codes of the ``parent`` column into ``parents``, as an int32 array.
+        """
+        return _numpy().frombuffer(self._parent, dtype="int32")
+
+    @property
+    def domain_codes(self):
+        """
+        The codes of the ``domain`` column into ``domains``, as an int32 array.
+        """
+        return _numpy().frombuffer(self._domain, dtype="int32")
+
+    @property
+    def element_type_codes(self):
+        """
+        The codes of the ``element_type`` column into ``element_types``.
+        """
+        return _numpy().frombuffer(self._element_type, dtype="int8")
+
+    @property
+    def changefreq_codes(self):
+        """
+        The codes of the ``changefreq`` column into ``changefreqs``, -1 if missing.
+        """
+        return _numpy().frombuffer(self._changefreq, dtype="int32")
+
+    @property
+    def lastmod(self):
+        """
+        The ``lastmod`` column as a datetime64[us] array (UTC), NaT if missing.
+        """
+        return _numpy().frombuffer(self._lastmod, dtype="datetime64[us]")
+
+    @property
+    def priority(self):
+        """
+        The ``priority`` column as a float32 array, NaN if missing.
+        """
+        return _numpy().frombuffer(self._priority, dtype="float32")
+
+    def column(self, name: str):
+        """
+        Returns a column decoded as a NumPy array.
+
+        Parameters
+        ----------
+        name : str
+                The name of the column: loc, parent, domain, element_type,
+                changefreq, lastmod or priority.
+        """
+        np = _numpy()
+        if name in ("lastmod", "priority"):
+            return getattr(self, name)
+        tables = {
+            "loc": (self.locs, self.loc_codes),
+            "parent": (self.parents, self.parent_codes),
+            "domain": (self.domains, self.domain_codes),
+            "element_type": (self.element_types, self.element_type_codes),
+            "changefreq": (self.changefreqs, self.changefreq_codes),
+        }
+        if name not in tables:
+            raise KeyError(f"Unknown column '{name}'.")
+        table, codes = tables[name]
+        # The last slot decodes the missing code (-1) as None
+        values = np.array(table.values + [None], dtype=object)
+        return values[codes]
+
+    # Analysis
+
+    def mask(
+        self,
+        element_type: Optional[str] = None,
+        domain: Optional[str] = None,
+        parent: Optional[str] = None,
+        changefreq: Optional[str] = None,
+        modified_since: Optional[datetime] = None,
+        modified_before: Optional[datetime] = None,
+        min_priority: Optional[float] = None,
+    ):
+        """
+        Builds a boolean mask of the nodes that match all the conditions.
+
+        Parameters
+        ----------
+        element_type, domain, parent, changefreq : Optional[str], optional
+                The values the columns must be equal to.
+        modified_since : Optional[datetime], optional
+                The min lastmod (inclusive). Nodes without lastmod do not match.
+        modified_before : Optional[datetime], optional
+                The max lastmod (exclusive). Nodes without lastmod do not match.
+        min_priority : Optional[float], optional
+                The min priority (inclusive).
+        """
+        np = _numpy()
+        mask = np.ones(len(self), dtype=bool)
+        for table, codes, value in (
+            (self.element_types, self.element_type_codes, element_type),
+            (self.domains, self.domain_codes, domain),
+            (self.parents, self.parent_codes, parent),
+            (self.changefreqs, self.changefreq_codes, changefreq),
+        ):
+            if value is not None:
+                code = table.code(value)
+                # An unknown value matches no node, not the missing ones (-1)
+                if code == MISSING:
+                    mask[:] = False
+                else:
+                    mask &= codes == code
+        if modified_since is not None:
+            mask &= self._lastmod_array() >= _to_epoch_micros(modified_since)
+        if modified_before is not None:
+            mask &= (self._lastmod_array() < _to_epoch_micros(modified_before)) & (
+                self._lastmod_array() != NAT
+            )
+        if min_priority is not None:
+            mask &= self.priority >= min_priority
+        return mask
+
+    def _lastmod_array(self):
+        return _numpy().frombuffer(self._lastmod, dtype="int64")
+
+    def filter(self, mask=None, **conditions) -> "NodeBatch":
+        """
+        Returns a new batch with the nodes selected by a mask or conditions.
+
+        The new batch shares the string tables of this one.
+
+        Parameters
+        ----------
+        mask : numpy.ndarray, optional
+                A boolean mask or an array of indices.
+        **conditions
+                The conditions accepted by ``mask``, combined with the mask.
+        """
+        np = _numpy()
+        selection = self.mask(**conditions)
+        if mask is not None:
+            mask = np.asarray(mask)
+            if mask.dtype != bool:
+                mask = np.isin(np.arange(len(self)), mask)
+            selection &= mask
+        return self.take(np.flatnonzero(selection))
+
+    def take(self, indices: Sequence[int]) -> "NodeBatch":
+        """
+        Returns a new batch with the nodes at the given indices.
+
+        Parameters
+        ----------
+        indices : Sequence[int]
+                The indices of the nodes.
+        """
+        np = _numpy()
+        indices = np.asarray(indices, dtype="int64")
+        batch = NodeBatch(
+            self.locs, self.parents, self.domains, self.element_types, self.changefreqs
+        )
+        for name in (
+            "_loc",
+            "_parent",
+            "_domain",
+            "_element_type",
+            "_lastmod",
+            "_priority",
+            "_changefreq",
+        ):
+            column = getattr(self, name)
+            values = np.frombuffer(column, dtype=column.typecode)[indices]
+            getattr(batch, name).frombytes(values.tobytes())
+        return batch
+
+    def count_by_domain(self) -> Dict[str, int]:
+        """
+        Counts the nodes of each domain.
+        """
+        np = _numpy()
+        counts = np.bincount(self.domain_codes, minlength=len(self.domains))
+        return {
+            domain: int(count)
+            for domain, count in zip(self.domains.values, counts)
+            if count
+        }
+
+    def group_by_domain(self) -> Dict[str, "NodeBatch"]:
+        """
+        Splits the batch into one batch per domain.
+        """
+        np = _numpy()
+        codes = self.domain_codes
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        return {
+            self.domains.values[codes[group[0]]]: self.take(group)
+            for group in np.split(order, boundaries)
+            if len(group)
+        }
+
+    def lastmod_histogram(self, unit: str = "D") -> Dict[Any, int]:
+        """
+        Counts the nodes per lastmod period, ignoring the missing ones.
+
+        Parameters
+        ----------
+        unit : str, optional
+                The NumPy datetime unit of the periods, e.g. 'D', 'M' or 'Y'
+                (default is 'D').
+        """
+        np = _numpy()
+        lastmod = self.lastmod
+        periods = lastmod[~np.isnat(lastmod)].astype(f"datetime64[{unit}]")
+        values, counts = np.unique(periods, return_counts=True)
+        return {value.item(): int(count) for value, count in zip(values, counts)}
+
+    # Export
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """
+        Returns the decoded columns as NumPy arrays.
+        """
+        return {
+            name: self.column(name)
+            for name in (
+                "loc",
+                "domain",
+                "parent",
+                "element_type",
+                "lastmod",
+                "priority",
+                "changefreq",
+            )
+        }
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yields the nodes as dicts, with the keys of ``WebsiteNodeModel.to_dict``
+        except ``properties`` and ``meta``, which are not stored.
+        """
+        for i in range(len(self)):
+            lastmod = self._lastmod[i]
+            priority = self._priority[i]
+            changefreq = self._changefreq[i]
+            yield {
+                "loc": self.locs.values[self._loc[i]],
+                "domain": self.domains.values[self._domain[i]],
+                "parent": self.parents.values[self._parent[i]],
+                "element_type": self.element_types.values[self._element_type[i]],
+                "lastmod": _from_epoch_micros(lastmod) if lastmod != NAT else None,
+                "priority": priority if priority == priority else None,
+                "changefreq": (
+                    self.changefreqs.values[changefreq]
+                    if changefreq != MISSING
+                    else None
+                ),
+            }
+
+
+def _to_epoch_micros(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return calendar.timegm(value.timetuple()) * 1_000_000 + value.microsecond
+
+
+def _from_epoch_micros(value: int) -> datetime:
+    return datetime.fromtimestamp(value // 1_000_000, tz=timezone.utc).replace(
+        microsecond=value % 1_000_000
+    )
@@ -0,0 +1,549 @@
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+
+INF = float("inf")
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    """
+    Returns the POSIX timestamp of a datetime, considering the naive ones UTC.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _from_timestamp(value: float) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value != INF else None
+
+
+def _split_url(loc: str) -> Tuple[str, str]:
+    """
+    Returns the host and the path, with the query, of a URL.
+    """
+    scheme, separator, rest = loc.partition("://")
+    host, _, path = (rest if separator else scheme).partition("/")
+    if "#" in path:
+        path = path.partition("#")[0]
+    return host, "/" + path
+
+
+class SubtreeStats:
+    """
+    Statistics of a section of a website: a directory of its URL paths and
+    everything under it.
+
+    Attributes:
+            path (str): The path of the directory, e.g. '/blog'.
+            pages (int): The pages directly in the directory.
+            total_pages (int): The pages in the directory and its
+                    subdirectories.
+            fan_out (int): The number of subdirectories.
+            depth (int): The number of segments of the path.
+            max_depth (int): The number of segments of the deepest page.
+            lastmod_count (int): The pages with a lastmod.
+            newest (Optional[datetime]): The most recent lastmod.
+            oldest (Optional[datetime]): The least recent lastmod.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        pages: int,
+        total_pages: int,
+        fan_out: int,
+        depth: int,
+        max_depth: int,
+        lastmod_count: int,
+        newest: Optional[datetime],
+        oldest: Optional[datetime],
+    ):
+        self.path = path
+        self.pages = pages
+        self.total_pages = total_pages
+        self.fan_out = fan_out
+        self.depth = depth
+        self.max_depth = max_depth
+        self.lastmod_count = lastmod_count
+        self.newest = newest
+        self.oldest = oldest
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "pages": self.pages,
+            "total_pages": self.total_pages,
+            "fan_out": self.fan_out,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "lastmod_count": self.lastmod_count,
+            "newest": self.newest,
+            "oldest": self.oldest,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"SubtreeStats(path={self.path!r}, total_pages={self.total_pages}, "
+            f"fan_out={self.fan_out}, max_depth={self.max_depth})"
+        )
+
+
+class PathTrieNode:
+    """
+    Directory of a PathTrie.
+
+    The label is one or more path segments joined by '/', as the chains of
+    directories without pages and with a single subdirectory are merged in
+    one node.
+
+    Attributes:
+            label (str): The path segments of the node.
+            children (Optional[Dict[str, PathTrieNode]]): The subdirectories,
+                    by the first segment of their label.
+            pages (int): The pages directly in the directory.
+            lastmod_count (int): The pages of the directory with a lastmod.
+            newest (float): The most recent lastmod timestamp, -inf if none.
+            oldest (float): The least recent lastmod timestamp, inf if none.
+            subtree (Tuple[int, int, int, float, float]): The pages, the
+                    depth of the deepest page, the pages with a lastmod, the
+                    newest and the oldest lastmod of the whole subtree,
+                    computed by ``PathTrie.aggregate``.
+    """
+
+    __slots__ = (
+        "label",
+        "children",
+        "pages",
+        "lastmod_count",
+        "newest",
+        "oldest",
+        "subtree",
+        "_names",
+    )
+
+    def __init__(self, label: str):
+        self.label = label
+        self.children: Optional[Dict[str, "PathTrieNode"]] = None
+        self.pages = 0
+        self.lastmod_count = 0
+        self.newest = -INF
+        self.oldest = INF
+        self.subtree: Tuple[int, int, int, float, float] = (0, 0, 0, -INF, INF)
+        # The last segments of the pages, each one followed by a newline
+        self._names = bytearray()
+
+    def _split(self, segments: int) -> "PathTrieNode":
+        """
+        Moves the first segments of the label to a new parent, which is
+        returned.
+        """
+        parts = self.label.split("/")
+        parent = PathTrieNode("/".join(parts[:segments]))
+        self.label = "/".join(parts[segments:])
+        parent.children = {sys.intern(parts[segments]): self}
+        return parent
+
+    def iter_names(self) -> Iterator[str]:
+        """
+        Yields the last segments of the pages directly in the directory.
+        """
+        for name in self._names.decode().split("\n")[:-1]:
+            yield name
+
+
+class PathTrie:
+    def __init__(self):
+        """
+        Compressed trie of the URL paths of a website.
+
+        Every directory is stored once however many pages it has, and the last
+        segment of each page is packed in a byte buffer of its directory, so
+        the trie needs a fraction of the memory of the URLs. Adding a page
+        only updates its directory, found with a lookup by path, and the
+        statistics of the subtrees are aggregated over the directories when
+        they are read. The pages are counted as they are added, not
+        deduplicated.
+
+        Attributes:
+                root (PathTrieNode): The root directory, '/'.
+        """
+        self.root = PathTrieNode("")
+        self._directories: Dict[str, PathTrieNode] = {"/": self.root}
+        self._aggregated = True
+
+    def add(self, path: str, lastmod: Optional[float] = None):
+        """
+        Adds a page to the trie.
+
+        Parameters
+        ----------
+        path : str
+                The path of the page, with its query, e.g. '/blog/post?page=2'.
+        lastmod : Optional[float], optional
+                The POSIX timestamp of the lastmod of the page (default is
+                None).
+        """
+        path, mark, query = path.partition("?")
+        directory, _, name = path.rpartition("/")
+        directory += "/"
+        node = self._directories.get(directory)
+        if node is None:
+            node = self._directories[directory] = self._insert(directory)
+        node.pages += 1
+        node._names += (name + mark + query + "\n").encode()
+        if lastmod is not None:
+            node.lastmod_count += 1
+            if lastmod > node.newest:
+                node.newest = lastmod
+            if lastmod < node.oldest:
+                node.oldest = lastmod
+        self._aggregated = False
+
+    def _insert(self, directory: str) -> PathTrieNode:
+        """
+        Returns the node of a directory, creating it and splitting the merged
+        labels on its path if needed.
+        """
+        segments = directory[1:-1].split("/")
+        node = self.root
+        i, total = 0, len(segments)
+        while i < total:
+            segment = segments[i]
+            if node.children is None:
+                node.children = {}
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[sys.intern(segment)] = PathTrieNode(
+                    "/".join(segments[i:])
+                )
+                return child
+            parts = child.label.split("/")
+            matched = 1
+            while (
+                matched < len(parts)
+                and i + matched < total
+                and parts[matched] == segments[i + matched]
+            ):
+                matched += 1
+            if matched < len(parts):
+                child = node.children[segment] = child._split(matched)
+            i += matched
+            node = child
+        return node
+
+    def aggregate(self):
+        """
+        Computes the statistics of the subtrees of the directories added
+        since the last call.
+        """
+        if self._aggregated:
+            return
+        # Post-order walk, with the number of segments of each directory
+        stack: List[Tuple[PathTrieNode, int, bool]] = [(self.root, 0, False)]
+        while stack:
+            node, depth, visited = stack.pop()
+            children = node.children or {}
+            if not visited:
+                stack.append((node, depth, True))
+                for child in children.values():
+                    stack.append((child, depth + child.label.count("/") + 1, False))
+                continue
+            pages, lastmod_count = node.pages, node.lastmod_count
+            max_depth = depth + 1 if pages else 0
+            newest, oldest = node.newest, node.oldest
+            for child in children.values():
+                (
+                    child_pages,
+                    child_depth,
+                    child_lastmod_count,
+                    child_newest,
+                    child_oldest,
+                ) = child.subtree
+                pages += child_pages
+                max_depth = max(max_depth, child_depth)
+                lastmod_count += child_lastmod_count
+                newest = max(newest, child_newest)
+                oldest = min(oldest, child_oldest)
+            node.subtree = (pages, max_depth, lastmod_count, newest, oldest)
+        self._aggregated = True
+
+    def _find(self, path: str) -> Tuple[Optional[PathTrieNode], int]:
+        """
+        Returns the node of a directory and its number of segments, or the
+        node of the deepest directory whose label starts with it.
+        """
+        segments = [segment for segment in path.strip("/").split("/") if segment]
+        node, i = self.root, 0
+        while i < len(segments):
+            child = (node.children or {}).get(segments[i])
+            if child is None:
+                return None, 0
+            parts = child.label.split("/")
+            if parts[: len(segments) - i] != segments[i : i + len(parts)]:
+                return None, 0
+            node, i = child, i + len(parts)
+        return node, i
+
+    def stats(self, path: str = "/") -> Optional[SubtreeStats]:
+        """
+        Returns the statistics of a directory, None if it is not in the trie.
+
+        Parameters
+        ----------
+        path : str, optional
+                The path of the directory (default is '/').
+        """
+        node, depth = self._find(path)
+        if node is None:
+            return None
+        segments = [segment for segment in path.strip("/").split("/") if segment]
+        if depth > len(segments):
+            # The path ends inside a merged label, whose only subdirectory is
+            # the rest of the label
+            return self._stats("/" + "/".join(segments), node, len(segments), True)
+        return self._stats("/" + "/".join(segments), node, depth)
+
+    def _stats(
+        self, path: str, node: PathTrieNode, depth: int, inside_label: bool = False
+    ) -> SubtreeStats:
+        self.aggregate()
+        pages, max_depth, lastmod_count, newest, oldest = node.subtree
+        return SubtreeStats(
+            path,
+            0 if inside_label else node.pages,
+            pages,
+            1 if inside_label else len(node.children or ()),
+            depth,
+            max_depth,
+            lastmod_count,
+            _from_timestamp(newest) if lastmod_count else None,
+            _from_timestamp(oldest) if lastmod_count else None,
+        )
+
+    def sections(self, depth: int = 1) -> Dict[str, SubtreeStats]:
+        """
+        Returns the statistics of the directories with ``depth`` segments,
+        e.g. '/blog' and '/shop' for 1.
+
+        Parameters
+        ----------
+        depth : int, optional
+                The number of segments of the directories (default is 1).
+        """
+        sections: Dict[str, SubtreeStats] = {}
+        stack: List[Tuple[PathTrieNode, List[str]]] = [(self.root, [])]
+        while stack:
+            node, segments = stack.pop()
+            for child in (node.children or {}).values():
+                child_segments = segments + child.label.split("/")
+                if len(child_segments) < depth:
+                    stack.append((child, child_segments))
+                    continue
+                path = "/" + "/".join(child_segments[:depth])
+                sections[path] = self._stats(
+                    path, child, depth, len(child_segments) > depth
+                )
+        return dict(sorted(sections.items()))
+
+    def iter_nodes(self) -> Iterator[Tuple[str, PathTrieNode]]:
+        """
+        Yields the directories of the trie with their path, depth first.
+        """
+        stack: List[Tuple[str, PathTrieNode]] = [("/", self.root)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            for child in reversed(list((node.children or {}).values())):
+                stack.append((f"{path}{child.label}/", child))
+
+    def iter_paths(self) -> Iterator[str]:
+        """
+        Yields the paths of the pages, directory by directory.
+        """
+        for path, node in self.iter_nodes():
+            for name in node.iter_names():
+                yield path + name
+
+    def __len__(self) -> int:
+        self.aggregate()
+        return self.root.subtree[0]
+
+
+class SitemapGraph:
+    def __init__(self):
+        """
+        Graph of the sitemaps of a crawl: each sitemap with its child sitemaps
+        and the number and freshness of the URLs it lists.
+        """
+        self.parents: Dict[str, str] = {}
+        self.children: Dict[str, List[str]] = {}
+        self.urls: Dict[str, int] = {}
+        self.newest: Dict[str, float] = {}
+
+    def add(
+        self,
+        loc: str,
+        parent: str,
+        element_type: str,
+        lastmod: Optional[float] = None,
+    ):
+        """
+        Adds a node of the crawl to the graph.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the node.
+        parent : str
+                The URL of the sitemap that lists it, '' for a root sitemap.
+        element_type : str
+                'SITEMAP' or 'URL', the other nodes are ignored.
+        lastmod : Optional[float], optional
+                The POSIX timestamp of the lastmod of the node (default is
+                None).
+        """
+        if element_type == "SITEMAP":
+            self.parents[loc] = parent
+            self.children.setdefault(loc, [])
+            if parent:
+                self.children.setdefault(parent, []).append(loc)
+        elif element_type == "URL":
+            self.urls[parent] = self.urls.get(parent, 0) + 1
+            if lastmod is not None and lastmod > self.newest.get(parent, -INF):
+                self.newest[parent] = lastmod
+
+    @property
+    def roots(self) -> List[str]:
+        """
+        The sitemaps not listed in another sitemap of the graph.
+        """
+        return [
+            loc
+            for loc in self.children
+            if not self.parents.get(loc) or self.parents[loc] not in self.children
+        ]
+
+    def depths(self) -> Dict[str, int]:
+        """
+        Returns the depth of each sitemap, 0 for the roots.
+        """
+        depths = {root: 0 for root in self.roots}
+        level = list(depths)
+        while level:
+            next_level = []
+            for loc in level:
+                for child in self.children.get(loc, ()):
+                    if child not in depths:
+                        depths[child] = depths[loc] + 1
+                        next_level.append(child)
+            level = next_level
+        return depths
+
+    def fan_out(self, loc: str) -> int:
+        """
+        Returns the number of child sitemaps and URLs of a sitemap.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the sitemap.
+        """
+        return len(self.children.get(loc, ())) + self.urls.get(loc, 0)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the depth, the child sitemaps, the URLs and the most recent
+        lastmod of the URLs of each sitemap.
+        """
+        return {
+            loc: {
+                "depth": depth,
+                "sitemaps": len(self.children.get(loc, ())),
+                "urls": self.urls.get(loc, 0),
+                "newest": _from_timestamp(self.newest.get(loc, INF)),
+            }
+            for loc, depth in self.depths().items()
+        }
+
+
+class SiteStructure:
+    def __init__(self):
+        """
+        Structure of the websites of a crawl, built in one pass over its
+        nodes: a PathTrie of the pages of each host and the SitemapGraph.
+
+        Attributes:
+                tries (Dict[str, PathTrie]): The path trie of each host.
+                graph (SitemapGraph): The graph of the sitemaps.
+        """
+        self.tries: Dict[str, PathTrie] = {}
+        self.graph = SitemapGraph()
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable[WebsiteNodeModel]) -> "SiteStructure":
+        """
+        Builds the structure from the nodes of a crawl, e.g. the list of
+        ``process_all_sitemaps``, ``iter_nodes`` or a ``NodeStore`` query.
+
+        Parameters
+        ----------
+        nodes : Iterable[WebsiteNodeModel]
+                The nodes of the crawl.
+        """
+        structure = cls()
+        structure.update(nodes)
+        return structure
+
+    def update(self, nodes: Iterable[WebsiteNodeModel]):
+        """
+        Adds nodes to the structure.
+
+        Parameters
+        ----------
+        nodes : Iterable[WebsiteNodeModel]
+                The nodes of the crawl.
+        """
+        for node in nodes:
+            lastmod = _timestamp(node.lastmod)
+            self.graph.add(node.loc, node.parent, node.element_type, lastmod)
+            if node.element_type != "SITEMAP":
+                self.add_url(node.loc, lastmod)
+
+    def add_url(self, loc: str, lastmod: Optional[float] = None):
+        """
+        Adds a page to the path trie of its host.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the page.
+        lastmod : Optional[float], optional
+                The POSIX timestamp of the lastmod of the page (default is
+                None).
+        """
+        host, path = _split_url(loc)
+        trie = self.tries.get(host)
+        if trie is None:
+            trie = self.tries[sys.intern(host)] = PathTrie()
+        trie.add(path, lastmod)
+
+    def sections(self, depth: int = 1) -> Dict[str, SubtreeStats]:
+        """
+        Returns the statistics of the sections of all the hosts, by URL
+        without scheme, e.g. 'example.com/blog'.
+
+        Parameters
+        ----------
+        depth : int, optional
+                The number of segments of the sections (default is 1).
+        """
+        return {
+            f"{host}{path}": stats
+            for host, trie in sorted(self.tries.items())
+            for path, stats in trie.sections(depth).items()
+        }
@@ -1,7 +1,9 @@
-from typing import Any, Dict, Literal
+import sys
+from datetime import datetime
+from typing import Any, Dict, Literal, Optional, Union
 from urllib.parse import urlparse
 
-from dateutil.parser import parse  # type: ignore
+from mr_apollo_2n.utils.utils import parse_w3c_datetime
 
 
 class WebsiteNodeModel:
@@ -14,39 +16,66 @@ class WebsiteNodeModel:
             The path of the URL of the sitemap element.
     parent : str
             The path of the URL of the parent sitemap from which this element was extracted.
-    element_type : Literal['url', 'sitemap']
-            The type of the element.
+    element_type : Literal['URL', 'SITEMAP', 'PAGE']
+            The type of the element. 'PAGE' is an HTML page found by following
+            links, whose parent is the page that links to it.
     lastmod : datetime.datetime, optional
-            The last modification date of the element.
+            The last modification date of the element. When the node is built
+            with ``lazy_lastmod``, the raw string is only parsed on first access.
     priority : float, optional
             The priority of the element in the sitemap.
     changefreq : str, optional
             The change frequency of the element.
     properties : dict
             The additional properties of the element.
+    meta : dict
+            The metadata of the crawl. It is shared by reference by all the nodes
+            built from the same sitemap, so it must not be modified.
+
+    Notes
+    -----
+    The class uses ``__slots__`` and the ``domain``, ``parent`` and ``changefreq``
+    strings are interned, so the nodes of the same crawl share them. The properties
+    dict is only allocated when the element has additional properties.
     """
 
+    __slots__ = (
+        "loc",
+        "parent",
+        "domain",
+        "element_type",
+        "_lastmod",
+        "priority",
+        "changefreq",
+        "_properties",
+        "meta",
+    )
+
     def __init__(
         self,
         loc: str,
         parent: str,
-        element_type: Literal["URL", "SITEMAP"],
+        element_type: Literal["URL", "SITEMAP", "PAGE"],
         properties: Dict[str, Any],
         meta: Dict[str, Any],
+        lazy_lastmod: bool = False,
     ):
         self.loc = loc
         properties.pop("loc", None)
 
-        self.parent = parent
-        self.domain = urlparse(loc).netloc
+        self.parent = sys.intern(parent)
+        self.domain = sys.intern(urlparse(loc).netloc)
         self.element_type = element_type
 
+        self._lastmod: Union[datetime, str, None] = None
+        self.priority = None
+        self.changefreq = None
+
         lastmod = properties.pop("lastmod", "")
         if lastmod is not None and isinstance(lastmod, str) and lastmod != "":
-            try:
-                self.lastmod = parse(lastmod)
-            except Exception:  # noqa
-                self.lastmod = None
+            self._lastmod = lastmod
+            if not lazy_lastmod:
+                self._parse_lastmod()
 
         priority = properties.pop("priority", "")
         if (
@@ -58,11 +87,41 @@ class WebsiteNodeModel:
 
         changefreq = properties.pop("changefreq", "")
         if changefreq is not None and isinstance(changefreq, str) and changefreq != "":
-            self.changefreq = changefreq
+            self.changefreq = sys.intern(changefreq)
 
-        self.properties = {k: v for k, v in properties.items() if v is not None}
+        self._properties: Optional[Dict[str, Any]] = {
+            k: v for k, v in properties.items() if v is not None
+        } or None
         self.meta = meta
 
+    def _parse_lastmod(self) -> Optional[datetime]:
+        if isinstance(self._lastmod, str):
+            try:
+                self._lastmod = parse_w3c_datetime(self._lastmod)
+            except Exception:  # noqa
+                self._lastmod = None
+        return self._lastmod
+
+    @property
+    def lastmod(self) -> Optional[datetime]:
+        """
+        The last modification date of the element.
+        """
+        return self._parse_lastmod()
+
+    @lastmod.setter
+    def lastmod(self, value: Optional[datetime]):
+        self._lastmod = value
+
+    @property
+    def properties(self) -> Dict[str, Any]:
+        """
+        The additional properties of the element, allocated on first access.
+        """
+        if self._properties is None:
+            self._properties = {}
+        return self._properties
+
     def __repr__(self):
         return (
             "SitemapElement["
@@ -73,7 +132,7 @@ class WebsiteNodeModel:
             f"\n\tlastmod={self.lastmod}, "
             f"\n\tpriority={self.priority}, "
             f"\n\tchangefreq={self.changefreq}, "
-            f"\n\tproperties={self.properties}, "
+            f"\n\tproperties={self._properties or {}}, "
             f"\n\tmeta={self.meta}"
             f"]"
         )
@@ -87,6 +146,6 @@ class WebsiteNodeModel:
             "lastmod": self.lastmod,
             "priority": self.priority,
             "changefreq": self.changefreq,
-            "properties": self.properties,
+            "properties": self._properties if self._properties is not None else {},
             "meta": self.meta,
         }
@@ -0,0 +1,471 @@
+"""
+Command-line interface of mr_apollo_2n.
+
+The modules of the crawler are imported only when a command runs, so the
+interpreter starts fast for ``--help`` and for short scheduled runs.
+"""
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+OUTPUT_FORMATS = ("jsonl", "csv", "sqlite", "parquet", "store", "snapshot")
+
+
+def _infer_format(path: str) -> str:
+    """
+    Returns the output format of a path from its extension, JSON Lines by
+    default.
+    """
+    path = path.lower()
+    if path.endswith((".snap.gz", ".snapshot.gz")):
+        return "snapshot"
+    extension = path.rsplit(".", 1)[-1] if "." in path else ""
+    aliases = {"db": "sqlite", "sqlite3": "sqlite", "json": "jsonl", "snap": "snapshot"}
+    extension = aliases.get(extension, extension)
+    return extension if extension in OUTPUT_FORMATS else "jsonl"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="mr-apollo",
+        description="Map the nodes of websites from their sitemaps.",
+    )
+    parser.add_argument("--version", action="store_true", help="Show the version.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    crawl_parser = subparsers.add_parser(
+        "crawl",
+        help="Crawl the sitemaps of a website.",
+        description="Crawl the sitemaps of a website and write its nodes.",
+    )
+    crawl_parser.add_argument("home_url", help="The Home URL of the website.")
+    crawl_parser.add_argument(
+        "--sitemap",
+        help="Crawl only this sitemap instead of the ones listed in robots.txt.",
+    )
+    crawl_parser.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help="The output file, '-' for stdout (default: '-').",
+    )
+    crawl_parser.add_argument(
+        "-f",
+        "--format",
+        choices=OUTPUT_FORMATS,
+        help="The output format (default: inferred from the output, or jsonl).",
+    )
+    crawl_parser.add_argument(
+        "--sleep-time",
+        type=float,
+        default=2.0,
+        help="Initial secs between requests to a host, 0 disables the rate "
+        "limiting (default: 2).",
+    )
+    crawl_parser.add_argument(
+        "--headers", help="The request headers, as a JSON object."
+    )
+    crawl_parser.add_argument(
+        "--cache-dir", help="Cache the responses in this directory."
+    )
+    crawl_parser.add_argument(
+        "--state", help="The state file of the incremental mode (skip unchanged)."
+    )
+    crawl_parser.add_argument(
+        "--checkpoint", help="The SQLite file used to resume a stopped crawl."
+    )
+    crawl_parser.add_argument(
+        "--dedupe",
+        choices=("exact", "bloom"),
+        help="Drop the page URLs listed in several sitemaps.",
+    )
+    crawl_parser.add_argument(
+        "--respect-robots",
+        action="store_true",
+        help="Skip the sitemaps and URLs disallowed by robots.txt.",
+    )
+    crawl_parser.add_argument(
+        "--robots-user-agent", help="The user agent whose robots.txt rules apply."
+    )
+    crawl_parser.add_argument(
+        "--discover-links",
+        action="store_true",
+        help=(
+            "Follow the links of the HTML pages if there are no sitemaps "
+            "(not with --state or --checkpoint)."
+        ),
+    )
+    crawl_parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=3,
+        help="Max links followed from the Home URL (default: 3).",
+    )
+    crawl_parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=1000,
+        help="Max pages fetched following links (default: 1000).",
+    )
+    crawl_parser.add_argument(
+        "--metrics", help="Write the metrics of the crawl to this file (.json/.prom)."
+    )
+    crawl_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Crawl the sitemaps with this many processes, which share the "
+        "politeness budget of the website (default: 1).",
+    )
+    crawl_parser.add_argument(
+        "--work-queue",
+        help="The SQLite work queue of a sharded crawl, which other hosts can "
+        "join with the worker command (default: a file next to the output, "
+        "removed once the nodes are written).",
+    )
+    crawl_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the sharded crawl of the work queue instead of starting a "
+        "new one.",
+    )
+    crawl_parser.add_argument(
+        "-q", "--quiet", action="store_true", help="Only log warnings and errors."
+    )
+
+    worker_parser = subparsers.add_parser(
+        "worker",
+        help="Join a sharded crawl.",
+        description="Crawl the sitemaps of the work queue of a sharded crawl until "
+        "it is finished, e.g. from another host sharing its filesystem.",
+    )
+    worker_parser.add_argument("home_url", help="The Home URL of the website.")
+    worker_parser.add_argument(
+        "work_queue", help="The SQLite work queue of the sharded crawl."
+    )
+    worker_parser.add_argument(
+        "--share",
+        type=float,
+        default=1.0,
+        help="The fraction of the politeness budget used by this worker "
+        "(default: 1).",
+    )
+    worker_parser.add_argument(
+        "--sleep-time",
+        type=float,
+        default=2.0,
+        help="Initial secs between requests of the whole budget (default: 2).",
+    )
+    worker_parser.add_argument(
+        "--headers", help="The request headers, as a JSON object."
+    )
+    worker_parser.add_argument(
+        "--dedupe",
+        choices=("exact", "bloom"),
+        help="Drop the page URLs listed in several sitemaps crawled by this " "worker.",
+    )
+    worker_parser.add_argument(
+        "--respect-robots",
+        action="store_true",
+        help="Skip the sitemaps and URLs disallowed by robots.txt.",
+    )
+    worker_parser.add_argument(
+        "--robots-user-agent", help="The user agent whose robots.txt rules apply."
+    )
+    worker_parser.add_argument(
+        "-q", "--quiet", action="store_true", help="Only log warnings and errors."
+    )
+
+    diff_parser = subparsers.add_parser(
+        "diff",
+        help="Compare two crawl snapshots.",
+        description="Write the URLs added, removed and changed between two crawl "
+        "snapshots, as JSON Lines.",
+    )
+    diff_parser.add_argument("old", help="The snapshot of the old crawl.")
+    diff_parser.add_argument("new", help="The snapshot of the new crawl.")
+    diff_parser.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help="The output file, '-' for stdout (default: '-').",
+    )
+    diff_parser.add_argument(
+        "--fields",
+        default="lastmod,priority,changefreq",
+        help="The fields compared, separated by commas "
+        "(default: lastmod,priority,changefreq).",
+    )
+    return parser
+
+
+def _open_sink(path: str, output_format: str):
+    from mr_apollo_2n.utils import node_sinks
+
+    if output_format == "snapshot":
+        from mr_apollo_2n.utils.crawl_snapshot import SnapshotWriter
+
+        return SnapshotWriter(path)
+    if output_format == "store":
+        from mr_apollo_2n.utils.node_store import NodeStore
+
+        return NodeStore(path)
+    if output_format == "csv":
+        return node_sinks.CsvNodeSink(path)
+    if output_format == "sqlite":
+        return node_sinks.SqliteNodeSink(path)
+    if output_format == "parquet":
+        return node_sinks.ParquetNodeSink(path)
+    return node_sinks.JsonlNodeSink(path)
+
+
+def crawl(args: argparse.Namespace) -> int:
+    """
+    Runs the ``crawl`` command.
+
+    Returns
+    -------
+    int
+            The number of nodes written.
+    """
+    if args.workers > 1 or args.work_queue:
+        return _sharded_crawl(args)
+    if args.discover_links:
+        # The pages found by following the links are neither checkpointed nor
+        # recorded in the state, so these options would be silently ignored
+        unsupported = [
+            option
+            for option, value in (
+                ("--state", args.state),
+                ("--checkpoint", args.checkpoint),
+            )
+            if value
+        ]
+        if unsupported:
+            raise ValueError(
+                f"{', '.join(unsupported)} cannot be used with --discover-links."
+            )
+
+    metrics = None
+    if args.metrics:
+        from mr_apollo_2n.utils.metrics import MetricsRegistry
+
+        metrics = MetricsRegistry()
+
+    response_cache = None
+    if args.cache_dir:
+        from mr_apollo_2n.utils.response_cache import ResponseCache
+
+        response_cache = ResponseCache(args.cache_dir)
+
+    kwargs = dict(
+        request_headers=args.headers,
+        sleep_time=args.sleep_time,
+        response_cache=response_cache,
+        state_path=args.state,
+        dedupe_urls=args.dedupe,
+        metrics=metrics,
+        robots_user_agent=args.robots_user_agent,
+        respect_robots_txt=args.respect_robots,
+        checkpoint_path=args.checkpoint,
+    )
+    if args.discover_links:
+        from mr_apollo_2n.utils.link_discovery_crawler import \
+            LinkDiscoveryCrawler
+
+        crawler = LinkDiscoveryCrawler(
+            args.home_url,
+            max_depth=args.max_depth,
+            max_pages=args.max_pages,
+            **kwargs,
+        )
+    else:
+        from mr_apollo_2n.utils.website_node_crawler import WebsiteNodeCrawler
+
+        crawler = WebsiteNodeCrawler(args.home_url, **kwargs)
+
+    output_format = args.format
+    if output_format is None:
+        output_format = "jsonl" if args.output == "-" else _infer_format(args.output)
+    if args.output == "-" and output_format != "jsonl":
+        raise ValueError(f"The {output_format} format cannot be written to stdout.")
+
+    with _open_sink(args.output, output_format) as sink:
+        total_nodes = 0
+        if args.checkpoint:
+            from mr_apollo_2n.utils.crawl_checkpoint import CrawlCheckpoint
+
+            # A resumed crawl only yields the nodes crawled after the resume,
+            # so the ones of the previous runs are read from the checkpoint
+            with CrawlCheckpoint(args.checkpoint) as checkpoint:
+                for node in checkpoint.iter_nodes():
+                    sink.write(node)
+                    total_nodes += 1
+        total_nodes += crawler.export_nodes(sink, args.sitemap)
+
+    if metrics is not None:
+        with open(args.metrics, "w", encoding="utf-8") as file:
+            if args.metrics.endswith(".prom"):
+                file.write(metrics.to_prometheus())
+            else:
+                file.write(metrics.to_json(indent=2))
+    return total_nodes
+
+
+def _sharded_crawl(args: argparse.Namespace) -> int:
+    """
+    Runs the ``crawl`` command with several worker processes.
+    """
+    unsupported = [
+        option
+        for option, value in (
+            ("--cache-dir", args.cache_dir),
+            ("--state", args.state),
+            ("--checkpoint", args.checkpoint),
+            ("--discover-links", args.discover_links),
+            ("--metrics", args.metrics),
+        )
+        if value
+    ]
+    if unsupported:
+        raise ValueError(
+            f"{', '.join(unsupported)} cannot be used with a sharded crawl."
+        )
+    from mr_apollo_2n.utils.sharded_crawler import ShardedCrawler
+
+    output_format = args.format
+    if output_format is None:
+        output_format = "jsonl" if args.output == "-" else _infer_format(args.output)
+    if args.output == "-" and output_format != "jsonl":
+        raise ValueError(f"The {output_format} format cannot be written to stdout.")
+    queue_path = args.work_queue
+    if queue_path is None:
+        if args.output == "-":
+            raise ValueError("--work-queue is required to write to stdout.")
+        queue_path = args.output + ".queue"
+
+    crawler = ShardedCrawler(
+        args.home_url,
+        queue_path,
+        num_workers=args.workers,
+        crawler_kwargs=dict(
+            request_headers=args.headers,
+            sleep_time=args.sleep_time,
+            dedupe_urls=args.dedupe,
+            robots_user_agent=args.robots_user_agent,
+            respect_robots_txt=args.respect_robots,
+        ),
+    )
+    crawler.run([args.sitemap] if args.sitemap else None, resume=args.resume)
+    with _open_sink(args.output, output_format) as sink:
+        total_nodes = crawler.export_nodes(sink)
+    if args.work_queue is None:
+        for path in (queue_path, queue_path + "-wal", queue_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+    return total_nodes
+
+
+def worker(args: argparse.Namespace) -> int:
+    """
+    Runs the ``worker`` command.
+
+    Returns
+    -------
+    int
+            The number of sitemaps crawled.
+    """
+    from mr_apollo_2n.utils.sharded_crawler import run_worker
+
+    return run_worker(
+        args.work_queue,
+        args.home_url,
+        dict(
+            request_headers=args.headers,
+            sleep_time=args.sleep_time,
+            dedupe_urls=args.dedupe,
+            robots_user_agent=args.robots_user_agent,
+            respect_robots_txt=args.respect_robots,
+        ),
+        share=args.share,
+    )
+
+
+def diff(args: argparse.Namespace) -> int:
+    """
+    Runs the ``diff`` command.
+
+    Returns
+    -------
+    int
+            The number of changes written.
+    """
+    import json
+
+    from mr_apollo_2n.utils.crawl_snapshot import diff_snapshots
+
+    fields = [field.strip() for field in args.fields.split(",") if field.strip()]
+    output = (
+        sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    )
+    total_changes = 0
+    try:
+        for change in diff_snapshots(args.old, args.new, fields):
+            output.write(json.dumps(change.to_dict()) + "\n")
+            total_changes += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return total_changes
+
+
+COMMANDS = {"crawl": crawl, "worker": worker, "diff": diff}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point of the ``mr-apollo`` command.
+
+    Parameters
+    ----------
+    argv : Optional[List[str]], optional
+            The arguments of the command (default is ``sys.argv[1:]``).
+
+    Returns
+    -------
+    int
+            The exit status.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.version:
+        from mr_apollo_2n import __version__
+
+        print(__version__)
+        return 0
+    if args.command is None:
+        parser.print_help()
+        return 2
+    quiet = getattr(args, "quiet", False)
+    if quiet:
+        import logging
+
+        logging.disable(logging.INFO)
+    try:
+        COMMANDS[args.command](args)
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        print(f"mr-apollo: error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if quiet:
+            # main can be called from a program, whose logging is left as is
+            logging.disable(logging.NOTSET)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+import asyncio
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.base_class import THROTTLED
+from mr_apollo_2n.utils.seen_set import SeenSet
+from mr_apollo_2n.utils.website_node_crawler import (SITEMAP_ERRORS,
+                                                     WebsiteNodeCrawler)
+
+
+class AsyncWebsiteNodeCrawler(WebsiteNodeCrawler):
+    def __init__(
+        self,
+        home_url: str,
+        max_concurrency_per_host: Optional[int] = 4,
+        **kwargs,
+    ):
+        """
+        Crawls the sitemaps of a website fetching child sitemaps concurrently.
+
+        The blocking requests are executed in worker threads, and the number of
+        in-flight requests to the same host is bounded by a semaphore. The
+        results and parent links are the same as the ones built by
+        ``WebsiteNodeCrawler.process_sitemap``, and so are the metrics and the
+        URLs skipped with ``respect_robots_txt``.
+
+        Parameters
+        ----------
+        home_url : str
+                The Home URL of the website.
+        max_concurrency_per_host : Optional[int], optional
+                Max number of concurrent requests to the same host (default is 4).
+        **kwargs
+                The rest of the arguments accepted by ``WebsiteNodeCrawler``,
+                except ``state_path`` and ``checkpoint_path``, which need the
+                sitemaps to be crawled one at a time.
+
+        Raises
+        ------
+        ValueError
+                If ``state_path`` or ``checkpoint_path`` is set.
+        """
+        for name in ("state_path", "checkpoint_path"):
+            if kwargs.get(name):
+                raise ValueError(f"{name} is not supported by the async crawler.")
+        super().__init__(home_url, **kwargs)
+        if max_concurrency_per_host is None or max_concurrency_per_host < 1:
+            max_concurrency_per_host = 1
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._semaphores_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """
+        Returns the semaphore that bounds the concurrency of the host of the URL.
+
+        Parameters
+        ----------
+        url : str
+                The URL to be requested.
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphores_loop is not loop:
+            # Semaphores are bound to the loop that uses them first
+            self._host_semaphores = {}
+            self._semaphores_loop = loop
+        host = urlparse(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(
+                self.max_concurrency_per_host
+            )
+        return self._host_semaphores[host]
+
+    async def _is_allowed_async(self, url: str) -> bool:
+        """
+        Whether the URL can be crawled, according to ``respect_robots_txt``,
+        fetching the robots.txt file of its host in a worker thread.
+
+        Parameters
+        ----------
+        url : str
+                The URL to check.
+        """
+        if not self.respect_robots_txt:
+            return True
+        if urlparse(url).netloc not in self._robots_txt:
+            await asyncio.to_thread(self.get_robots_txt, url)
+        return self._is_allowed(url)
+
+    async def fetch_entries_async(self, url: str) -> List[Tuple[str, Dict]]:
+        """
+        Fetch the URL and parse its entries without blocking the event loop.
+
+        The sitemap is parsed incrementally with ``iter_sitemap_entries``, so
+        only the data of its entries is kept, not the parsed tree.
+
+        Parameters
+        ----------
+        url : str
+                The URL to fetch and parse.
+
+        Returns
+        -------
+        List[Tuple[str, Dict]]
+                The element type and the data of each entry.
+        """
+        async with self._get_host_semaphore(url):
+            # The rate limiter of the session paces the requests of each host
+            return await asyncio.to_thread(lambda: list(self.iter_sitemap_entries(url)))
+
+    async def _process_page_entries(
+        self,
+        parent_url: str,
+        entries: List[Tuple[str, Dict]],
+        seen_sitemaps: SeenSet,
+        seen_urls: Optional[SeenSet],
+        processed_elements: List[WebsiteNodeModel],
+        totals: Counter,
+    ) -> List[Tuple[str, Dict]]:
+        """
+        Adds the page URLs of a sitemap to the processed elements and returns
+        its child sitemaps not seen yet.
+
+        Parameters
+        ----------
+        parent_url : str
+                The URL of the sitemap.
+        entries : List[Tuple[str, Dict]]
+                The entries of the sitemap, as returned by ``fetch_entries_async``.
+        seen_sitemaps : SeenSet
+                The sitemaps seen in the crawl.
+        seen_urls : Optional[SeenSet]
+                The page URLs seen in the crawl, None to keep the duplicates.
+        processed_elements : List[WebsiteNodeModel]
+                The nodes of the crawl, extended with the page URLs.
+        totals : Counter
+                The counts of elements, duplicates and disallowed entries.
+
+        Returns
+        -------
+        List[Tuple[str, Dict]]
+                The parent URL and the data of each child sitemap.
+        """
+        meta = self._build_meta()
+        children = []
+        for element_type, url_data in entries:
+            loc = url_data.get("loc")
+            if loc is None:
+                continue
+            if not await self._is_allowed_async(loc):
+                totals["disallowed"] += 1
+                continue
+            seen = seen_sitemaps if element_type == "SITEMAP" else seen_urls
+            if seen is not None and not seen.add(loc):
+                totals["duplicates"] += 1
+                continue
+            if element_type == "SITEMAP":
+                children.append((parent_url, url_data))
+                continue
+            processed_elements.append(
+                self._build_node(url_data, parent_url, element_type, meta)
+            )
+            totals["elements"] += 1
+        return children
+
+    async def process_sitemap_async(
+        self,
+        url: str,
+        seen_sitemaps: Optional[SeenSet] = None,
+        seen_urls: Optional[SeenSet] = None,
+    ) -> Optional[List[WebsiteNodeModel]]:
+        """
+        Processes a sitemap and returns a list of WebsiteNodeModel objects.
+
+        The sitemap tree is walked level by level, and all the child sitemaps
+        of a level are fetched concurrently. Each child sitemap is processed as
+        soon as it and the ones listed before it are fetched, so the nodes are
+        in the order of ``WebsiteNodeCrawler.process_sitemap`` and the entries
+        of a child are released once processed. The child sitemaps that fail
+        with one of ``SITEMAP_ERRORS`` are logged and skipped, and the ones
+        already seen
+        are skipped, so repeated entries and cycles are walked only once.
+
+        Parameters
+        ----------
+        url : str
+                The URL of the sitemap to process.
+        seen_sitemaps : Optional[SeenSet], optional
+                The sitemaps seen in the crawl, which must include the root one
+                (default is a new set with the root sitemap).
+        seen_urls : Optional[SeenSet], optional
+                The page URLs seen in the crawl, used to skip the duplicates
+                (default is a new one, as set by ``dedupe_urls``).
+        """
+        if seen_sitemaps is None:
+            seen_sitemaps = SeenSet()
+            seen_sitemaps.add(url)
+        if seen_urls is None:
+            seen_urls = self.make_url_seen_set()
+        metrics = self.metrics
+        entries = await self.fetch_entries_async(url)
+        if metrics is not None:
+            metrics.inc("sitemap_pages_total")
+        if not entries:
+            self.logger.warning(f"Could not fetch or parse sitemap '{url}'.")
+            return None
+
+        processed_elements: List[WebsiteNodeModel] = []
+        totals: Counter = Counter()
+        children = await self._process_page_entries(
+            url, entries, seen_sitemaps, seen_urls, processed_elements, totals
+        )
+        del entries
+        self._record_level_metrics(totals, 0)
+
+        while children:
+            # Each item is the parent URL, the data and the fetch of a sitemap
+            pending = deque(
+                (
+                    parent_url,
+                    url_data,
+                    asyncio.ensure_future(self.fetch_entries_async(url_data["loc"])),
+                )
+                for parent_url, url_data in children
+            )
+            total_pages = len(pending)
+            next_children = []
+            totals = Counter()
+            total_sitemaps = total_failed = 0
+            try:
+                while pending:
+                    parent_url, url_data, fetch = pending.popleft()
+                    loc = url_data["loc"]
+                    try:
+                        entries = await fetch
+                    except SITEMAP_ERRORS as e:
+                        self.logger.warning(
+                            f"Skipping sitemap '{loc}', which could not be fetched "
+                            f"or parsed: {e}",
+                            extra=THROTTLED,
+                        )
+                        total_failed += 1
+                        continue
+                    # The child sitemaps that are empty are dropped
+                    if not entries:
+                        continue
+                    meta = self._build_meta()
+                    processed_elements.append(
+                        self._build_node(url_data, parent_url, "SITEMAP", meta)
+                    )
+                    total_sitemaps += 1
+                    next_children.extend(
+                        await self._process_page_entries(
+                            loc,
+                            entries,
+                            seen_sitemaps,
+                            seen_urls,
+                            processed_elements,
+                            totals,
+                        )
+                    )
+                    del entries
+            finally:
+                # Also reached when the crawl is cancelled
+                for _, _, fetch in pending:
+                    fetch.cancel()
+
+            if metrics is not None:
+                metrics.inc("sitemap_pages_total", total_pages - total_failed)
+                metrics.inc("failed_sitemap_pages_total", total_failed)
+            self._record_level_metrics(totals, total_sitemaps)
+            self.logger.info(
+                f"Processed {total_pages} pages of sitemap '{url}', "
+                f"total successful elements {totals['elements']} added, "
+                f"and enqueued {len(next_children)} elements."
+                + (f" Skipped {total_failed} failed pages." if total_failed else ""),
+                extra=THROTTLED,
+            )
+            children = next_children
+
+        self.logger.debug(
+            f"Total processed elements from sitemap '{url}': {len(processed_elements)}"
+        )
+        return processed_elements
+
+    def _record_level_metrics(self, totals: Counter, total_sitemaps: int):
+        """
+        Records the node counts of the pages of a level in the metrics.
+
+        Parameters
+        ----------
+        totals : Counter
+                The counts of elements, duplicates and disallowed entries.
+        total_sitemaps : int
+                The number of child sitemaps added.
+        """
+        metrics = self.metrics
+        if metrics is None:
+            return
+        metrics.inc("nodes_total", totals["elements"], element_type="URL")
+        metrics.inc("nodes_total", total_sitemaps, element_type="SITEMAP")
+        metrics.inc("duplicates_total", totals["duplicates"])
+        metrics.inc("disallowed_total", totals["disallowed"])
+
+    async def process_all_sitemaps_async(self) -> Optional[List[WebsiteNodeModel]]:
+        """
+        Process concurrently all the sitemaps listed in the robots.txt file.
+
+        The sitemaps that fail with one of ``SITEMAP_ERRORS`` are logged and
+        skipped. Any other error is raised once all the sitemaps are processed.
+
+        Returns
+        -------
+        List[WebsiteNodeModel]
+                A list of WebsiteNodeModel objects, in the order of the sitemaps
+                listed in the robots.txt file.
+        """
+        sitemaps = await asyncio.to_thread(self.extract_sitemaps)
+        if not sitemaps:
+            self.logger.warning("No sitemaps found.")
+            return None
+
+        seen_sitemaps, seen_urls = SeenSet(), self.make_url_seen_set()
+        sitemaps = [sm for sm in sitemaps if seen_sitemaps.add(sm)]
+        results = await asyncio.gather(
+            *(
+                self.process_sitemap_async(sm, seen_sitemaps, seen_urls)
+                for sm in sitemaps
+            ),
+            return_exceptions=True,
+        )
+        processed_elements = []
+        for sm, elements_from_sitemap in zip(sitemaps, results):
+            if isinstance(elements_from_sitemap, BaseException):
+                if not isinstance(elements_from_sitemap, SITEMAP_ERRORS):
+                    raise elements_from_sitemap
+                self.logger.warning(
+                    f"Failed to process sitemap '{sm}': {elements_from_sitemap}"
+                )
+            elif elements_from_sitemap:
+                processed_elements.extend(elements_from_sitemap)
+            else:
+                self.logger.warning(f"Failed to process sitemap '{sm}'.")
+
+        self.logger.info(
+            f"Total processed elements from all sitemaps: {len(processed_elements)}"
+        )
+        return processed_elements
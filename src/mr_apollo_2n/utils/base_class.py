@@ -1,5 +1,226 @@
+import atexit
 import logging
-from typing import Optional
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+
+LOG_FORMAT = "%(asctime)s [%(levelname)-5s] [%(name)-25s] - %(message)s"
+
+# The ``extra`` of the repetitive messages of the crawl loop, e.g. one per
+# sitemap page or per failed request, which the throttle filter applies to
+THROTTLED = {"throttled": True}
+
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, burst: int = 10, period: float = 60.0):
+        """
+        Lets through at most ``burst`` throttled records per call site every
+        ``period`` secs, and drops the rest.
+
+        The first record let through after some were dropped tells how many
+        were dropped. The records not marked with ``THROTTLED`` always pass.
+
+        Parameters
+        ----------
+        burst : int, optional
+                The max records of a call site per period (default is 10).
+        period : float, optional
+                The length of a period in secs (default is 60).
+        """
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self._lock = threading.Lock()
+        # The start of the current period, the records let through and dropped
+        self._sites: Dict[Tuple[str, int], List] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "throttled", False):
+            return True
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.setdefault((record.pathname, record.lineno), [now, 0, 0])
+            if now - site[0] >= self.period:
+                site[0], site[1] = now, 0
+            if site[1] >= self.burst:
+                site[2] += 1
+                return False
+            site[1] += 1
+            dropped, site[2] = site[2], 0
+        if dropped:
+            _append_dropped(record, dropped)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate: int = 100):
+        """
+        Lets through one of every ``rate`` throttled records per call site,
+        starting with the first one.
+
+        The records not marked with ``THROTTLED`` always pass.
+
+        Parameters
+        ----------
+        rate : int, optional
+                The sampling rate (default is 100).
+        """
+        super().__init__()
+        self.rate = max(1, rate)
+        self._lock = threading.Lock()
+        self._counts: Dict[Tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "throttled", False):
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % self.rate:
+            return False
+        if count:
+            _append_dropped(record, self.rate - 1)
+        return True
+
+
+def _append_dropped(record: logging.LogRecord, dropped: int):
+    record.msg = f"{record.getMessage()} ({dropped} similar messages dropped)"
+    record.args = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves the formatting of the records to the listener
+    thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now, as they may change before being formatted
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class _LogPipeline:
+    """
+    The queue shared by the loggers of all the BaseClass objects, and the
+    listener thread that formats and writes its records.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.handler = _DeferredQueueHandler(self.queue)
+        self.handlers: List[logging.Handler] = [self._console_handler()]
+        self.listener: Optional[QueueListener] = None
+
+    @staticmethod
+    def _console_handler() -> logging.Handler:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.DEBUG)
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        return console_handler
+
+    def attach(self, logger: logging.Logger):
+        """
+        Routes the records of the logger to the queue, once, and starts the
+        listener if it is not running.
+        """
+        with self._lock:
+            if self.handler not in logger.handlers:
+                logger.addHandler(self.handler)
+            if self.listener is None:
+                self._start()
+
+    def configure(
+        self,
+        handlers: Optional[List[logging.Handler]],
+        throttle: Optional[logging.Filter],
+    ):
+        with self._lock:
+            if handlers is not None:
+                running = self.listener is not None
+                self._stop()
+                self.handlers = list(handlers)
+                if running:
+                    self._start()
+            for log_filter in list(self.handler.filters):
+                self.handler.removeFilter(log_filter)
+            if throttle is not None:
+                self.handler.addFilter(throttle)
+
+    def stop(self):
+        with self._lock:
+            self._stop()
+
+    def flush(self):
+        with self._lock:
+            if self.listener is not None:
+                self._stop()
+                self._start()
+
+    def _start(self):
+        self.listener = QueueListener(
+            self.queue, *self.handlers, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def _stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+        self.listener = None
+
+    def reset_after_fork(self):
+        """
+        Replaces the queue and the listener thread in a forked process, where
+        the thread of the parent does not run.
+        """
+        running = self.listener is not None
+        self._lock = threading.Lock()
+        self.queue = queue.SimpleQueue()
+        self.handler.queue = self.queue
+        self.listener = None
+        if running:
+            self._start()
+
+
+_pipeline = _LogPipeline()
+atexit.register(_pipeline.stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_pipeline.reset_after_fork)
+
+
+def configure_logging(
+    handlers: Optional[List[logging.Handler]] = None,
+    throttle: Optional[logging.Filter] = None,
+):
+    """
+    Configures the output of the loggers of the BaseClass objects.
+
+    Parameters
+    ----------
+    handlers : Optional[List[logging.Handler]], optional
+            The handlers that write the records, in the listener thread
+            (default is None, which keeps the current ones: a console handler
+            unless configured otherwise).
+    throttle : Optional[logging.Filter], optional
+            The filter of the repetitive messages of the crawl loop, e.g. a
+            RateLimitFilter or a SamplingFilter (default is None, which writes
+            all of them).
+    """
+    _pipeline.configure(handlers, throttle)
+
+
+def flush_logging():
+    """
+    Waits until the listener thread has written the queued records.
+    """
+    _pipeline.flush()
 
 
 class BaseClass:
@@ -7,6 +228,9 @@ class BaseClass:
     Base class with a logger attribute.
 
     This class provides a logger attribute that can be used for logging in derived classes.
+    The records are queued and formatted and written by a single listener thread, so logging
+    does not block the crawl, and the handler of a logger is attached only once however many
+    objects share it.
 
     Attributes:
             logger (logging.Logger): The logger object for logging.
@@ -32,17 +256,5 @@ class BaseClass:
         self.logger = logging.getLogger(logger_name or self.__class__.__name__)
         self.logger.setLevel(log_level if log_level is not None else logging.DEBUG)
 
-        # Configure a console handler to view logs in the console
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(
-            logging.DEBUG
-        )  # Set the console handler's logging level to DEBUG
-
-        # Define a log format for the logs
-        log_format = logging.Formatter(
-            "%(asctime)s [%(levelname)-5s] [%(name)-25s] - %(message)s"
-        )
-        console_handler.setFormatter(log_format)
-
-        # Add the console handler to the logger
-        self.logger.addHandler(console_handler)
+        # Route the logs to the shared queue, whose listener writes them to the console
+        _pipeline.attach(self.logger)
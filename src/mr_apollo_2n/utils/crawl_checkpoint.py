@@ -0,0 +1,284 @@
+import json
+import sqlite3
+from typing import Iterable, Iterator, List, Optional, Protocol, Tuple
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.node_sinks import (NODE_FIELDS, node_to_record,
+                                           record_to_node)
+
+# A sitemap to be crawled: its loc, its parent ('' for a root) and its lastmod
+FrontierItem = Tuple[str, str, Optional[str]]
+
+
+class SitemapFrontier(Protocol):
+    """
+    Queue of the sitemaps of a tree to be crawled by
+    ``WebsiteNodeCrawler.iter_sitemap_nodes``, which is told when each
+    sitemap is crawled.
+
+    The crawler pops a sitemap, appends its child sitemaps, and then calls
+    ``complete`` with the nodes emitted for it, or ``rollback`` if the crawl
+    of the sitemap fails or is stopped.
+    """
+
+    def __bool__(self) -> bool: ...
+
+    def popleft(self) -> FrontierItem: ...
+
+    def append(self, item: FrontierItem): ...
+
+    def complete(self, loc: str, nodes: List[WebsiteNodeModel]): ...
+
+    def rollback(self): ...
+
+
+class SqliteFrontier:
+    """
+    Queue of the sitemaps of a root sitemap still to be crawled, stored in a
+    ``CrawlCheckpoint``.
+
+    It is the ``SitemapFrontier`` of a checkpointed crawl. A sitemap stays in
+    the queue until it is completed, so the sitemap being crawled when the
+    process stops is crawled again on resume.
+    """
+
+    def __init__(self, checkpoint: "CrawlCheckpoint", root: str):
+        self.checkpoint = checkpoint
+        self.root = root
+
+    def append(self, item: FrontierItem):
+        """
+        Adds a sitemap to the queue.
+
+        Parameters
+        ----------
+        item : FrontierItem
+                The loc, the parent and the lastmod of the sitemap.
+        """
+        loc, parent, lastmod = item
+        self.checkpoint._connection.execute(
+            "INSERT OR IGNORE INTO sitemaps (loc, parent, lastmod, root) "
+            "VALUES (?, ?, ?, ?)",
+            (loc, parent, lastmod, self.root),
+        )
+
+    def popleft(self) -> FrontierItem:
+        """
+        Returns the first sitemap of the queue.
+        """
+        row = self.checkpoint._connection.execute(
+            "SELECT loc, parent, lastmod FROM sitemaps "
+            "WHERE root = ? AND done = 0 ORDER BY id LIMIT 1",
+            (self.root,),
+        ).fetchone()
+        if row is None:
+            raise IndexError("pop from an empty frontier")
+        return row
+
+    def __len__(self) -> int:
+        return self.checkpoint._connection.execute(
+            "SELECT COUNT(*) FROM sitemaps WHERE root = ? AND done = 0", (self.root,)
+        ).fetchone()[0]
+
+    def __bool__(self) -> bool:
+        return (
+            self.checkpoint._connection.execute(
+                "SELECT 1 FROM sitemaps WHERE root = ? AND done = 0 LIMIT 1",
+                (self.root,),
+            ).fetchone()
+            is not None
+        )
+
+    def complete(self, loc: str, nodes: List[WebsiteNodeModel]):
+        """
+        Checkpoints a crawled sitemap with its nodes, see
+        ``CrawlCheckpoint.complete``.
+        """
+        self.checkpoint.complete(loc, nodes)
+
+    def rollback(self):
+        """
+        Discards the changes since the last checkpoint.
+        """
+        self.checkpoint.rollback()
+
+
+class CrawlCheckpoint:
+    def __init__(self, path: str):
+        """
+        Persistent state of a crawl, used to resume it after a stop.
+
+        It is a SQLite database in WAL mode with the root sitemaps of the
+        crawl, the frontier of sitemaps still to be crawled, the completed
+        ones and the nodes emitted. Each sitemap is checkpointed in a single
+        transaction when it is complete, together with its nodes and its child
+        sitemaps, so a stopped crawl resumes at the first incomplete sitemap.
+        A crawl that finished yields nothing when it is run again with the same
+        checkpoint, whose nodes are read with ``iter_nodes``.
+
+        Parameters
+        ----------
+        path : str
+                The path of the database file, created if missing.
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS crawl (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sitemaps ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, loc TEXT UNIQUE NOT NULL, "
+                "parent TEXT, lastmod TEXT, root TEXT NOT NULL, "
+                "done INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS sitemaps_frontier "
+                "ON sitemaps (root, done, id)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS nodes ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "loc TEXT, domain TEXT, parent TEXT, element_type TEXT, "
+                "lastmod TEXT, priority REAL, changefreq TEXT, "
+                "properties TEXT, meta TEXT)"
+            )
+
+    @property
+    def roots(self) -> List[str]:
+        """
+        The root sitemaps of the crawl, empty if it was not started.
+        """
+        row = self._connection.execute(
+            "SELECT value FROM crawl WHERE key = 'roots'"
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else []
+
+    def add_roots(self, locs: Iterable[str]):
+        """
+        Adds root sitemaps to the crawl, queuing the new ones.
+
+        Parameters
+        ----------
+        locs : Iterable[str]
+                The URLs of the root sitemaps.
+        """
+        roots = list(dict.fromkeys(self.roots + list(locs)))
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO crawl (key, value) VALUES ('roots', ?)",
+                (json.dumps(roots),),
+            )
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO sitemaps (loc, parent, lastmod, root) "
+                "VALUES (?, '', NULL, ?)",
+                ((loc, loc) for loc in roots),
+            )
+
+    def frontier(self, root: str) -> SqliteFrontier:
+        """
+        Returns the queue of the sitemaps of a root sitemap to be crawled.
+
+        Parameters
+        ----------
+        root : str
+                The URL of the root sitemap.
+        """
+        return SqliteFrontier(self, root)
+
+    def is_root_done(self, root: str) -> bool:
+        """
+        Whether the tree of a root sitemap was completely crawled.
+
+        Parameters
+        ----------
+        root : str
+                The URL of the root sitemap.
+        """
+        row = self._connection.execute(
+            "SELECT done FROM sitemaps WHERE loc = ?", (root,)
+        ).fetchone()
+        return bool(row and row[0]) and not self.frontier(root)
+
+    def complete(self, loc: str, nodes: List[WebsiteNodeModel]):
+        """
+        Checkpoints a crawled sitemap with its nodes.
+
+        The child sitemaps appended to the frontier since the previous
+        checkpoint are committed in the same transaction.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the sitemap.
+        nodes : List[WebsiteNodeModel]
+                The nodes emitted for the sitemap.
+        """
+        placeholders = ", ".join(f":{field}" for field in NODE_FIELDS)
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT INTO nodes ({', '.join(NODE_FIELDS)}) "
+                f"VALUES ({placeholders})",
+                (node_to_record(node) for node in nodes),
+            )
+            self._connection.execute(
+                "UPDATE sitemaps SET done = 1 WHERE loc = ?", (loc,)
+            )
+
+    def rollback(self):
+        """
+        Discards the changes since the last checkpoint.
+        """
+        self._connection.rollback()
+
+    def iter_sitemap_locs(self) -> Iterator[str]:
+        """
+        Yields the URLs of all the sitemaps of the crawl, crawled or not.
+        """
+        for (loc,) in self._connection.execute("SELECT loc FROM sitemaps"):
+            yield loc
+
+    def iter_node_locs(self, element_type: Optional[str] = None) -> Iterator[str]:
+        """
+        Yields the URLs of the nodes emitted.
+
+        Parameters
+        ----------
+        element_type : Optional[str], optional
+                Only yield the nodes of this type (default is None).
+        """
+        query, params = "SELECT loc FROM nodes", ()
+        if element_type is not None:
+            query, params = query + " WHERE element_type = ?", (element_type,)
+        for (loc,) in self._connection.execute(query, params):
+            yield loc
+
+    def iter_nodes(self) -> Iterator[WebsiteNodeModel]:
+        """
+        Yields the nodes emitted by the crawl, in order of emission.
+
+        The datetimes of the meta dicts are read back as ISO 8601 strings.
+        """
+        cursor = self._connection.execute(
+            f"SELECT {', '.join(NODE_FIELDS)} FROM nodes ORDER BY id"
+        )
+        for row in cursor:
+            yield record_to_node(dict(zip(NODE_FIELDS, row)))
+
+    def __len__(self) -> int:
+        """
+        The number of nodes emitted.
+        """
+        return self._connection.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,230 @@
+import gzip
+import heapq
+import os
+import tempfile
+from typing import IO, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.node_sinks import NodeSink
+
+SNAPSHOT_HEADER = "#mr_apollo_snapshot v1"
+SNAPSHOT_FIELDS = ("loc", "element_type", "lastmod", "priority", "changefreq", "parent")
+DIFF_FIELDS = ("lastmod", "priority", "changefreq")
+
+# The separators of the format, replaced in the values
+_ESCAPES = str.maketrans({"\t": " ", "\n": " ", "\r": " "})
+
+
+class SnapshotEntry(NamedTuple):
+    """
+    A node of a crawl snapshot, with its values as strings ('' if missing).
+    """
+
+    loc: str
+    element_type: str
+    lastmod: str
+    priority: str
+    changefreq: str
+    parent: str
+
+
+class SnapshotChange(NamedTuple):
+    """
+    A difference between two crawl snapshots.
+
+    Attributes:
+            kind (str): 'added', 'removed' or 'changed'.
+            loc (str): The URL of the node.
+            old (Optional[SnapshotEntry]): The node in the old snapshot.
+            new (Optional[SnapshotEntry]): The node in the new snapshot.
+            fields (Tuple[str, ...]): The fields that changed.
+    """
+
+    kind: str
+    loc: str
+    old: Optional[SnapshotEntry]
+    new: Optional[SnapshotEntry]
+    fields: Tuple[str, ...] = ()
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "loc": self.loc,
+            "old": self.old._asdict() if self.old is not None else None,
+            "new": self.new._asdict() if self.new is not None else None,
+            "fields": list(self.fields),
+        }
+
+
+def _open_text(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="\n")  # type: ignore
+    return open(path, mode, encoding="utf-8", newline="\n")
+
+
+def _escape(value: str) -> str:
+    if "\t" in value or "\n" in value or "\r" in value:
+        return value.translate(_ESCAPES)
+    return value
+
+
+def node_to_line(node: WebsiteNodeModel) -> str:
+    """
+    Returns the line of a node in a crawl snapshot.
+
+    The values are separated by tabs with the loc first, so sorting the lines
+    sorts the nodes by loc.
+
+    Parameters
+    ----------
+    node : WebsiteNodeModel
+            The node.
+    """
+    lastmod = node.lastmod
+    values = (
+        _escape(node.loc),
+        node.element_type,
+        lastmod.isoformat() if lastmod is not None else "",
+        repr(node.priority) if node.priority is not None else "",
+        _escape(node.changefreq or ""),
+        _escape(node.parent),
+    )
+    return "\t".join(values) + "\n"
+
+
+class SnapshotWriter(NodeSink):
+    def __init__(
+        self,
+        path: str,
+        run_size: int = 200_000,
+        batch_size: Optional[int] = 1000,
+    ):
+        """
+        Writes the nodes of a crawl to a snapshot sorted by loc, to be diffed
+        with ``diff_snapshots``.
+
+        The snapshot is a text file, gzipped if the path ends with '.gz',
+        with a header line and a tab-separated line per node. The nodes are
+        sorted with an external merge sort: every ``run_size`` nodes are
+        sorted in memory and written to a temporary run file, and the runs are
+        merged into the snapshot when the writer is closed. The nodes with the
+        same loc are written once.
+
+        Parameters
+        ----------
+        path : str
+                The path of the snapshot.
+        run_size : int, optional
+                The max number of nodes sorted in memory (default is 200000).
+        batch_size : Optional[int], optional
+                The number of nodes encoded at once (default is 1000).
+        """
+        super().__init__(batch_size)
+        self.path = path
+        self.run_size = max(1, run_size)
+        self._lines: List[str] = []
+        self._runs: List[str] = []
+        self._run_dir = os.path.dirname(os.path.abspath(path))
+
+    def _write_batch(self, nodes: List[WebsiteNodeModel]):
+        self._lines.extend(node_to_line(node) for node in nodes)
+        if len(self._lines) >= self.run_size:
+            self._write_run()
+
+    def _write_run(self):
+        self._lines.sort()
+        fd, run_path = tempfile.mkstemp(
+            prefix=".snapshot_run_", suffix=".tsv", dir=self._run_dir
+        )
+        self._runs.append(run_path)
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as file:
+            file.writelines(self._lines)
+        self._lines = []
+
+    def _close(self):
+        self._lines.sort()
+        runs = [
+            open(run_path, encoding="utf-8", newline="\n") for run_path in self._runs
+        ]
+        try:
+            with _open_text(self.path, "w") as file:
+                file.write(SNAPSHOT_HEADER + "\n")
+                previous_loc = None
+                for line in heapq.merge(self._lines, *runs):
+                    loc = line[: line.index("\t")]
+                    if loc != previous_loc:
+                        file.write(line)
+                        previous_loc = loc
+        finally:
+            for run in runs:
+                run.close()
+            for run_path in self._runs:
+                os.remove(run_path)
+            self._lines, self._runs = [], []
+
+
+def iter_snapshot(path: str) -> Iterator[SnapshotEntry]:
+    """
+    Yields the nodes of a crawl snapshot, sorted by loc.
+
+    Parameters
+    ----------
+    path : str
+            The path of the snapshot.
+
+    Raises
+    ------
+    ValueError
+            If the file is not a crawl snapshot.
+    """
+    with _open_text(path, "r") as file:
+        header = file.readline().rstrip("\n")
+        if header != SNAPSHOT_HEADER:
+            raise ValueError(f"'{path}' is not a crawl snapshot.")
+        for line in file:
+            yield SnapshotEntry(*line.rstrip("\n").split("\t"))
+
+
+def diff_snapshots(
+    old_path: str, new_path: str, fields: Sequence[str] = DIFF_FIELDS
+) -> Iterator[SnapshotChange]:
+    """
+    Yields the changes between two crawl snapshots, sorted by loc.
+
+    The snapshots are merged as they are read, so the memory used does not
+    depend on their size.
+
+    Parameters
+    ----------
+    old_path : str
+            The path of the old snapshot.
+    new_path : str
+            The path of the new snapshot.
+    fields : Sequence[str], optional
+            The fields compared for the nodes in both snapshots (default is
+            lastmod, priority and changefreq).
+
+    Raises
+    ------
+    ValueError
+            If a field is not a field of the snapshots.
+    """
+    invalid = set(fields) - set(SNAPSHOT_FIELDS[1:])
+    if invalid:
+        raise ValueError(f"Invalid fields: {', '.join(sorted(invalid))}.")
+    indexes = [SNAPSHOT_FIELDS.index(field) for field in fields]
+
+    old_entries, new_entries = iter_snapshot(old_path), iter_snapshot(new_path)
+    old, new = next(old_entries, None), next(new_entries, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old.loc < new.loc):
+            yield SnapshotChange("removed", old.loc, old, None)  # type: ignore
+            old = next(old_entries, None)
+        elif old is None or new.loc < old.loc:
+            yield SnapshotChange("added", new.loc, None, new)
+            new = next(new_entries, None)
+        else:
+            changed = tuple(SNAPSHOT_FIELDS[i] for i in indexes if old[i] != new[i])
+            if changed:
+                yield SnapshotChange("changed", new.loc, old, new, changed)
+            old, new = next(old_entries, None), next(new_entries, None)
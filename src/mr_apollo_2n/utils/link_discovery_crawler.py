@@ -0,0 +1,307 @@
+import heapq
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                wait)
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.base_class import THROTTLED
+from mr_apollo_2n.utils.seen_set import SeenSet
+from mr_apollo_2n.utils.utils import normalize_url
+from mr_apollo_2n.utils.website_node_crawler import WebsiteNodeCrawler
+
+# Extensions of the resources that are not HTML pages, which are not fetched
+NON_HTML_EXTENSIONS = frozenset(
+    (
+        ".7z .avi .bmp .css .csv .doc .docx .exe .gif .gz .ico .jpeg .jpg .js "
+        ".json .mov .mp3 .mp4 .pdf .png .ppt .pptx .rar .rss .svg .tar .tgz "
+        ".txt .wav .webm .webp .woff .woff2 .xls .xlsx .xml .zip"
+    ).split()
+)
+
+
+class LinkExtractor(HTMLParser):
+    """
+    Collects the links of an HTML page.
+
+    The ``href`` of the ``<a>`` and ``<area>`` tags are resolved against the
+    ``<base>`` of the page, if any, and the links with ``rel="nofollow"`` are
+    ignored, as are all the links of a page with a ``nofollow`` robots meta
+    tag.
+
+    Attributes:
+            base_url (str): The URL the relative links are resolved against.
+            links (List[str]): The absolute URLs of the links, in order.
+            nofollow (bool): Whether the page asks not to follow its links.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.links: List[str] = []
+        self.nofollow = False
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
+        if tag not in ("a", "area", "base", "meta"):
+            return
+        attributes = {name: value or "" for name, value in attrs}
+        if tag == "base":
+            if attributes.get("href"):
+                self.base_url = urljoin(self.base_url, attributes["href"])
+        elif tag == "meta":
+            if attributes.get("name", "").lower() == "robots":
+                self.nofollow = "nofollow" in attributes.get("content", "").lower()
+        elif (
+            attributes.get("href")
+            and "nofollow" not in attributes.get("rel", "").lower().split()
+        ):
+            self.links.append(urljoin(self.base_url, attributes["href"].strip()))
+
+
+def extract_links(html: str, base_url: str) -> List[str]:
+    """
+    Returns the HTTP links of an HTML page, without fragments or duplicates.
+
+    Parameters
+    ----------
+    html : str
+            The content of the page.
+    base_url : str
+            The URL of the page.
+    """
+    extractor = LinkExtractor(base_url)
+    try:
+        extractor.feed(html)
+        extractor.close()
+    except Exception:  # noqa
+        # Keep the links found before the malformed markup
+        pass
+    if extractor.nofollow:
+        return []
+    links = (
+        normalize_url(link)
+        for link in extractor.links
+        if urlparse(link).scheme in ("http", "https")
+    )
+    return list(dict.fromkeys(links))
+
+
+class LinkDiscoveryCrawler(WebsiteNodeCrawler):
+    def __init__(
+        self,
+        home_url: str,
+        max_depth: int = 3,
+        max_pages: int = 1000,
+        max_workers: int = 4,
+        include_subdomains: bool = False,
+        **kwargs,
+    ):
+        """
+        Maps a website by following the links of its HTML pages.
+
+        The crawl starts at ``home_url`` and follows the links to the same
+        domain. The frontier is a priority queue of the pages not fetched yet,
+        the shallowest first, and every URL is queued once. The pages are
+        fetched concurrently by ``max_workers`` threads, paced by the rate
+        limiter, until the depth or the page budget is exhausted.
+
+        Parameters
+        ----------
+        home_url : str
+                The Home URL of the website, where the crawl starts.
+        max_depth : int, optional
+                The max number of links followed from the Home URL (default is
+                3).
+        max_pages : int, optional
+                The max number of pages fetched (default is 1000).
+        max_workers : int, optional
+                The number of pages fetched at the same time (default is 4).
+        include_subdomains : bool, optional
+                Whether to follow the links to the subdomains of the domain of
+                the Home URL (default is False).
+        **kwargs
+                The parameters of WebsiteNodeCrawler. ``respect_robots_txt`` is
+                True by default.
+        """
+        kwargs.setdefault("respect_robots_txt", True)
+        super().__init__(home_url, **kwargs)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_workers = max(1, max_workers)
+        self.include_subdomains = include_subdomains
+        self.domain = self._strip_www(urlparse(home_url).netloc.lower())
+
+    @staticmethod
+    def _strip_www(host: str) -> str:
+        return host[4:] if host.startswith("www.") else host
+
+    def is_internal(self, url: str) -> bool:
+        """
+        Whether the URL belongs to the website.
+
+        Parameters
+        ----------
+        url : str
+                The URL to check.
+        """
+        host = self._strip_www(urlparse(url).netloc.lower())
+        return host == self.domain or (
+            self.include_subdomains and host.endswith("." + self.domain)
+        )
+
+    def _should_fetch(self, url: str) -> bool:
+        path = urlparse(url).path.lower()
+        extension = path[path.rfind(".") :] if "." in path.rsplit("/", 1)[-1] else ""
+        return (
+            extension not in NON_HTML_EXTENSIONS
+            and self.is_internal(url)
+            and self._is_allowed(url)
+        )
+
+    def fetch_links(self, url: str) -> List[str]:
+        """
+        Fetches an HTML page and returns its links.
+
+        Parameters
+        ----------
+        url : str
+                The URL of the page.
+        """
+        content = self.session_request.exec_request(url)
+        return extract_links(content or "", url)
+
+    def iter_page_nodes(
+        self, start_url: Optional[str] = None
+    ) -> Iterator[WebsiteNodeModel]:
+        """
+        Yields a node for every page fetched, as soon as it is fetched.
+
+        Parameters
+        ----------
+        start_url : Optional[str], optional
+                The URL of the first page (default is the Home URL).
+
+        Yields
+        ------
+        WebsiteNodeModel
+                The pages of the website, with the element type 'PAGE', the
+                page that first linked to them as parent ('' for the start
+                page) and their depth in the ``depth`` property.
+        """
+        start_url = normalize_url(start_url or self.home_url)
+        seen = SeenSet()
+        seen.add(start_url)
+        # Each item is the depth, the order of discovery, the URL and the parent
+        frontier: List[Tuple[int, int, str, str]] = [(0, 0, start_url, "")]
+        total_discovered = 1
+        total_fetched = 0
+        total_failed = 0
+        meta = self._build_meta(discovered_by="links")
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="link_discovery"
+        ) as executor:
+            running: Dict[Future, Tuple[int, str, str]] = {}
+            while frontier or running:
+                while (
+                    frontier
+                    and len(running) < self.max_workers
+                    and total_fetched + len(running) < self.max_pages
+                ):
+                    depth, _, url, parent = heapq.heappop(frontier)
+                    running[executor.submit(self.fetch_links, url)] = (
+                        depth,
+                        url,
+                        parent,
+                    )
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth, url, parent = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        total_failed += 1
+                        self.logger.warning(
+                            f"Failed to fetch page '{url}': {error}", extra=THROTTLED
+                        )
+                        continue
+                    total_fetched += 1
+                    yield WebsiteNodeModel(url, parent, "PAGE", {"depth": depth}, meta)
+                    if depth >= self.max_depth:
+                        continue
+                    for link in future.result():
+                        if self._should_fetch(link) and seen.add(link):
+                            heapq.heappush(
+                                frontier, (depth + 1, total_discovered, link, url)
+                            )
+                            total_discovered += 1
+
+            for future in running:
+                future.cancel()
+
+        self.logger.info(
+            f"Fetched {total_fetched} pages of '{start_url}', "
+            f"{total_failed} failed and {len(frontier)} left in the frontier."
+        )
+
+    def process_links(
+        self, start_url: Optional[str] = None
+    ) -> Optional[List[WebsiteNodeModel]]:
+        """
+        Maps the website by following links and returns its pages.
+
+        Parameters
+        ----------
+        start_url : Optional[str], optional
+                The URL of the first page (default is the Home URL).
+        """
+        processed_elements = list(self.iter_page_nodes(start_url))
+        if not processed_elements:
+            self.logger.warning(f"Could not fetch '{start_url or self.home_url}'.")
+            return None
+        return processed_elements
+
+    def iter_nodes(self, url: Optional[str] = None) -> Iterator[WebsiteNodeModel]:
+        """
+        Yields the nodes of the sitemaps listed in the robots.txt file, or of
+        the pages linked from the Home URL if the website has none.
+
+        Only a robots.txt file that cannot be read or lists no sitemaps falls
+        back to link discovery, the errors of the sitemap crawl are raised.
+
+        Parameters
+        ----------
+        url : Optional[str], optional
+                The URL of the sitemap to process. By default all the sitemaps
+                listed in the robots.txt file are processed.
+        """
+        if url is not None:
+            yield from super().iter_nodes(url)
+            return
+        try:
+            sitemaps = self.extract_sitemaps()
+        except Exception as e:
+            self.logger.warning(f"Could not read the sitemaps: {e}")
+            sitemaps = None
+        if sitemaps:
+            yield from self._iter_crawl(sitemaps)
+        else:
+            self.logger.info("No sitemaps found, falling back to link discovery.")
+            yield from self.iter_page_nodes()
+
+    def process_all_sitemaps(self) -> Optional[List[WebsiteNodeModel]]:
+        """
+        Processes all the sitemaps listed in the robots.txt file, or follows
+        the links from the Home URL if the website has none.
+
+        Returns
+        -------
+        List[WebsiteNodeModel]
+                A list of WebsiteNodeModel objects.
+        """
+        processed_elements = list(self.iter_nodes())
+        self.logger.info(f"Total processed elements: {len(processed_elements)}")
+        return processed_elements or None
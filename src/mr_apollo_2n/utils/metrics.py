@@ -0,0 +1,283 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra is not None else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """
+    Distribution of observed values, in cumulative buckets.
+
+    Attributes:
+            buckets (Sequence[float]): The upper bounds of the buckets.
+            counts (List[int]): The number of values of each bucket.
+            count (int): The number of values observed.
+            sum (float): The sum of the values observed.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative_counts(self) -> List[int]:
+        total = 0
+        cumulative = []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "mean": self.sum / self.count if self.count else None,
+            "buckets": dict(zip(map(str, self.buckets), self.cumulative_counts())),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: Optional[str] = "mr_apollo"):
+        """
+        Thread-safe registry of the counters, gauges and histograms of a crawl.
+
+        The components record their metrics only when a registry is given to
+        them, so the instrumentation costs a ``None`` check when it is
+        disabled. Derive from this class to forward the metrics to another
+        system, or read a snapshot with ``to_json`` or ``to_prometheus``.
+
+        Parameters
+        ----------
+        prefix : Optional[str], optional
+                The prefix of the metric names in the Prometheus text format
+                (default is 'mr_apollo').
+        """
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Adds a value to a counter.
+
+        Parameters
+        ----------
+        name : str
+                The name of the counter.
+        value : float, optional
+                The value to add (default is 1).
+        **labels
+                The labels of the counter.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """
+        Sets the value of a gauge.
+
+        Parameters
+        ----------
+        name : str
+                The name of the gauge.
+        value : float
+                The value of the gauge.
+        **labels
+                The labels of the gauge.
+        """
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Adds a value to a histogram.
+
+        Parameters
+        ----------
+        name : str
+                The name of the histogram.
+        value : float
+                The observed value, e.g. secs.
+        **labels
+                The labels of the histogram.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """
+        Observes the secs spent in the block in a histogram.
+
+        Parameters
+        ----------
+        name : str
+                The name of the histogram.
+        **labels
+                The labels of the histogram.
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, **labels)
+
+    def get(self, name: str, **labels) -> Optional[float]:
+        """
+        Returns the value of a counter or a gauge, None if it was not recorded.
+
+        Parameters
+        ----------
+        name : str
+                The name of the counter or the gauge.
+        **labels
+                The labels of the counter or the gauge.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            for metrics in (self._counters, self._gauges):
+                if key in metrics.get(name, {}):
+                    return metrics[name][key]
+        return None
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        """
+        Returns a histogram, None if it was not recorded.
+
+        Parameters
+        ----------
+        name : str
+                The name of the histogram.
+        **labels
+                The labels of the histogram.
+        """
+        with self._lock:
+            return self._histograms.get(name, {}).get(_label_key(labels))
+
+    def snapshot(self) -> Dict:
+        """
+        Returns the current value of all the metrics.
+
+        Returns
+        -------
+        Dict
+                The counters, gauges and histograms, by name, as lists of
+                ``{"labels": ..., "value": ...}``.
+        """
+
+        def series(metrics, to_value):
+            return {
+                name: [
+                    {"labels": dict(key), "value": to_value(value)}
+                    for key, value in values.items()
+                ]
+                for name, values in sorted(metrics.items())
+            }
+
+        with self._lock:
+            return {
+                "counters": series(self._counters, lambda value: value),
+                "gauges": series(self._gauges, lambda value: value),
+                "histograms": series(self._histograms, Histogram.to_dict),
+            }
+
+    def to_json(self, **kwargs) -> str:
+        """
+        Returns the snapshot of the metrics as JSON.
+
+        Parameters
+        ----------
+        **kwargs
+                The keyword arguments of ``json.dumps``.
+        """
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        prefix = f"{self.prefix}_" if self.prefix else ""
+        lines = []
+        with self._lock:
+            for kind, metrics in (
+                ("counter", self._counters),
+                ("gauge", self._gauges),
+            ):
+                for name, values in sorted(metrics.items()):
+                    lines.append(f"# TYPE {prefix}{name} {kind}")
+                    for key, value in values.items():
+                        lines.append(f"{prefix}{name}{_format_labels(key)} {value}")
+            for name, histograms in sorted(self._histograms.items()):
+                full_name = f"{prefix}{name}"
+                lines.append(f"# TYPE {full_name} histogram")
+                for key, histogram in histograms.items():
+                    cumulative = histogram.cumulative_counts()
+                    for bound, count in zip(histogram.buckets, cumulative):
+                        labels = _format_labels(key, ("le", str(bound)))
+                        lines.append(f"{full_name}_bucket{labels} {count}")
+                    labels = _format_labels(key, ("le", "+Inf"))
+                    lines.append(f"{full_name}_bucket{labels} {histogram.count}")
+                    lines.append(
+                        f"{full_name}_sum{_format_labels(key)} {histogram.sum}"
+                    )
+                    lines.append(
+                        f"{full_name}_count{_format_labels(key)} {histogram.count}"
+                    )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,268 @@
+import hashlib
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                wait)
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from tqdm import tqdm
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.base_class import BaseClass
+from mr_apollo_2n.utils.node_sinks import JsonlNodeSink
+from mr_apollo_2n.utils.utils import build_domain_name
+from mr_apollo_2n.utils.website_node_crawler import WebsiteNodeCrawler
+
+
+class SiteCrawlResult:
+    """
+    Outcome of the crawl of a website by a ``MultiSiteCrawler``.
+
+    Attributes:
+            home_url (str): The Home URL of the website.
+            nodes (Optional[List[WebsiteNodeModel]]): The nodes of the website,
+                    None if they were written to ``output_path`` or the crawl
+                    failed.
+            total_nodes (int): The number of nodes crawled.
+            output_path (Optional[str]): The JSON Lines file with the nodes.
+            error (Optional[str]): The error that stopped the crawl, if any.
+            elapsed (float): The secs the crawl took.
+    """
+
+    def __init__(
+        self,
+        home_url: str,
+        nodes: Optional[List[WebsiteNodeModel]] = None,
+        total_nodes: int = 0,
+        output_path: Optional[str] = None,
+        error: Optional[str] = None,
+        elapsed: float = 0.0,
+    ):
+        self.home_url = home_url
+        self.nodes = nodes
+        self.total_nodes = total_nodes
+        self.output_path = output_path
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        status = "ok" if self.ok else f"error={self.error!r}"
+        return (
+            f"SiteCrawlResult(home_url={self.home_url!r}, "
+            f"total_nodes={self.total_nodes}, {status})"
+        )
+
+
+def site_file_name(home_url: str) -> str:
+    """
+    Returns the name of the JSON Lines file with the nodes of a website.
+
+    The name is the domain name followed by a short hash of the Home URL, so
+    the websites of the same domain do not overwrite each other.
+
+    Parameters
+    ----------
+    home_url : str
+            The Home URL of the website.
+    """
+    url_hash = hashlib.sha1(home_url.encode()).hexdigest()[:8]
+    return f"{build_domain_name(home_url)}_{url_hash}.jsonl"
+
+
+def crawl_site(
+    home_url: str,
+    crawler_kwargs: Optional[Dict[str, Any]] = None,
+    output_dir: Optional[str] = None,
+) -> SiteCrawlResult:
+    """
+    Crawls all the sitemaps of a website, catching any error.
+
+    Parameters
+    ----------
+    home_url : str
+            The Home URL of the website.
+    crawler_kwargs : Optional[Dict[str, Any]], optional
+            The keyword arguments of the ``WebsiteNodeCrawler`` (default is
+            None).
+    output_dir : Optional[str], optional
+            The directory where the nodes are written, in the file named by
+            ``site_file_name`` (default is None, which returns them).
+
+    Returns
+    -------
+    SiteCrawlResult
+            The outcome of the crawl.
+    """
+    started_at = time.monotonic()
+    output_path = None
+    try:
+        crawler = WebsiteNodeCrawler(home_url, **(crawler_kwargs or {}))
+        if output_dir is None:
+            nodes = list(crawler.iter_nodes())
+            return SiteCrawlResult(
+                home_url,
+                nodes=nodes,
+                total_nodes=len(nodes),
+                elapsed=time.monotonic() - started_at,
+            )
+        output_path = os.path.join(output_dir, site_file_name(home_url))
+        with JsonlNodeSink(output_path) as sink:
+            total_nodes = crawler.export_nodes(sink)
+        return SiteCrawlResult(
+            home_url,
+            total_nodes=total_nodes,
+            output_path=output_path,
+            elapsed=time.monotonic() - started_at,
+        )
+    except Exception as e:
+        return SiteCrawlResult(
+            home_url,
+            output_path=output_path,
+            error=f"{type(e).__name__}: {e}",
+            elapsed=time.monotonic() - started_at,
+        )
+
+
+class MultiSiteCrawler(BaseClass):
+    def __init__(
+        self,
+        home_urls: List[str],
+        max_workers: Optional[int] = None,
+        crawler_kwargs: Optional[Dict[str, Any]] = None,
+        output_dir: Optional[str] = None,
+        show_progress: bool = True,
+    ):
+        """
+        Crawls many websites in parallel with a pool of processes.
+
+        Each website is crawled by its own task, and the next website of a
+        host is only submitted once the previous one is finished, so each host
+        only receives the requests paced by the rate limiter of one crawler,
+        while the distinct hosts are crawled in parallel. The result of each
+        website is sent back as soon as it is crawled. An error in a website
+        is reported in its result and does not stop the others.
+
+        Parameters
+        ----------
+        home_urls : List[str]
+                The Home URLs of the websites.
+        max_workers : Optional[int], optional
+                The number of worker processes (default is the number of CPUs,
+                up to the number of hosts).
+        crawler_kwargs : Optional[Dict[str, Any]], optional
+                The keyword arguments of each ``WebsiteNodeCrawler``. They must
+                be picklable (default is None).
+        output_dir : Optional[str], optional
+                The directory where the nodes of each website are written, in
+                the file named by ``site_file_name``, instead of sending them
+                back to the main process (default is None).
+        show_progress : bool, optional
+                Whether to show a progress bar (default is True).
+        """
+        super().__init__(logger_name=__name__, log_level=logging.INFO)
+        self.home_urls = list(dict.fromkeys(home_urls))
+        self.max_workers = max_workers
+        self.crawler_kwargs = crawler_kwargs or {}
+        self.output_dir = output_dir
+        self.show_progress = show_progress
+
+    def group_by_host(self) -> Dict[str, List[str]]:
+        """
+        Groups the Home URLs by host, keeping their order.
+        """
+        groups: Dict[str, List[str]] = {}
+        for url in self.home_urls:
+            groups.setdefault(urlparse(url).netloc.lower() or url, []).append(url)
+        return groups
+
+    def iter_results(self) -> Iterator[SiteCrawlResult]:
+        """
+        Yields the result of each website as soon as its crawl finishes.
+
+        Yields
+        ------
+        SiteCrawlResult
+                The outcome of the crawl of a website, in order of completion.
+        """
+        if self.output_dir is not None:
+            os.makedirs(self.output_dir, exist_ok=True)
+        groups = self.group_by_host()
+        max_workers = self.max_workers or min(len(groups), os.cpu_count() or 1)
+        self.logger.info(
+            f"Crawling {len(self.home_urls)} websites of {len(groups)} hosts "
+            f"with {max_workers} workers."
+        )
+        total_failed = 0
+        with ProcessPoolExecutor(max_workers=max(1, max_workers)) as executor, tqdm(
+            total=len(self.home_urls), unit="site", disable=not self.show_progress
+        ) as progress:
+            # The websites of each host still to be submitted
+            pending = {host: deque(urls) for host, urls in groups.items()}
+            futures: Dict[Future, Tuple[str, str]] = {}
+            failed: List[SiteCrawlResult] = []
+
+            def submit(host: str):
+                url = pending[host].popleft()
+                try:
+                    future = executor.submit(
+                        crawl_site, url, self.crawler_kwargs, self.output_dir
+                    )
+                except Exception as e:
+                    # The pool is broken, so the rest of the host is not crawled
+                    failed.extend(
+                        SiteCrawlResult(url, error=f"{type(e).__name__}: {e}")
+                        for url in [url, *pending[host]]
+                    )
+                    pending[host].clear()
+                    return
+                futures[future] = (host, url)
+
+            for host in groups:
+                submit(host)
+            while futures or failed:
+                results = failed[:]
+                failed.clear()
+                if futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        host, url = futures.pop(future)
+                        if pending[host]:
+                            submit(host)
+                        try:
+                            results.append(future.result())
+                        except Exception as e:
+                            # The worker died while crawling the website
+                            results.append(
+                                SiteCrawlResult(url, error=f"{type(e).__name__}: {e}")
+                            )
+                for result in results:
+                    if not result.ok:
+                        total_failed += 1
+                        self.logger.warning(
+                            f"Failed to crawl '{result.home_url}': {result.error}"
+                        )
+                    progress.update(1)
+                    yield result
+
+        self.logger.info(
+            f"Crawled {len(self.home_urls) - total_failed} of "
+            f"{len(self.home_urls)} websites."
+        )
+
+    def run(self) -> List[SiteCrawlResult]:
+        """
+        Crawls all the websites and returns their results.
+
+        Returns
+        -------
+        List[SiteCrawlResult]
+                The outcome of each crawl, in order of completion.
+        """
+        return list(self.iter_results())
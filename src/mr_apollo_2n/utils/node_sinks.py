@@ -0,0 +1,336 @@
+import csv
+import json
+import sqlite3
+import sys
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+
+if TYPE_CHECKING:
+    from mr_apollo_2n.model.node_batch import NodeBatch
+
+NODE_FIELDS = [
+    "loc",
+    "domain",
+    "parent",
+    "element_type",
+    "lastmod",
+    "priority",
+    "changefreq",
+    "properties",
+    "meta",
+]
+
+
+def _json_default(value: Any) -> Any:
+    """
+    Serializes the values not supported by the json module.
+
+    Parameters
+    ----------
+    value : Any
+            The value to serialize.
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def node_to_record(node: WebsiteNodeModel) -> Dict[str, Any]:
+    """
+    Flattens a WebsiteNodeModel into a record of scalar values.
+
+    The lastmod is formatted as an ISO 8601 string and the properties and
+    meta dicts are serialized as JSON strings, so the record can be written
+    to tabular formats.
+
+    Parameters
+    ----------
+    node : WebsiteNodeModel
+            The node to flatten.
+
+    Returns
+    -------
+    Dict[str, Any]
+            The flattened record, with the keys of ``NODE_FIELDS``.
+    """
+    record = node.to_dict()
+    lastmod = record["lastmod"]
+    record["lastmod"] = lastmod.isoformat() if lastmod is not None else None
+    record["properties"] = json.dumps(record["properties"], default=_json_default)
+    record["meta"] = json.dumps(record["meta"], default=_json_default)
+    return record
+
+
+def record_to_node(record: Dict[str, Any]) -> WebsiteNodeModel:
+    """
+    Builds a WebsiteNodeModel from a record of ``node_to_record``.
+
+    The datetimes of the meta dict are read back as ISO 8601 strings.
+
+    Parameters
+    ----------
+    record : Dict[str, Any]
+            The flattened record, with the keys of ``NODE_FIELDS``.
+    """
+    properties = json.loads(record["properties"])
+    properties["lastmod"] = record["lastmod"]
+    properties["priority"] = record["priority"]
+    properties["changefreq"] = record["changefreq"]
+    return WebsiteNodeModel(
+        record["loc"],
+        record["parent"],
+        record["element_type"],
+        properties,
+        meta=json.loads(record["meta"]),
+    )
+
+
+class NodeSink:
+    """
+    Base class of the sinks where the crawled nodes are written in batches.
+
+    The nodes are buffered and written every ``batch_size`` nodes, so the
+    memory used is bounded by the batch size and the results are available
+    while the crawl is still running. Derived classes implement
+    ``_write_batch`` and, optionally, ``_close``.
+
+    Attributes:
+            batch_size (int): The number of nodes written at once.
+    """
+
+    def __init__(self, batch_size: Optional[int] = 1000):
+        """
+        Initializes the NodeSink.
+
+        Parameters
+        ----------
+        batch_size : Optional[int], optional
+                The number of nodes written at once (default is 1000).
+        """
+        self.batch_size = batch_size if batch_size and batch_size > 0 else 1000
+        self.total_written = 0
+        self._buffer: List[WebsiteNodeModel] = []
+
+    def write(self, node: WebsiteNodeModel):
+        """
+        Adds a node to the buffer, writing the batch when it is full.
+
+        Parameters
+        ----------
+        node : WebsiteNodeModel
+                The node to write.
+        """
+        self._buffer.append(node)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered nodes.
+        """
+        if self._buffer:
+            self._write_batch(self._buffer)
+            self.total_written += len(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        """
+        Writes the buffered nodes and releases the resources of the sink.
+        """
+        self.flush()
+        self._close()
+
+    def _write_batch(self, nodes: List[WebsiteNodeModel]):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonlNodeSink(NodeSink):
+    def __init__(
+        self, path: str, batch_size: Optional[int] = 1000, append: bool = False
+    ):
+        """
+        Writes the nodes to a JSON Lines file, one ``to_dict`` per line.
+
+        Parameters
+        ----------
+        path : str
+                The path of the output file, '-' for stdout.
+        batch_size : Optional[int], optional
+                The number of nodes written at once (default is 1000).
+        append : bool, optional
+                Whether to append to the file instead of truncating it
+                (default is False).
+        """
+        super().__init__(batch_size)
+        self.path = path
+        if path == "-":
+            self._file = sys.stdout
+        else:
+            self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def _write_batch(self, nodes: List[WebsiteNodeModel]):
+        self._file.writelines(
+            json.dumps(node.to_dict(), default=_json_default) + "\n" for node in nodes
+        )
+        self._file.flush()
+
+    def _close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class CsvNodeSink(NodeSink):
+    def __init__(self, path: str, batch_size: Optional[int] = 1000):
+        """
+        Writes the nodes to a CSV file with the columns of ``NODE_FIELDS``.
+
+        Parameters
+        ----------
+        path : str
+                The path of the output file.
+        batch_size : Optional[int], optional
+                The number of nodes written at once (default is 1000).
+        """
+        super().__init__(batch_size)
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=NODE_FIELDS)
+        self._writer.writeheader()
+
+    def _write_batch(self, nodes: List[WebsiteNodeModel]):
+        self._writer.writerows(node_to_record(node) for node in nodes)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class SqliteNodeSink(NodeSink):
+    def __init__(
+        self,
+        path: str,
+        table: Optional[str] = "website_nodes",
+        batch_size: Optional[int] = 1000,
+    ):
+        """
+        Writes the nodes to a table of a SQLite database.
+
+        Parameters
+        ----------
+        path : str
+                The path of the database file.
+        table : Optional[str], optional
+                The name of the table, created if missing (default is
+                'website_nodes').
+        batch_size : Optional[int], optional
+                The number of nodes written at once (default is 1000).
+        """
+        super().__init__(batch_size)
+        self.path = path
+        self.table = table
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "loc TEXT, domain TEXT, parent TEXT, element_type TEXT, "
+            "lastmod TEXT, priority REAL, changefreq TEXT, "
+            "properties TEXT, meta TEXT)"
+        )
+        self._connection.commit()
+
+    def _write_batch(self, nodes: List[WebsiteNodeModel]):
+        placeholders = ", ".join(f":{field}" for field in NODE_FIELDS)
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT INTO {self.table} ({', '.join(NODE_FIELDS)}) "
+                f"VALUES ({placeholders})",
+                (node_to_record(node) for node in nodes),
+            )
+
+    def _close(self):
+        self._connection.close()
+
+
+class ParquetNodeSink(NodeSink):
+    def __init__(self, path: str, batch_size: Optional[int] = 10000):
+        """
+        Writes the nodes to a Parquet file, one row group per batch.
+
+        Requires the optional ``pyarrow`` package.
+
+        Parameters
+        ----------
+        path : str
+                The path of the output file.
+        batch_size : Optional[int], optional
+                The number of nodes written at once (default is 10000).
+        """
+        try:
+            import pyarrow as pa  # type: ignore
+            import pyarrow.parquet as pq  # type: ignore
+        except ImportError as err:
+            raise ImportError(
+                "ParquetNodeSink requires pyarrow, install it with "
+                "'pip install mr_apollo_2n[parquet]'."
+            ) from err
+
+        super().__init__(batch_size)
+        self.path = path
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("loc", pa.string()),
+                ("domain", pa.string()),
+                ("parent", pa.string()),
+                ("element_type", pa.string()),
+                ("lastmod", pa.string()),
+                ("priority", pa.float64()),
+                ("changefreq", pa.string()),
+                ("properties", pa.string()),
+                ("meta", pa.string()),
+            ]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def _write_batch(self, nodes: List[WebsiteNodeModel]):
+        records = [node_to_record(node) for node in nodes]
+        self._writer.write_table(
+            self._pa.Table.from_pylist(records, schema=self._schema)
+        )
+
+    def _close(self):
+        self._writer.close()
+
+
+class NodeBatchSink(NodeSink):
+    def __init__(
+        self, batch: Optional["NodeBatch"] = None, batch_size: Optional[int] = 1000
+    ):
+        """
+        Appends the nodes to a columnar NodeBatch, so the WebsiteNodeModel
+        objects are released as soon as they are encoded.
+
+        Parameters
+        ----------
+        batch : Optional[NodeBatch], optional
+                The batch to fill (default is a new one).
+        batch_size : Optional[int], optional
+                The number of nodes appended at once (default is 1000).
+        """
+        from mr_apollo_2n.model.node_batch import NodeBatch
+
+        super().__init__(batch_size)
+        self.batch = batch if batch is not None else NodeBatch()
+
+    def _write_batch(self, nodes: List[WebsiteNodeModel]):
+        self.batch.extend(nodes)
@@ -0,0 +1,345 @@
+import json
+import sqlite3
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.node_sinks import (NODE_FIELDS, NodeSink,
+                                           _json_default, record_to_node)
+from mr_apollo_2n.utils.utils import parse_w3c_datetime
+
+# The columns that can be grouped by in ``count_by``
+GROUP_FIELDS = ("domain", "parent", "element_type", "changefreq")
+
+INDEXES = {
+    "nodes_domain_path": "domain, path",
+    "nodes_parent": "parent",
+    "nodes_element_type": "element_type, domain",
+    "nodes_lastmod": "lastmod_ts",
+}
+
+
+def _timestamp(value: Union[datetime, str, None]) -> Optional[float]:
+    """
+    Returns the POSIX timestamp of a datetime, considering the naive ones UTC.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = parse_w3c_datetime(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _path_of(loc: str) -> str:
+    """
+    Returns the path and query of a URL, '/' if it has no path.
+    """
+    start = loc.find("://")
+    start = loc.find("/", start + 3) if start >= 0 else 0
+    if start < 0:
+        return "/"
+    path = loc[start:].partition("#")[0]
+    return path if path.startswith("/") else "/" + path
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    """
+    Returns the smallest string greater than all the strings with the prefix.
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class NodeStore(NodeSink):
+    def __init__(self, path: str, batch_size: Optional[int] = 10000):
+        """
+        Persistent store of crawled nodes, indexed for querying.
+
+        The nodes are stored in a SQLite database with indexes on the domain
+        and URL path, the parent, the element type and the lastmod, so the
+        queries read only the matching rows. It is a NodeSink, so a crawl can
+        be exported to it with ``WebsiteNodeCrawler.export_nodes``, or nodes
+        added with ``add``. The indexes are built once after a bulk load,
+        which is much faster than updating them on every insert, and before
+        the first query.
+
+        Parameters
+        ----------
+        path : str
+                The path of the database file, created if missing. ':memory:'
+                keeps it in memory.
+        batch_size : Optional[int], optional
+                The number of nodes inserted at once (default is 10000).
+        """
+        super().__init__(batch_size)
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS nodes ("
+                "id INTEGER PRIMARY KEY, loc TEXT NOT NULL, domain TEXT, "
+                "path TEXT, parent TEXT, element_type TEXT, lastmod TEXT, "
+                "lastmod_ts REAL, priority REAL, changefreq TEXT, "
+                "properties TEXT, meta TEXT)"
+            )
+            # The number of nodes per domain and element type, kept up to date
+            # so the counts do not scan the nodes
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS node_counts (domain TEXT, "
+                "element_type TEXT, total INTEGER NOT NULL, "
+                "PRIMARY KEY (domain, element_type))"
+            )
+        self._indexed = self._has_indexes()
+
+    def _has_indexes(self) -> bool:
+        names = {
+            name
+            for (name,) in self._connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+        return names.issuperset(INDEXES)
+
+    def _write_batch(self, nodes: List[WebsiteNodeModel]):
+        # The meta dict is shared by the nodes of a sitemap, serialize it once
+        meta_json: Dict[int, str] = {}
+        counts: Counter = Counter()
+        rows = []
+        for node in nodes:
+            counts[(node.domain, node.element_type)] += 1
+            lastmod = node.lastmod
+            meta_id = id(node.meta)
+            if meta_id not in meta_json:
+                meta_json[meta_id] = json.dumps(node.meta, default=_json_default)
+            rows.append(
+                (
+                    node.loc,
+                    node.domain,
+                    _path_of(node.loc),
+                    node.parent,
+                    node.element_type,
+                    lastmod.isoformat() if lastmod is not None else None,
+                    _timestamp(lastmod),
+                    node.priority,
+                    node.changefreq,
+                    (
+                        json.dumps(node.properties, default=_json_default)
+                        if node._properties
+                        else "{}"
+                    ),
+                    meta_json[meta_id],
+                )
+            )
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO nodes (loc, domain, path, parent, element_type, "
+                "lastmod, lastmod_ts, priority, changefreq, properties, meta) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._connection.executemany(
+                "INSERT INTO node_counts (domain, element_type, total) "
+                "VALUES (?, ?, ?) ON CONFLICT (domain, element_type) "
+                "DO UPDATE SET total = total + excluded.total",
+                ((domain, type_, total) for (domain, type_), total in counts.items()),
+            )
+
+    def add(self, nodes: Union[WebsiteNodeModel, List[WebsiteNodeModel]]):
+        """
+        Adds nodes to the store, and makes them visible to the queries.
+
+        Parameters
+        ----------
+        nodes : Union[WebsiteNodeModel, List[WebsiteNodeModel]]
+                A node or a list of nodes.
+        """
+        for node in [nodes] if isinstance(nodes, WebsiteNodeModel) else nodes:
+            self.write(node)
+        self.flush()
+
+    def build_indexes(self):
+        """
+        Creates the missing indexes and updates the statistics of the query
+        planner.
+        """
+        with self._connection:
+            for name, columns in INDEXES.items():
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {name} ON nodes ({columns})"
+                )
+            self._connection.execute("ANALYZE")
+        self._indexed = True
+
+    def _prepare_query(self):
+        self.flush()
+        if not self._indexed:
+            self.build_indexes()
+
+    @staticmethod
+    def _where(
+        domain: Optional[str] = None,
+        parent: Optional[str] = None,
+        element_type: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+        modified_since: Union[datetime, str, None] = None,
+        modified_before: Union[datetime, str, None] = None,
+    ) -> Tuple[str, List[Any]]:
+        conditions: List[str] = []
+        params: List[Any] = []
+        if path_prefix is not None and "://" in path_prefix:
+            parts = urlsplit(path_prefix)
+            domain = domain or parts.netloc
+            path_prefix = _path_of(path_prefix) if parts.path else "/"
+        if domain is not None:
+            conditions.append("domain = ?")
+            params.append(domain)
+        if parent is not None:
+            conditions.append("parent = ?")
+            params.append(parent)
+        if element_type is not None:
+            conditions.append("element_type = ?")
+            params.append(element_type)
+        if path_prefix:
+            # A range, unlike LIKE, is read from the index
+            conditions.append("path >= ? AND path < ?")
+            params += [path_prefix, _prefix_upper_bound(path_prefix)]
+        if modified_since is not None:
+            conditions.append("lastmod_ts >= ?")
+            params.append(_timestamp(modified_since))
+        if modified_before is not None:
+            conditions.append("lastmod_ts < ?")
+            params.append(_timestamp(modified_before))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def query(
+        self, limit: Optional[int] = None, **filters
+    ) -> Iterator[WebsiteNodeModel]:
+        """
+        Yields the nodes that match all the filters, in order of insertion.
+
+        The rows are read from the database as they are consumed.
+
+        Parameters
+        ----------
+        limit : Optional[int], optional
+                The max number of nodes (default is None, all of them).
+        **filters
+                domain (str), parent (str), element_type (str),
+                path_prefix (str): a path like '/blog', or a URL, which also
+                filters its domain, modified_since (datetime or str) and
+                modified_before (datetime or str), which exclude the nodes
+                without lastmod.
+        """
+        for record in self._select(", ".join(NODE_FIELDS), limit, **filters):
+            yield record_to_node(dict(zip(NODE_FIELDS, record)))
+
+    def query_locs(self, limit: Optional[int] = None, **filters) -> Iterator[str]:
+        """
+        Yields the URLs of the nodes that match all the filters, without
+        building the nodes.
+
+        Parameters
+        ----------
+        limit : Optional[int], optional
+                The max number of URLs (default is None, all of them).
+        **filters
+                The filters of ``query``.
+        """
+        for (loc,) in self._select("loc", limit, **filters):
+            yield loc
+
+    def _select(self, columns: str, limit: Optional[int], **filters):
+        self._prepare_query()
+        where, params = self._where(**filters)
+        query = f"SELECT {columns} FROM nodes{where} ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self._connection.execute(query, params)
+
+    def children(self, parent: str, **filters) -> Iterator[WebsiteNodeModel]:
+        """
+        Yields the nodes listed in a sitemap.
+
+        Parameters
+        ----------
+        parent : str
+                The URL of the sitemap.
+        **filters
+                The other filters of ``query``.
+        """
+        return self.query(parent=parent, **filters)
+
+    def count(self, **filters) -> int:
+        """
+        Returns the number of nodes that match all the filters.
+
+        Parameters
+        ----------
+        **filters
+                The filters of ``query``.
+        """
+        if self._use_node_counts("domain", filters):
+            where, params = self._where(**filters)
+            query = f"SELECT COALESCE(SUM(total), 0) FROM node_counts{where}"
+        else:
+            self._prepare_query()
+            where, params = self._where(**filters)
+            query = f"SELECT COUNT(*) FROM nodes{where}"
+        return self._connection.execute(query, params).fetchone()[0]
+
+    def count_by(self, field: str, **filters) -> Dict[Optional[str], int]:
+        """
+        Returns the number of nodes that match the filters per value of a
+        field, e.g. per domain.
+
+        Parameters
+        ----------
+        field : str
+                One of ``GROUP_FIELDS``.
+        **filters
+                The filters of ``query``.
+
+        Raises
+        ------
+        ValueError
+                If the field cannot be grouped by.
+        """
+        if field not in GROUP_FIELDS:
+            raise ValueError(
+                f"Invalid field '{field}', expected one of {', '.join(GROUP_FIELDS)}."
+            )
+        if self._use_node_counts(field, filters):
+            where, params = self._where(**filters)
+            query = (
+                f"SELECT {field}, SUM(total) FROM node_counts{where} GROUP BY {field}"
+            )
+        else:
+            self._prepare_query()
+            where, params = self._where(**filters)
+            query = f"SELECT {field}, COUNT(*) FROM nodes{where} GROUP BY {field}"
+        return dict(self._connection.execute(query, params))
+
+    def _use_node_counts(self, field: str, filters: Dict[str, Any]) -> bool:
+        """
+        Whether a count can be read from the node_counts table.
+        """
+        self.flush()
+        return field in ("domain", "element_type") and all(
+            name in ("domain", "element_type") or value is None
+            for name, value in filters.items()
+        )
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def _close(self):
+        if not self._indexed:
+            self.build_indexes()
+        self._connection.close()
@@ -0,0 +1,283 @@
+import math
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+def parse_retry_after(
+    value: Optional[str], max_delay: Optional[float] = None
+) -> Optional[float]:
+    """
+    Parses the value of a ``Retry-After`` header into secs to wait.
+
+    Parameters
+    ----------
+    value : Optional[str]
+        The value of the header, either a number of secs or an HTTP date.
+    max_delay : Optional[float], optional
+        The max secs to wait, a longer delay is clamped to it (default is no
+        limit).
+
+    Returns
+    -------
+    Optional[float]
+        The secs to wait, or None if the value is missing or invalid.
+
+    Examples
+    --------
+    >>> parse_retry_after("120")
+    120.0
+    >>> parse_retry_after("120", max_delay=60)
+    60.0
+    >>> parse_retry_after("inf") is None
+    True
+    """
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip()
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        delay = retry_at.timestamp() - time.time()
+    if not math.isfinite(delay):
+        return None
+    delay = max(0.0, delay)
+    if max_delay is not None:
+        delay = min(delay, float(max_delay))
+    return delay
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations.
+
+    A reservation always consumes a token, and the tokens can go negative: the
+    returned wait is the time until the reserved token would be available, so
+    concurrent callers are spaced out instead of all waking up at once.
+
+    Attributes:
+            rate (float): The tokens added per sec.
+            capacity (float): The max number of tokens, i.e. the allowed burst.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """
+        Takes a token and returns the secs to wait before using it.
+
+        Parameters
+        ----------
+        now : float
+                The current time, from ``time.monotonic``.
+        """
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Interface of the rate limiters used by ``RequestSession``.
+
+    This base implementation does not limit anything, so it can be used to
+    disable the rate limiting.
+    """
+
+    def acquire(self, url: str) -> float:
+        """
+        Blocks until a request to the URL is allowed.
+
+        Parameters
+        ----------
+        url : str
+                The URL to be requested.
+
+        Returns
+        -------
+        float
+                The secs waited.
+        """
+        return 0.0
+
+    def record(
+        self,
+        url: str,
+        status_code: Optional[int],
+        latency: float,
+        retry_after: Optional[float] = None,
+    ):
+        """
+        Feeds back the outcome of a request.
+
+        Parameters
+        ----------
+        url : str
+                The requested URL.
+        status_code : Optional[int]
+                The status code of the response, None if the request failed.
+        latency : float
+                The secs the request took.
+        retry_after : Optional[float], optional
+                The secs requested by the server in a ``Retry-After`` header.
+        """
+
+    def set_crawl_delay(self, url: str, delay: Optional[float]):
+        """
+        Sets the min secs between requests to the host of the URL.
+
+        Parameters
+        ----------
+        url : str
+                A URL of the host, or the host itself.
+        delay : Optional[float]
+                The ``Crawl-delay`` of the robots.txt file of the host.
+        """
+
+
+class HostRateLimiter(RateLimiter):
+    def __init__(
+        self,
+        initial_rate: float = 1.0,
+        min_rate: float = 0.05,
+        max_rate: float = 10.0,
+        burst: float = 1.0,
+        increase_step: float = 0.1,
+        decrease_factor: float = 0.5,
+        slow_latency: float = 5.0,
+        share: float = 1.0,
+    ):
+        """
+        Adaptive per-host token-bucket rate limiter.
+
+        The rate of each host grows additively while the server answers fast
+        and successfully, and it is multiplied by ``decrease_factor`` on a 429,
+        a 5xx, a failed request or a slow response (AIMD). The ``Crawl-delay``
+        of the host caps its rate, and a ``Retry-After`` pauses it.
+
+        Parameters
+        ----------
+        initial_rate : float, optional
+                The initial requests per sec of each host (default is 1.0).
+        min_rate : float, optional
+                The min requests per sec of each host (default is 0.05).
+        max_rate : float, optional
+                The max requests per sec of each host (default is 10.0).
+        burst : float, optional
+                The number of requests allowed back to back (default is 1.0).
+        increase_step : float, optional
+                The requests per sec added after a healthy response (default is
+                0.1).
+        decrease_factor : float, optional
+                The factor applied to the rate after an unhealthy response
+                (default is 0.5).
+        slow_latency : float, optional
+                The secs above which a response is considered slow (default is
+                5.0).
+        share : float, optional
+                The fraction of the politeness budget of the hosts used by this
+                limiter, when several processes crawl the same hosts. The rates,
+                the rate step and the rate allowed by the ``Crawl-delay`` are
+                multiplied by it (default is 1.0).
+        """
+        self.share = share
+        initial_rate, min_rate, max_rate = (
+            initial_rate * share,
+            min_rate * share,
+            max_rate * share,
+        )
+        self.initial_rate = min(max(initial_rate, min_rate), max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase_step = increase_step * share
+        self.decrease_factor = decrease_factor
+        self.slow_latency = slow_latency
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._max_rates: Dict[str, float] = {}
+        self._paused_until: Dict[str, float] = {}
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlparse(url).netloc or url
+
+    def _bucket(self, host: str) -> TokenBucket:
+        if host not in self._buckets:
+            rate = min(self.initial_rate, self._max_rates.get(host, self.max_rate))
+            self._buckets[host] = TokenBucket(rate, self.burst)
+        return self._buckets[host]
+
+    def rate(self, url: str) -> float:
+        """
+        Returns the current requests per sec allowed to the host of the URL.
+
+        Parameters
+        ----------
+        url : str
+                A URL of the host, or the host itself.
+        """
+        with self._lock:
+            return self._bucket(self._host(url)).rate
+
+    def acquire(self, url: str) -> float:
+        host = self._host(url)
+        with self._lock:
+            now = time.monotonic()
+            wait = self._bucket(host).reserve(now)
+            wait = max(wait, self._paused_until.get(host, 0.0) - now)
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+    def record(
+        self,
+        url: str,
+        status_code: Optional[int],
+        latency: float,
+        retry_after: Optional[float] = None,
+    ):
+        host = self._host(url)
+        unhealthy = (
+            status_code is None
+            or status_code == 429
+            or status_code >= 500
+            or latency > self.slow_latency
+        )
+        with self._lock:
+            bucket = self._bucket(host)
+            max_rate = self._max_rates.get(host, self.max_rate)
+            if unhealthy:
+                bucket.rate = max(
+                    min(self.min_rate, max_rate), bucket.rate * self.decrease_factor
+                )
+            elif status_code < 400:
+                bucket.rate = min(max_rate, bucket.rate + self.increase_step)
+            if retry_after:
+                self._paused_until[host] = max(
+                    self._paused_until.get(host, 0.0), time.monotonic() + retry_after
+                )
+
+    def set_crawl_delay(self, url: str, delay: Optional[float]):
+        if not delay or delay <= 0:
+            return
+        host = self._host(url)
+        with self._lock:
+            max_rate = min(self.max_rate, self.share / delay)
+            self._max_rates[host] = max_rate
+            bucket = self._bucket(host)
+            bucket.rate = min(bucket.rate, max_rate)
@@ -1,11 +1,17 @@
-from typing import Dict, List, Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import requests  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
 from requests.exceptions import (ConnectionError, HTTPError,  # type: ignore
                                  Timeout)
-from retry import retry  # type: ignore
 
-from mr_apollo_2n.utils.base_class import BaseClass
+from mr_apollo_2n.utils.base_class import THROTTLED, BaseClass
+from mr_apollo_2n.utils.metrics import MetricsRegistry
+from mr_apollo_2n.utils.rate_limiter import RateLimiter, parse_retry_after
+from mr_apollo_2n.utils.response_cache import ResponseCache
+from mr_apollo_2n.utils.retry_policy import RetryPolicy
 
 
 class RequestSession(BaseClass):
@@ -17,8 +23,15 @@ class RequestSession(BaseClass):
         allow_redirects: Optional[bool] = True,
         update_headers: Optional[bool] = True,
         retry_supported_codes: Optional[List[int]] = None,
-        retry_delay: Optional[int] = 180,
+        retry_delay: Optional[float] = None,
         retry_tries: Optional[int] = 3,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        timeout: Optional[float] = 60.0,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
     ):
         """
         Request Session class, used to create a session and execute requests.
@@ -36,11 +49,36 @@ class RequestSession(BaseClass):
         update_headers : Optional[bool], optional
                                         Whether to update the headers or not (default is True).
         retry_supported_codes : List[int], optional
-                                        The list of supported codes to retry (default is [429, 503]).
-        retry_delay : Optional[int], optional
-                                        Secs to wait between retries (default is 180).
+                                        The list of supported codes to retry (default is the
+                                        retryable codes of RetryPolicy).
+        retry_delay : Optional[float], optional
+                                        Base secs of the exponential backoff between retries
+                                        (default is 1).
         retry_tries : Optional[int], optional
-                                        Number of retries (default is 3).
+                                        Number of attempts (default is 3).
+        cache : Optional[ResponseCache], optional
+                                        The cache used to send conditional requests and
+                                        reuse the stored body on a 304 (default is None).
+        rate_limiter : Optional[RateLimiter], optional
+                                        The limiter that paces the requests to each host and is
+                                        fed back with their outcome (default is None).
+        retry_policy : Optional[RetryPolicy], optional
+                                        The retry policy, which overrides retry_supported_codes,
+                                        retry_delay and retry_tries (default is None).
+        metrics : Optional[MetricsRegistry], optional
+                                        The registry where the latency, status codes, bytes
+                                        and retries of the requests are recorded (default is
+                                        None, which disables them).
+        timeout : Optional[float], optional
+                                        Secs to wait for the server to connect or send data
+                                        (default is 60). None waits forever.
+        pool_connections : int, optional
+                                        The number of hosts whose connections are kept alive
+                                        (default is 10).
+        pool_maxsize : int, optional
+                                        The connections kept alive per host, which should be
+                                        at least the number of threads that share the session
+                                        (default is 10).
         """
         super().__init__(logger_name=__name__)
         self.retry_delay = retry_delay
@@ -49,7 +87,18 @@ class RequestSession(BaseClass):
         self.method = method
         self.request_data = request_data if request_data is not None else {}
         self.allow_redirects = allow_redirects
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
         self.session = requests.Session()
+        # The retries are done by _request_with_retry
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self.session.headers.update(self.headers)
         if update_headers:
             self.session.headers.update(
@@ -62,42 +111,333 @@ class RequestSession(BaseClass):
                     "Upgrade-Insecure-Requests": "1",
                 }
             )
-        if retry_supported_codes is None:
-            self.retry_supported_codes = [
-                429,
-                503,
-            ]  # Too Many Requests, Service Unavailable
-        self.exec_request = self._create_exec_request_with_retry()
-
-    def _create_exec_request_with_retry(self):
-        @retry(
-            delay=self.retry_delay, tries=self.retry_tries, exceptions=ConnectionError
+        if retry_policy is None:
+            retry_policy = RetryPolicy(
+                max_tries=retry_tries if retry_tries is not None else 3,
+                base_delay=retry_delay if retry_delay is not None else 1.0,
+                retryable_status_codes=retry_supported_codes,
+            )
+        self.retry_policy = retry_policy
+        self.retry_supported_codes = sorted(retry_policy.retryable_status_codes)
+
+    def _request(self, url: str, stream: bool = False) -> requests.Response:
+        return self.session.request(
+            self.method,
+            url,
+            data=self.request_data,
+            allow_redirects=self.allow_redirects,
+            headers=self._conditional_headers(url),
+            stream=stream,
+            timeout=self.timeout,
         )
-        def exec_request(url: str) -> Optional[str]:
+
+    def _send(self, url: str, stream: bool = False) -> requests.Response:
+        """
+        Sends a request, paced and fed back to the rate limiter if there is one.
+
+        When metrics are enabled, the secs waited for the rate limiter, the
+        latency and the status code of the request are recorded. The latency
+        of a streamed request ends when the headers are received.
+
+        Parameters
+        ----------
+        url : str
+                The URL to request.
+        stream : bool, optional
+                Whether to defer the download of the body (default is False).
+        """
+        rate_limiter, metrics = self.rate_limiter, self.metrics
+        if rate_limiter is None and metrics is None:
+            return self._request(url, stream)
+
+        if rate_limiter is not None:
+            waited = rate_limiter.acquire(url)
+            if metrics is not None:
+                metrics.observe("rate_limit_wait_seconds", waited)
+        started_at = time.monotonic()
+        try:
+            response = self._request(url, stream)
+        except Exception as err:
+            if rate_limiter is not None:
+                rate_limiter.record(url, None, time.monotonic() - started_at)
+            if metrics is not None:
+                metrics.inc("request_errors_total", error=type(err).__name__)
+            raise
+        latency = time.monotonic() - started_at
+        if rate_limiter is not None:
+            rate_limiter.record(
+                url,
+                response.status_code,
+                latency,
+                parse_retry_after(
+                    response.headers.get("Retry-After"),
+                    self.retry_policy.max_retry_after,
+                ),
+            )
+        if metrics is not None:
+            metrics.observe("request_seconds", latency)
+            metrics.inc("requests_total", status=response.status_code)
+        return response
+
+    def _request_with_retry(self, url: str, stream: bool = False) -> requests.Response:
+        """
+        Sends a request retrying it according to the retry policy.
+
+        Connection errors, timeouts and retryable status codes are retried,
+        waiting the backoff of the policy or the ``Retry-After`` of the server.
+        Any other error status code fails at once.
+
+        Parameters
+        ----------
+        url : str
+                The URL to request.
+        stream : bool, optional
+                Whether to defer the download of the body (default is False).
+
+        Raises
+        ------
+        HTTPError
+                If the server answers with a fatal status code.
+        ConnectionError
+                If all the attempts failed.
+        """
+        policy = self.retry_policy
+        error: Optional[Exception] = None
+        for attempt in range(1, policy.max_tries + 1):
+            retry_after = None
             try:
-                response = self.session.request(
-                    self.method,
-                    url,
-                    data=self.request_data,
-                    allow_redirects=self.allow_redirects,
-                )
+                response = self._send(url, stream=stream)
+                if self._is_not_modified(url, response):
+                    return response
                 response.raise_for_status()
-
-                if response.status_code in self.retry_supported_codes:
-                    self.logger.info(
-                        f"Retry due to response code: {response.status_code}"
+                return response
+            except HTTPError as err:
+                response.close()
+                status_code = getattr(err.response, "status_code", None)
+                if not policy.is_retryable_status(status_code):
+                    self.logger.error(
+                        f"Fatal error when requesting {url}: {err}", extra=THROTTLED
                     )
-                    raise ConnectionError(
-                        f"Retrying due to response code: {response.status_code}"
+                    raise HTTPError(
+                        f"Error requesting {url}: {err}", response=err.response
                     )
-                return response.text
-            except (HTTPError, ConnectionError, Timeout) as err:
-                self.logger.error(f"Connection error when connecting to {url}: {err}")
-                raise ConnectionError(f"Error attempting to connect to {url}: {err}")
+                retry_after = parse_retry_after(
+                    getattr(err.response, "headers", {}).get("Retry-After"),
+                    policy.max_retry_after,
+                )
+                self.logger.warning(
+                    f"Retryable error when requesting {url}: {err}", extra=THROTTLED
+                )
+                error = err
+            except (ConnectionError, Timeout) as err:
+                self.logger.error(
+                    f"Connection error when connecting to {url}: {err}",
+                    extra=THROTTLED,
+                )
+                error = err
             except Exception as err:
                 self.logger.error(
-                    f"Unexpected error processing request to {url}: {err}"
+                    f"Unexpected error processing request to {url}: {err}",
+                    extra=THROTTLED,
                 )
                 raise Exception(f"Unexpected error processing request to {url}: {err}")
 
-        return exec_request
+            if attempt < policy.max_tries:
+                delay = policy.compute_delay(attempt, retry_after)
+                self.logger.info(
+                    f"Retrying {url} in {delay:.2f} secs "
+                    f"(attempt {attempt + 1} of {policy.max_tries}).",
+                    extra=THROTTLED,
+                )
+                if self.metrics is not None:
+                    self.metrics.inc("request_retries_total")
+                time.sleep(delay)
+
+        raise ConnectionError(f"Error attempting to connect to {url}: {error}")
+
+    def exec_request(self, url: str) -> Optional[str]:
+        """
+        Executes a request and returns the body as text.
+
+        Parameters
+        ----------
+        url : str
+                The URL to request.
+        """
+        response = self._request_with_retry(url)
+        if self._is_not_modified(url, response):
+            if self.metrics is not None:
+                self.metrics.inc("cache_hits_total")
+            return self.cache.read_text(url)  # type: ignore
+        if self.metrics is not None:
+            self.metrics.inc("response_bytes_total", len(response.content))
+        if self.cache is not None:
+            self.cache.store(url, response.content, response.headers, response.encoding)
+        return response.text
+
+    def fetch_many(
+        self, urls: Iterable[str], max_workers: Optional[int] = None
+    ) -> Iterator[Tuple[str, Union[Optional[str], Exception]]]:
+        """
+        Fetches many URLs concurrently over the pooled connections of the
+        session.
+
+        The requests are sent from a pool of threads with ``exec_request``, so
+        they are retried, cached and rate limited like any other request. At
+        most ``2 * max_workers`` URLs are pending at a time, so ``urls`` can be
+        a lazy iterable of any size.
+
+        Parameters
+        ----------
+        urls : Iterable[str]
+                The URLs to fetch.
+        max_workers : Optional[int], optional
+                The number of threads (default is ``pool_maxsize``). It is
+                capped at ``pool_maxsize``, so every thread has a connection
+                kept alive.
+
+        Yields
+        ------
+        Tuple[str, Union[Optional[str], Exception]]
+                The URL and its body, or the error raised when fetching it, in
+                order of completion.
+        """
+        max_workers = max_workers or self.pool_maxsize
+        if max_workers > self.pool_maxsize:
+            self.logger.warning(
+                f"Using {self.pool_maxsize} threads instead of {max_workers}, "
+                f"the size of the connection pool. Increase pool_maxsize to "
+                f"use more threads."
+            )
+            max_workers = self.pool_maxsize
+        urls = iter(urls)
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fetch_many"
+        ) as executor:
+            pending = {}
+            try:
+                while True:
+                    for url in urls:
+                        pending[executor.submit(self.exec_request, url)] = url
+                        if len(pending) >= 2 * max_workers:
+                            break
+                    if not pending:
+                        return
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url = pending.pop(future)
+                        error = future.exception()
+                        yield url, error if error is not None else future.result()
+            finally:
+                # Also reached when the consumer stops before the end
+                for future in pending:
+                    future.cancel()
+
+    def exec_stream_request(
+        self, url: str, chunk_size: Optional[int] = 64 * 1024
+    ) -> Iterator[bytes]:
+        """
+        Executes a streamed request and yields the body in chunks.
+
+        The body is never fully loaded in memory, so it can be fed to an
+        incremental parser while it is being downloaded. When a cache is set,
+        the body is stored while it is streamed, and it is read back from
+        disk when the server answers 304 Not Modified.
+
+        Parameters
+        ----------
+        url : str
+                The URL to request.
+        chunk_size : Optional[int], optional
+                The size in bytes of the yielded chunks (default is 64 KiB).
+
+        Yields
+        ------
+        bytes
+                The chunks of the response body.
+        """
+        response = self._request_with_retry(url, stream=True)
+        with response:
+            if self._is_not_modified(url, response):
+                self.logger.debug(f"Using cached response of '{url}'.")
+                if self.metrics is not None:
+                    self.metrics.inc("cache_hits_total")
+                yield from self.cache.iter_body(url, chunk_size)  # type: ignore
+                return
+
+            writer = None
+            if self.cache is not None:
+                writer = self.cache.open_writer(
+                    url, response.headers, response.encoding
+                )
+            chunks = response.iter_content(chunk_size=chunk_size)
+            if self.metrics is not None:
+                chunks = self._measure_chunks(chunks)
+            try:
+                for chunk in chunks:
+                    if chunk:
+                        if writer is not None:
+                            writer.write(chunk)
+                        yield chunk
+            except BaseException:
+                # Also reached when the consumer stops before the end
+                if writer is not None:
+                    writer.discard()
+                raise
+            if writer is not None:
+                writer.commit()
+
+    def _measure_chunks(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """
+        Yields the chunks of a body recording the secs spent downloading them,
+        but not the ones spent by the consumer, and their size.
+
+        Parameters
+        ----------
+        chunks : Iterator[bytes]
+                The chunks of the body.
+        """
+        transfer_secs = 0.0
+        total_bytes = 0
+        try:
+            while True:
+                started_at = time.perf_counter()
+                chunk = next(chunks, None)
+                transfer_secs += time.perf_counter() - started_at
+                if chunk is None:
+                    return
+                total_bytes += len(chunk)
+                yield chunk
+        finally:
+            self.metrics.observe("transfer_seconds", transfer_secs)  # type: ignore
+            self.metrics.inc("response_bytes_total", total_bytes)  # type: ignore
+
+    def _conditional_headers(self, url: str) -> Optional[Dict[str, str]]:
+        """
+        Returns the conditional headers of the cached response of the URL.
+
+        Parameters
+        ----------
+        url : str
+                The URL to request.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.conditional_headers(url) or None
+
+    def _is_not_modified(self, url: str, response: requests.Response) -> bool:
+        """
+        Whether the response is a 304 that can be served from the cache.
+
+        Parameters
+        ----------
+        url : str
+                The requested URL.
+        response : requests.Response
+                The response of the server.
+        """
+        return (
+            self.cache is not None
+            and response.status_code == 304
+            and self.cache.get(url) is not None
+        )
@@ -0,0 +1,305 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterator, Mapping, Optional
+
+from mr_apollo_2n.utils.base_class import BaseClass
+
+
+class ResponseCache(BaseClass):
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size_bytes: Optional[int] = 1024 * 1024 * 1024,
+        max_age: Optional[float] = 30 * 24 * 3600,
+    ):
+        """
+        On-disk cache of responses, used to send conditional requests.
+
+        Only the responses that carry an ``ETag`` or a ``Last-Modified`` header
+        are stored. Each entry is made of a body file and a JSON file with the
+        validators, both named after the SHA-256 of the URL.
+
+        Parameters
+        ----------
+        cache_dir : str
+                The directory where the entries are stored, created if missing.
+        max_size_bytes : Optional[int], optional
+                Max total size of the stored bodies (default is 1 GiB). The least
+                recently used entries are evicted first. None means no limit.
+        max_age : Optional[float], optional
+                Secs after which an entry not validated against the server is
+                evicted (default is 30 days). None means no limit.
+        """
+        super().__init__(logger_name=__name__)
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.max_age = max_age
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        for file_name in os.listdir(cache_dir):
+            if file_name.endswith(".json"):
+                entry = self._read_meta(os.path.join(cache_dir, file_name))
+                if entry is not None:
+                    self._entries[file_name[: -len(".json")]] = entry
+        self.evict()
+
+    @property
+    def total_size(self) -> int:
+        """
+        The total size in bytes of the stored bodies.
+        """
+        return sum(entry["size"] for entry in self._entries.values())
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.body")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def _read_meta(path: str) -> Optional[Dict]:
+        try:
+            with open(path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, key: str, entry: Dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, self._meta_path(key))
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Returns the metadata of the entry of the URL, if it is stored.
+
+        Parameters
+        ----------
+        url : str
+                The URL of the entry.
+        """
+        return self._entries.get(self._key(url))
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Builds the conditional request headers for the entry of the URL.
+
+        Parameters
+        ----------
+        url : str
+                The URL to request.
+
+        Returns
+        -------
+        Dict[str, str]
+                The ``If-None-Match`` and ``If-Modified-Since`` headers, empty
+                if the URL is not stored.
+        """
+        entry = self.get(url)
+        headers: Dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def iter_body(self, url: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Yields the stored body of the URL in chunks, marking it as validated.
+
+        Parameters
+        ----------
+        url : str
+                The URL of the entry.
+        chunk_size : int, optional
+                The size in bytes of the yielded chunks (default is 64 KiB).
+        """
+        key = self._key(url)
+        self._touch(key)
+        with open(self._body_path(key), "rb") as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def read_text(self, url: str) -> str:
+        """
+        Returns the stored body of the URL decoded as text.
+
+        Parameters
+        ----------
+        url : str
+                The URL of the entry.
+        """
+        entry = self.get(url) or {}
+        body = b"".join(self.iter_body(url))
+        return body.decode(entry.get("encoding") or "utf-8", errors="replace")
+
+    def _touch(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry["validated_at"] = time.time()
+            self._write_meta(key, entry)
+
+    def open_writer(
+        self,
+        url: str,
+        headers: Mapping[str, str],
+        encoding: Optional[str] = None,
+    ) -> Optional["CacheEntryWriter"]:
+        """
+        Opens a writer to store the body of a response while it is streamed.
+
+        Parameters
+        ----------
+        url : str
+                The URL of the response.
+        headers : Mapping[str, str]
+                The headers of the response.
+        encoding : Optional[str], optional
+                The text encoding of the body (default is None).
+
+        Returns
+        -------
+        Optional[CacheEntryWriter]
+                The writer, or None if the response has no validators.
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return None
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": encoding,
+        }
+        return CacheEntryWriter(self, self._key(url), entry)
+
+    def store(
+        self,
+        url: str,
+        body: bytes,
+        headers: Mapping[str, str],
+        encoding: Optional[str] = None,
+    ):
+        """
+        Stores the body of a response, if it has validators.
+
+        Parameters
+        ----------
+        url : str
+                The URL of the response.
+        body : bytes
+                The body of the response.
+        headers : Mapping[str, str]
+                The headers of the response.
+        encoding : Optional[str], optional
+                The text encoding of the body (default is None).
+        """
+        writer = self.open_writer(url, headers, encoding)
+        if writer is not None:
+            writer.write(body)
+            writer.commit()
+
+    def _commit(self, key: str, entry: Dict, tmp_path: str):
+        with self._lock:
+            os.replace(tmp_path, self._body_path(key))
+            self._write_meta(key, entry)
+            self._entries[key] = entry
+        self.evict()
+
+    def _remove(self, key: str):
+        self._entries.pop(key, None)
+        for path in (self._meta_path(key), self._body_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """
+        Removes the expired entries and then the least recently validated ones
+        until the total size is under the limit.
+        """
+        with self._lock:
+            now = time.time()
+            if self.max_age is not None:
+                for key, entry in list(self._entries.items()):
+                    if now - entry["validated_at"] > self.max_age:
+                        self._remove(key)
+            if self.max_size_bytes is None:
+                return
+            total_size = self.total_size
+            by_age = sorted(
+                self._entries.items(), key=lambda item: item[1]["validated_at"]
+            )
+            for key, entry in by_age:
+                if total_size <= self.max_size_bytes:
+                    break
+                total_size -= entry["size"]
+                self._remove(key)
+                self.logger.debug(f"Evicted cached response of '{entry['url']}'.")
+
+
+class CacheEntryWriter:
+    """
+    Writes the body of a response into a temporary file of the cache.
+
+    The entry becomes visible only after ``commit``, so an interrupted
+    download never replaces a complete body.
+    """
+
+    def __init__(self, cache: ResponseCache, key: str, entry: Dict):
+        self._cache = cache
+        self._key = key
+        self._entry = entry
+        self._size = 0
+        fd, self._tmp_path = tempfile.mkstemp(dir=cache.cache_dir, suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        """
+        Appends a chunk to the body.
+
+        Parameters
+        ----------
+        chunk : bytes
+                The chunk to append.
+        """
+        self._file.write(chunk)
+        self._size += len(chunk)
+
+    def commit(self):
+        """
+        Stores the written body as the entry of the URL.
+        """
+        self._file.close()
+        now = time.time()
+        self._entry.update(size=self._size, stored_at=now, validated_at=now)
+        self._cache._commit(self._key, self._entry, self._tmp_path)
+
+    def discard(self):
+        """
+        Drops the written body.
+        """
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,98 @@
+import random
+from typing import Iterable, Optional
+
+DEFAULT_RETRYABLE_STATUS_CODES = (
+    408,  # Request Timeout
+    425,  # Too Early
+    429,  # Too Many Requests
+    500,  # Internal Server Error
+    502,  # Bad Gateway
+    503,  # Service Unavailable
+    504,  # Gateway Timeout
+)
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_tries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        multiplier: float = 2.0,
+        jitter: bool = True,
+        retryable_status_codes: Optional[Iterable[int]] = None,
+        respect_retry_after: bool = True,
+        max_retry_after: float = 300.0,
+    ):
+        """
+        Retry policy with capped exponential backoff and jitter.
+
+        The delay before the retry ``n`` (starting at 1) is
+        ``min(max_delay, base_delay * multiplier ** (n - 1))``. With jitter, a
+        random delay between 0 and that value is used instead ("full jitter"),
+        so the clients that failed at the same time do not retry at the same
+        time. A ``Retry-After`` sent by the server is honoured up to
+        ``max_retry_after`` secs.
+
+        Parameters
+        ----------
+        max_tries : int, optional
+                Max number of attempts, including the first one (default is 3).
+        base_delay : float, optional
+                Secs to wait before the first retry (default is 1.0).
+        max_delay : float, optional
+                Max secs to wait between attempts (default is 60.0).
+        multiplier : float, optional
+                The growth factor of the delay (default is 2.0).
+        jitter : bool, optional
+                Whether to randomize the delays (default is True).
+        retryable_status_codes : Optional[Iterable[int]], optional
+                The status codes that are retried. Any other error status code
+                is fatal (default is 408, 425, 429, 500, 502, 503 and 504).
+        respect_retry_after : bool, optional
+                Whether to wait at least the secs of the ``Retry-After`` header
+                (default is True).
+        max_retry_after : float, optional
+                Max secs of ``Retry-After`` that are honoured (default is 300.0).
+        """
+        self.max_tries = max(1, max_tries)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.retryable_status_codes = frozenset(
+            retryable_status_codes
+            if retryable_status_codes is not None
+            else DEFAULT_RETRYABLE_STATUS_CODES
+        )
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+
+    def is_retryable_status(self, status_code: Optional[int]) -> bool:
+        """
+        Whether a response with the status code should be retried.
+
+        Parameters
+        ----------
+        status_code : Optional[int]
+                The status code of the response.
+        """
+        return status_code in self.retryable_status_codes
+
+    def compute_delay(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """
+        Returns the secs to wait before a retry.
+
+        Parameters
+        ----------
+        retry : int
+                The number of the retry, starting at 1.
+        retry_after : Optional[float], optional
+                The secs requested by the server in a ``Retry-After`` header.
+        """
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (retry - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if self.respect_retry_after and retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
@@ -0,0 +1,162 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Scheme and authority of an absolute URL, stripped to get the path to match
+_ORIGIN_RE = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*://[^/?#]*")
+
+
+def _path_of(url: str) -> str:
+    """
+    Returns the path and query of a URL, which are matched against the rules.
+    """
+    path = _ORIGIN_RE.sub("", url, count=1).partition("#")[0]
+    if not path.startswith("/"):
+        path = "/" + path
+    return path
+
+
+def _pattern_to_regex(pattern: str) -> str:
+    """
+    Translates a rule pattern, with the ``*`` and ``$`` wildcards, to a regex.
+    """
+    ends = pattern.endswith("$")
+    if ends:
+        pattern = pattern[:-1]
+    regex = ".*".join(re.escape(part) for part in pattern.split("*"))
+    return regex + ("$" if ends else "")
+
+
+class RobotsTxt:
+    """
+    Parsed robots.txt file, following RFC 9309.
+
+    The rules of the group of the user agent are compiled into a single
+    regex whose alternatives are sorted by priority: the longest pattern
+    first and Allow before Disallow on ties, so the first alternative that
+    matches decides whether a URL can be fetched.
+
+    Attributes:
+            user_agent (str): The product token whose rules are applied.
+            sitemaps (List[str]): The URLs of the ``Sitemap`` lines.
+            crawl_delay (Optional[float]): The ``Crawl-delay`` of the group.
+            rules (List[Tuple[bool, str]]): Whether each rule allows, and its
+                    pattern, in order of priority.
+    """
+
+    def __init__(self, content: str, user_agent: Optional[str] = None):
+        """
+        Parses the content of a robots.txt file.
+
+        Parameters
+        ----------
+        content : str
+                The content of the file.
+        user_agent : Optional[str], optional
+                The product token of the crawler. The most specific group whose
+                user agent is part of the token applies, or the ``*`` group if
+                none matches (default is None, which only uses ``*``).
+        """
+        self.user_agent = (user_agent or "*").lower()
+        self.sitemaps: List[str] = []
+        groups = self._parse(content)
+        agent = self._select_agent(groups)
+        rules, delay = groups.get(agent, ([], None))
+        self.crawl_delay = delay
+
+        # The longest pattern wins, and Allow wins ties
+        self.rules = sorted(
+            (rule for rule in rules if rule[1]),
+            key=lambda rule: (-len(rule[1]), not rule[0]),
+        )
+        self._allows: List[bool] = []
+        self._matcher = None
+        if any(not allow for allow, _ in self.rules):
+            self._allows = [allow for allow, _ in self.rules]
+            self._matcher = re.compile(
+                "|".join(f"({_pattern_to_regex(pattern)})" for _, pattern in self.rules)
+            )
+
+    def _parse(self, content: str) -> Dict[str, Tuple[List, Optional[float]]]:
+        """
+        Returns the rules and the crawl delay of each user agent.
+        """
+        groups: Dict[str, Tuple[List, Optional[float]]] = {}
+        agents: List[str] = []
+        in_agents = False
+        for line in content.splitlines():
+            field, _, value = line.split("#", 1)[0].partition(":")
+            field, value = field.strip().lower(), value.strip()
+            if field == "sitemap":
+                if value:
+                    self.sitemaps.append(value)
+                continue
+            if field == "user-agent":
+                if not in_agents:
+                    agents = []
+                agents.append(value.lower())
+                groups.setdefault(value.lower(), ([], None))
+                in_agents = True
+                continue
+            if field not in ("allow", "disallow", "crawl-delay"):
+                continue
+            in_agents = False
+            for agent in agents:
+                rules, delay = groups[agent]
+                if field == "crawl-delay":
+                    try:
+                        delay = float(value)
+                    except ValueError:
+                        pass
+                    groups[agent] = (rules, delay)
+                else:
+                    rules.append((field == "allow", value))
+        return groups
+
+    def _select_agent(self, groups: Dict) -> str:
+        """
+        Returns the user agent of the group that applies to the crawler.
+        """
+        matches = [
+            agent
+            for agent in groups
+            if agent != "*" and self.user_agent != "*" and agent in self.user_agent
+        ]
+        return max(matches, key=len) if matches else "*"
+
+    def can_fetch(self, url: str) -> bool:
+        """
+        Whether the rules allow fetching the URL.
+
+        Parameters
+        ----------
+        url : str
+                An absolute URL, or a path.
+        """
+        if self._matcher is None:
+            return True
+        path = _path_of(url)
+        if path == "/robots.txt":
+            return True
+        match = self._matcher.match(path)
+        return match is None or self._allows[match.lastindex - 1]  # type: ignore
+
+    def filter(self, urls: Iterable[str]) -> Iterator[str]:
+        """
+        Yields the URLs that the rules allow fetching.
+
+        Parameters
+        ----------
+        urls : Iterable[str]
+                The URLs to filter, of the host of the robots.txt file.
+        """
+        if self._matcher is None:
+            yield from urls
+            return
+        match, allows, strip = self._matcher.match, self._allows, _ORIGIN_RE.sub
+        for url in urls:
+            path = strip("", url, count=1).partition("#")[0]
+            if not path.startswith("/"):
+                path = "/" + path
+            found = match(path)
+            if found is None or allows[found.lastindex - 1] or path == "/robots.txt":
+                yield url
@@ -0,0 +1,134 @@
+import hashlib
+import math
+from typing import Optional, Set
+
+from mr_apollo_2n.utils.utils import normalize_url
+
+
+class SeenSet:
+    """
+    Exact set of the URLs seen during a crawl.
+
+    The URLs are normalized with ``normalize_url`` before being compared, so
+    the equivalent spellings of a URL are seen only once.
+    """
+
+    def __init__(self):
+        self._urls: Set[str] = set()
+
+    def add(self, url: str) -> bool:
+        """
+        Adds a URL to the set.
+
+        Parameters
+        ----------
+        url : str
+                The URL to add.
+
+        Returns
+        -------
+        bool
+                True if the URL was not seen before.
+        """
+        url = normalize_url(url)
+        if url in self._urls:
+            return False
+        self._urls.add(url)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return normalize_url(url) in self._urls
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+
+class BloomFilter(SeenSet):
+    def __init__(self, capacity: int = 10_000_000, error_rate: float = 0.001):
+        """
+        Probabilistic set of the URLs seen during a crawl, with a fixed size.
+
+        A URL never seen may be reported as seen with a probability of about
+        ``error_rate`` once ``capacity`` URLs were added, but a URL seen is
+        never reported as new. 10 million URLs take about 17 MiB with the
+        default error rate.
+
+        Parameters
+        ----------
+        capacity : int, optional
+                The expected number of URLs (default is 10_000_000).
+        error_rate : float, optional
+                The false positive rate at full capacity (default is 0.001).
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, url: str):
+        digest = hashlib.blake2b(normalize_url(url).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (first + i * second) % self.num_bits
+
+    def add(self, url: str) -> bool:
+        new = False
+        bits = self._bits
+        for position in self._positions(url):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def __contains__(self, url: str) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(url)
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def make_seen_set(
+    mode: Optional[str], capacity: int = 10_000_000, error_rate: float = 0.001
+) -> Optional[SeenSet]:
+    """
+    Builds the seen-set used to deduplicate the URLs of a crawl.
+
+    Parameters
+    ----------
+    mode : Optional[str]
+            'exact' for a ``SeenSet``, 'bloom' for a ``BloomFilter`` or None to
+            disable the deduplication.
+    capacity : int, optional
+            The expected number of URLs of the ``BloomFilter`` (default is
+            10_000_000).
+    error_rate : float, optional
+            The false positive rate of the ``BloomFilter`` (default is 0.001).
+
+    Returns
+    -------
+    Optional[SeenSet]
+            The seen-set, or None if the mode is None.
+    """
+    if mode is None:
+        return None
+    if mode == "exact":
+        return SeenSet()
+    if mode == "bloom":
+        return BloomFilter(capacity, error_rate)
+    raise ValueError(f"Unknown dedupe mode: {mode!r}, use 'exact' or 'bloom'")
@@ -0,0 +1,551 @@
+import logging
+import os
+import socket
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import (Any, Dict, Iterable, Iterator, List, Optional, Sequence,
+                    Tuple)
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.base_class import BaseClass
+from mr_apollo_2n.utils.node_sinks import (NODE_FIELDS, NodeSink,
+                                           node_to_record, record_to_node)
+from mr_apollo_2n.utils.rate_limiter import HostRateLimiter
+from mr_apollo_2n.utils.website_node_crawler import WebsiteNodeCrawler
+
+# A sitemap of the queue: its loc, its parent and its lastmod
+WorkItem = Tuple[str, str, Optional[str]]
+
+
+class WorkQueue:
+    def __init__(self, path: str, timeout: float = 60.0):
+        """
+        Queue of the sitemaps of a crawl shared by several worker processes.
+
+        It is a SQLite database in WAL mode, so the workers can run on other
+        hosts if the file is on a shared filesystem with working locks. A
+        worker claims a pending sitemap for a lease period, and completes it in
+        a single transaction that stores its nodes and queues its child
+        sitemaps, which are queued once however many sitemaps list them. The
+        sitemaps whose lease expires, e.g. because their worker died, are
+        claimed again, and the late completions of an expired lease are
+        discarded, so every sitemap is stored exactly once.
+
+        Parameters
+        ----------
+        path : str
+                The path of the database file, created if missing.
+        timeout : float, optional
+                The secs to wait for the lock of the database (default is 60).
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction():
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS work ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, loc TEXT UNIQUE NOT NULL, "
+                "parent TEXT NOT NULL, lastmod TEXT, "
+                "state TEXT NOT NULL DEFAULT 'pending', worker TEXT, "
+                "claimed_at REAL, attempts INTEGER NOT NULL DEFAULT 0, error TEXT)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS work_state ON work (state, id)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS nodes ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, work_id INTEGER NOT NULL, "
+                "loc TEXT, domain TEXT, parent TEXT, element_type TEXT, "
+                "lastmod TEXT, priority REAL, changefreq TEXT, "
+                "properties TEXT, meta TEXT)"
+            )
+
+    def _transaction(self):
+        """
+        Returns a context manager of a write transaction, which takes the lock
+        of the database when it starts, so the claims do not race.
+        """
+        connection = self._connection
+
+        class _Transaction:
+            def __enter__(self):
+                connection.execute("BEGIN IMMEDIATE")
+
+            def __exit__(self, exc_type, exc_value, traceback):
+                connection.execute("ROLLBACK" if exc_type else "COMMIT")
+
+        return _Transaction()
+
+    def add(self, items: Iterable[WorkItem]) -> int:
+        """
+        Queues the sitemaps not queued yet.
+
+        Parameters
+        ----------
+        items : Iterable[WorkItem]
+                The loc, the parent ('' for a root) and the lastmod of the
+                sitemaps.
+
+        Returns
+        -------
+        int
+                The number of sitemaps queued.
+        """
+        with self._transaction():
+            return self._add(items)
+
+    def _add(self, items: Iterable[WorkItem]) -> int:
+        before = self._connection.total_changes
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO work (loc, parent, lastmod) VALUES (?, ?, ?)",
+            items,
+        )
+        return self._connection.total_changes - before
+
+    def claim(self, worker: str, lease: float = 600.0) -> Optional[WorkItem]:
+        """
+        Claims the first pending sitemap, or one whose lease expired.
+
+        Parameters
+        ----------
+        worker : str
+                The id of the worker.
+        lease : float, optional
+                The secs after which the sitemap can be claimed by another
+                worker if it is not completed (default is 600).
+
+        Returns
+        -------
+        Optional[WorkItem]
+                The claimed sitemap, None if there is none to claim.
+        """
+        now = time.time()
+        with self._transaction():
+            row = self._connection.execute(
+                "SELECT id, loc, parent, lastmod FROM work "
+                "WHERE state = 'pending' OR (state = 'claimed' AND claimed_at < ?) "
+                "ORDER BY state DESC, id LIMIT 1",
+                (now - lease,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE work SET state = 'claimed', worker = ?, claimed_at = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker, now, row[0]),
+            )
+        return row[1], row[2], row[3]
+
+    def complete(
+        self,
+        loc: str,
+        worker: str,
+        nodes: Sequence[WebsiteNodeModel],
+        children: Iterable[WorkItem] = (),
+    ) -> bool:
+        """
+        Stores the nodes of a claimed sitemap and queues its child sitemaps.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the sitemap.
+        worker : str
+                The id of the worker that claimed it.
+        nodes : Sequence[WebsiteNodeModel]
+                The nodes of the sitemap.
+        children : Iterable[WorkItem], optional
+                The child sitemaps to crawl (default is none).
+
+        Returns
+        -------
+        bool
+                Whether the sitemap was completed, False if the lease of the
+                worker expired and the sitemap was claimed again.
+        """
+        placeholders = ", ".join(f":{field}" for field in NODE_FIELDS)
+        with self._transaction():
+            row = self._connection.execute(
+                "SELECT id FROM work WHERE loc = ? AND state = 'claimed' "
+                "AND worker = ?",
+                (loc, worker),
+            ).fetchone()
+            if row is None:
+                return False
+            records = (dict(node_to_record(node), work_id=row[0]) for node in nodes)
+            self._connection.executemany(
+                f"INSERT INTO nodes (work_id, {', '.join(NODE_FIELDS)}) "
+                f"VALUES (:work_id, {placeholders})",
+                records,
+            )
+            self._add(children)
+            self._connection.execute(
+                "UPDATE work SET state = 'done', error = NULL WHERE id = ?", (row[0],)
+            )
+        return True
+
+    def fail(self, loc: str, worker: str, error: str, max_attempts: int = 3):
+        """
+        Releases a claimed sitemap that could not be crawled, which is claimed
+        again until it fails ``max_attempts`` times.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the sitemap.
+        worker : str
+                The id of the worker that claimed it.
+        error : str
+                The error.
+        max_attempts : int, optional
+                The max number of attempts (default is 3).
+        """
+        with self._transaction():
+            self._connection.execute(
+                "UPDATE work SET state = CASE WHEN attempts >= ? THEN 'failed' "
+                "ELSE 'pending' END, error = ? "
+                "WHERE loc = ? AND state = 'claimed' AND worker = ?",
+                (max_attempts, error, loc, worker),
+            )
+
+    def clear(self):
+        """
+        Removes all the sitemaps and the nodes, to start a new crawl.
+        """
+        with self._transaction():
+            self._connection.execute("DELETE FROM work")
+            self._connection.execute("DELETE FROM nodes")
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Returns the number of sitemaps of each state: pending, claimed, done
+        and failed.
+        """
+        counts = {"pending": 0, "claimed": 0, "done": 0, "failed": 0}
+        counts.update(
+            self._connection.execute("SELECT state, COUNT(*) FROM work GROUP BY state")
+        )
+        return counts
+
+    def is_finished(self) -> bool:
+        """
+        Whether all the sitemaps were completed or failed.
+        """
+        return (
+            self._connection.execute(
+                "SELECT 1 FROM work WHERE state IN ('pending', 'claimed') LIMIT 1"
+            ).fetchone()
+            is None
+        )
+
+    def iter_nodes(self) -> Iterator[WebsiteNodeModel]:
+        """
+        Yields the nodes stored by the workers, grouped by sitemap in the order
+        the sitemaps were queued.
+
+        The datetimes of the meta dicts are read back as ISO 8601 strings.
+        """
+        cursor = self._connection.execute(
+            f"SELECT {', '.join(f'nodes.{field}' for field in NODE_FIELDS)} "
+            "FROM nodes JOIN work ON work.id = nodes.work_id "
+            "ORDER BY work.id, nodes.id"
+        )
+        for row in cursor:
+            yield record_to_node(dict(zip(NODE_FIELDS, row)))
+
+    def __len__(self) -> int:
+        """
+        The number of nodes stored.
+        """
+        return self._connection.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _ClaimedSitemap:
+    """
+    ``SitemapFrontier`` of a single claimed sitemap, so the workers crawl a
+    sitemap with ``WebsiteNodeCrawler.iter_sitemap_nodes`` as a regular crawl
+    does. Its child sitemaps are collected and queued in the WorkQueue when it
+    is complete, instead of being crawled.
+    """
+
+    def __init__(self, work_queue: WorkQueue, item: WorkItem, worker: str):
+        self.work_queue = work_queue
+        self.worker = worker
+        self.children: List[WorkItem] = []
+        self.completed = False
+        self._items: List[WorkItem] = [item]
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def popleft(self) -> WorkItem:
+        return self._items.pop()
+
+    def append(self, item: WorkItem):
+        self.children.append(item)
+
+    def complete(self, loc: str, nodes: List[WebsiteNodeModel]):
+        self.completed = self.work_queue.complete(
+            loc, self.worker, nodes, self.children
+        )
+
+    def rollback(self):
+        self.children = []
+
+
+def run_worker(
+    queue_path: str,
+    home_url: str,
+    crawler_kwargs: Optional[Dict[str, Any]] = None,
+    share: float = 1.0,
+    lease: float = 600.0,
+    max_attempts: int = 3,
+    poll_interval: float = 1.0,
+    worker_id: Optional[str] = None,
+) -> int:
+    """
+    Crawls the sitemaps of a WorkQueue until all of them are completed.
+
+    It can run in any process with access to the queue, e.g. on other hosts
+    to add workers to a ``ShardedCrawler``.
+
+    Parameters
+    ----------
+    queue_path : str
+            The path of the WorkQueue.
+    home_url : str
+            The Home URL of the website.
+    crawler_kwargs : Optional[Dict[str, Any]], optional
+            The parameters of the WebsiteNodeCrawler of the worker (default is
+            None). ``checkpoint_path`` and ``state_path`` are not supported, and
+            ``dedupe_urls`` only deduplicates the URLs seen by this worker.
+    share : float, optional
+            The fraction of the politeness budget of the website used by this
+            worker, which scales its rate limiter, usually 1 / the number of
+            workers (default is 1.0). Ignored if ``crawler_kwargs`` has a
+            ``rate_limiter``.
+    lease : float, optional
+            The secs a worker has to complete a claimed sitemap (default is
+            600).
+    max_attempts : int, optional
+            The max attempts to crawl a sitemap (default is 3).
+    poll_interval : float, optional
+            The secs waited for new sitemaps while other workers are crawling
+            (default is 1).
+    worker_id : Optional[str], optional
+            The id of the worker (default is the host name and the pid).
+
+    Returns
+    -------
+    int
+            The number of sitemaps completed by the worker.
+    """
+    kwargs = dict(crawler_kwargs or {})
+    for name in ("checkpoint_path", "state_path"):
+        if kwargs.pop(name, None):
+            raise ValueError(f"{name} is not supported by the sharded crawl.")
+    sleep_time = kwargs.get("sleep_time", 2.0)
+    if "rate_limiter" not in kwargs and sleep_time:
+        kwargs["rate_limiter"] = HostRateLimiter(
+            initial_rate=1.0 / sleep_time, share=share
+        )
+    crawler = WebsiteNodeCrawler(home_url, **kwargs)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    logger = logging.getLogger(__name__)
+    try:
+        # Applies the Crawl-delay of the website
+        crawler.get_robots_txt(home_url)
+    except Exception as e:  # noqa
+        logger.warning(f"Could not read the robots.txt file of '{home_url}': {e}")
+
+    seen_urls = crawler.make_url_seen_set()
+    total_completed = 0
+    with WorkQueue(queue_path) as work_queue:
+        while True:
+            item = work_queue.claim(worker_id, lease)
+            if item is None:
+                if work_queue.is_finished():
+                    break
+                time.sleep(poll_interval)
+                continue
+            claimed = _ClaimedSitemap(work_queue, item, worker_id)
+            try:
+                for _ in crawler.iter_sitemap_nodes(
+                    item[0], claimed, seen_urls=seen_urls
+                ):
+                    pass
+            except Exception as e:
+                logger.warning(f"Failed to crawl sitemap '{item[0]}': {e}")
+                work_queue.fail(item[0], worker_id, str(e), max_attempts)
+                continue
+            total_completed += claimed.completed
+    return total_completed
+
+
+class ShardedCrawler(BaseClass):
+    def __init__(
+        self,
+        home_url: str,
+        queue_path: str,
+        num_workers: int = 4,
+        crawler_kwargs: Optional[Dict[str, Any]] = None,
+        lease: float = 600.0,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+    ):
+        """
+        Crawls the sitemaps of a single website with several worker processes.
+
+        The root sitemaps are queued in a WorkQueue, and every worker claims
+        sitemaps from it, queues their child sitemaps and stores their nodes,
+        so the sitemap tree is crawled in parallel. Each worker has its own
+        WebsiteNodeCrawler, with ``1 / num_workers`` of the politeness budget,
+        so the website receives the same requests per sec as a single crawler.
+        More workers can be started on other hosts with ``run_worker``. A
+        stopped crawl resumes when run again with the same queue and
+        ``resume`` set.
+
+        Parameters
+        ----------
+        home_url : str
+                The Home URL of the website.
+        queue_path : str
+                The path of the WorkQueue, where the nodes are stored.
+        num_workers : int, optional
+                The number of worker processes (default is 4).
+        crawler_kwargs : Optional[Dict[str, Any]], optional
+                The parameters of the WebsiteNodeCrawler of each worker, which
+                must be picklable (default is None).
+        lease : float, optional
+                The secs a worker has to complete a claimed sitemap (default is
+                600).
+        max_attempts : int, optional
+                The max attempts to crawl a sitemap (default is 3).
+        poll_interval : float, optional
+                The secs a worker waits for new sitemaps (default is 1).
+        """
+        super().__init__(logger_name=__name__, log_level=logging.INFO)
+        self.home_url = home_url
+        self.queue_path = queue_path
+        self.num_workers = max(1, num_workers)
+        self.crawler_kwargs = dict(crawler_kwargs or {})
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+
+    def seed(self, sitemaps: Optional[List[str]] = None) -> int:
+        """
+        Queues the root sitemaps.
+
+        Parameters
+        ----------
+        sitemaps : Optional[List[str]], optional
+                The URLs of the root sitemaps (default is the sitemaps listed in
+                the robots.txt file).
+
+        Returns
+        -------
+        int
+                The number of sitemaps queued.
+        """
+        if sitemaps is None:
+            crawler = WebsiteNodeCrawler(self.home_url, **self.crawler_kwargs)
+            sitemaps = crawler.extract_sitemaps() or []
+        with WorkQueue(self.queue_path) as work_queue:
+            return work_queue.add((loc, "", None) for loc in sitemaps)
+
+    def run(
+        self, sitemaps: Optional[List[str]] = None, resume: bool = False
+    ) -> Dict[str, int]:
+        """
+        Crawls the website.
+
+        Parameters
+        ----------
+        sitemaps : Optional[List[str]], optional
+                The URLs of the root sitemaps (default is the sitemaps listed in
+                the robots.txt file).
+        resume : bool, optional
+                Whether to resume the crawl of the queue, seeded only if it is
+                empty (default is False, which clears the queue and starts a
+                new crawl).
+
+        Returns
+        -------
+        Dict[str, int]
+                The number of sitemaps of each state of the queue.
+        """
+        with WorkQueue(self.queue_path) as work_queue:
+            if not resume:
+                work_queue.clear()
+            is_empty = not any(work_queue.counts().values())
+        if is_empty or sitemaps is not None:
+            self.seed(sitemaps)
+
+        started_at = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+            futures = [
+                executor.submit(
+                    run_worker,
+                    self.queue_path,
+                    self.home_url,
+                    self.crawler_kwargs,
+                    1.0 / self.num_workers,
+                    self.lease,
+                    self.max_attempts,
+                    self.poll_interval,
+                    f"{socket.gethostname()}:{os.getpid()}:{i}",
+                )
+                for i in range(self.num_workers)
+            ]
+            for future in as_completed(futures):
+                future.result()
+
+        with WorkQueue(self.queue_path) as work_queue:
+            counts = work_queue.counts()
+            total_nodes = len(work_queue)
+        self.logger.info(
+            f"Crawled {counts['done']} sitemaps of '{self.home_url}' with "
+            f"{self.num_workers} workers in {time.perf_counter() - started_at:.1f} "
+            f"secs, {total_nodes} nodes, {counts['failed']} sitemaps failed."
+        )
+        return counts
+
+    def iter_nodes(self) -> Iterator[WebsiteNodeModel]:
+        """
+        Yields the nodes stored by the workers.
+        """
+        with WorkQueue(self.queue_path) as work_queue:
+            yield from work_queue.iter_nodes()
+
+    def export_nodes(self, sink: NodeSink) -> int:
+        """
+        Writes the nodes stored by the workers to a sink.
+
+        Parameters
+        ----------
+        sink : NodeSink
+                The sink, which is flushed, but not closed.
+
+        Returns
+        -------
+        int
+                The number of nodes written.
+        """
+        total_nodes = 0
+        for node in self.iter_nodes():
+            sink.write(node)
+            total_nodes += 1
+        sink.flush()
+        return total_nodes
@@ -0,0 +1,213 @@
+import json
+import os
+import sqlite3
+import tempfile
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+class SitemapState:
+    """
+    State of the sitemaps seen in the previous crawl of a website.
+
+    It maps the ``loc`` of each child sitemap to its ``lastmod``, the hash of
+    its content and the sitemap that listed it, and it is stored as a small
+    JSON file between crawls. The entries of each sitemap are stored in a
+    SQLite database next to it, '<path>.db', so the unchanged sitemaps are
+    read from it instead of being fetched and parsed again. The changes are
+    only committed by ``save``.
+
+    Attributes:
+            path (str): The path of the state file.
+            sitemaps (Dict[str, Dict]): The state of each sitemap, by loc.
+    """
+
+    def __init__(self, path: str):
+        """
+        Loads the state file, if it exists.
+
+        Parameters
+        ----------
+        path : str
+                The path of the state file.
+        """
+        self.path = path
+        self.sitemaps: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self.sitemaps = json.load(file)
+        self._visited: Set[str] = set()
+        self._connection = sqlite3.connect(path + ".db")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, "
+                "sitemap TEXT NOT NULL, element_type TEXT, data TEXT)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_sitemap ON entries (sitemap)"
+            )
+
+    def is_unchanged(self, loc: str, lastmod: Optional[str]) -> bool:
+        """
+        Whether the sitemap has the same lastmod as in the previous crawl.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the sitemap.
+        lastmod : Optional[str]
+                The lastmod listed for the sitemap in its parent index.
+        """
+        previous = self.sitemaps.get(loc)
+        return bool(lastmod) and previous is not None and previous["lastmod"] == lastmod
+
+    def is_content_unchanged(self, loc: str, content_hash: str) -> bool:
+        """
+        Whether the sitemap has the same content as in the previous crawl.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the sitemap.
+        content_hash : str
+                The SHA-256 of its current content.
+        """
+        previous = self.sitemaps.get(loc)
+        return previous is not None and previous.get("content_hash") == content_hash
+
+    def content_hash(self, loc: str) -> Optional[str]:
+        """
+        Returns the hash of the content of the sitemap in the previous crawl.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the sitemap.
+        """
+        previous = self.sitemaps.get(loc)
+        return previous.get("content_hash") if previous is not None else None
+
+    def has_entries(self, loc: str) -> bool:
+        """
+        Whether the entries of the sitemap are stored.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the sitemap.
+        """
+        return (
+            self._connection.execute(
+                "SELECT 1 FROM entries WHERE sitemap = ? LIMIT 1", (loc,)
+            ).fetchone()
+            is not None
+        )
+
+    def iter_entries(self, loc: str) -> Iterator[Tuple[str, Dict]]:
+        """
+        Yields the stored entries of the sitemap, in order.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the sitemap.
+
+        Yields
+        ------
+        Tuple[str, Dict]
+                The element type ('URL' or 'SITEMAP') and the data of the entry,
+                as yielded by ``WebsiteNodeCrawler.iter_sitemap_entries``.
+        """
+        cursor = self._connection.execute(
+            "SELECT element_type, data FROM entries WHERE sitemap = ? ORDER BY id",
+            (loc,),
+        )
+        for element_type, data in cursor:
+            yield element_type, json.loads(data)
+
+    def update(
+        self,
+        loc: str,
+        parent: str,
+        lastmod: Optional[str],
+        content_hash: Optional[str],
+        entries: Optional[List[Tuple[str, str]]] = None,
+    ):
+        """
+        Records the state of a sitemap crawled in the current crawl.
+
+        Parameters
+        ----------
+        loc : str
+                The URL of the sitemap.
+        parent : str
+                The URL of the sitemap index that lists it.
+        lastmod : Optional[str]
+                The lastmod listed for the sitemap in its parent index.
+        content_hash : Optional[str]
+                The SHA-256 of the content of the sitemap.
+        entries : Optional[List[Tuple[str, str]]], optional
+                The element type and the JSON data of its entries, which replace
+                the stored ones (default is None, which keeps them).
+        """
+        if entries is not None:
+            self._connection.execute("DELETE FROM entries WHERE sitemap = ?", (loc,))
+            self._connection.executemany(
+                "INSERT INTO entries (sitemap, element_type, data) VALUES (?, ?, ?)",
+                ((loc, element_type, data) for element_type, data in entries),
+            )
+        previous = self.sitemaps.get(loc)
+        self.sitemaps[loc] = {
+            "lastmod": lastmod,
+            "content_hash": content_hash,
+            "parent": parent,
+            "content_changed": previous is None
+            or previous.get("content_hash") != content_hash,
+        }
+        self._visited.add(loc)
+
+    def save(self):
+        """
+        Writes the state file and commits the entries, dropping the sitemaps
+        no longer listed.
+
+        The sitemaps kept are the ones crawled this time, including the
+        unchanged ones replayed from the state. The trees of the root sitemaps
+        not crawled this time are kept untouched.
+        """
+        children: Dict[str, Set[str]] = {}
+        for loc, state in self.sitemaps.items():
+            children.setdefault(state["parent"], set()).add(loc)
+
+        roots = children.get("", set())
+        kept = self._visited | roots
+        pending = list(roots - self._visited)
+        while pending:
+            for child in children.get(pending.pop(), set()) - kept:
+                kept.add(child)
+                pending.append(child)
+
+        stored = [
+            loc
+            for (loc,) in self._connection.execute(
+                "SELECT DISTINCT sitemap FROM entries"
+            )
+        ]
+        self._connection.executemany(
+            "DELETE FROM entries WHERE sitemap = ?",
+            ((loc,) for loc in stored if loc not in kept),
+        )
+        self._connection.commit()
+        self.sitemaps = {
+            loc: state for loc, state in self.sitemaps.items() if loc in kept
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(self.sitemaps, file)
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        """
+        Closes the database of the entries, discarding the changes not saved.
+        """
+        self._connection.close()
@@ -1,5 +1,11 @@
 import re
-from urllib.parse import urlparse
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator
+from urllib.parse import urlparse, urlunparse
+
+GZIP_MAGIC = b"\x1f\x8b"
+DEFAULT_PORTS = {"http": "80", "https": "443"}
 
 
 def build_domain_name(url: str) -> str:
@@ -44,3 +50,160 @@ def build_domain_name(url: str) -> str:
 
     subdomain = re.sub(r"[^a-zA-Z0-9_]", "_", domain)
     return subdomain
+
+
+def iter_decompressed_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Decompresses on the fly a stream of chunks if it is gzip-compressed.
+
+    The compression is detected by the gzip magic bytes at the start of the
+    stream, so it works for ``.xml.gz`` files no matter the headers sent by
+    the server. Streams that are not compressed are yielded unchanged.
+
+    Parameters
+    ----------
+    chunks : Iterable[bytes]
+        The chunks of the (possibly compressed) stream.
+
+    Returns
+    -------
+    Iterator[bytes]
+        The chunks of the decompressed stream.
+
+    Examples
+    --------
+    >>> import gzip
+    >>> b"".join(iter_decompressed_chunks([gzip.compress(b"<urlset/>")]))
+    b'<urlset/>'
+    >>> list(iter_decompressed_chunks([b"<urlset/>"]))
+    [b'<urlset/>']
+
+    Notes
+    -----
+    Only one chunk of compressed data is held in memory at a time. Files made
+    of several concatenated gzip members are supported.
+    """
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= len(GZIP_MAGIC):
+            break
+
+    if not head.startswith(GZIP_MAGIC):
+        if head:
+            yield head
+        yield from chunks
+        return
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in _chain_head(head, chunks):
+        while chunk:
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+            if not decompressor.eof:
+                break
+            # Start a new member with the data after the end of the current one
+            chunk = decompressor.unused_data
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def _chain_head(head: bytes, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    yield head
+    yield from chunks
+
+
+def parse_w3c_datetime(value: str) -> datetime:
+    """
+    Parses a W3C Datetime (the ISO 8601 profile used by sitemaps) quickly.
+
+    The common forms are parsed with ``datetime.fromisoformat``, and any other
+    value falls back to the much slower, but more lenient, dateutil parser.
+
+    Parameters
+    ----------
+    value : str
+        The datetime to parse, e.g. the lastmod of a sitemap entry.
+
+    Returns
+    -------
+    datetime
+        The parsed datetime, timezone-aware if the value has an offset.
+
+    Raises
+    ------
+    ValueError
+        If the value cannot be parsed.
+
+    Examples
+    --------
+    >>> parse_w3c_datetime("2023-05-01")
+    datetime.datetime(2023, 5, 1, 0, 0)
+    >>> parse_w3c_datetime("2023-05")
+    datetime.datetime(2023, 5, 1, 0, 0)
+    >>> parse_w3c_datetime("2023-05-01T10:30:00.5Z")
+    datetime.datetime(2023, 5, 1, 10, 30, 0, 500000, tzinfo=datetime.timezone.utc)
+
+    Notes
+    -----
+    The year-only and year-month forms of W3C Datetime are parsed as the first
+    day of the period. ``fromisoformat`` only accepts a trailing ``Z`` and
+    fractional seconds of any length since Python 3.11, so on older versions
+    those values are normalized first or handled by the fallback.
+    """
+    text = value.strip()
+    try:
+        if len(text) == 4:
+            return datetime(int(text), 1, 1)
+        if len(text) == 7 and text[4] == "-":
+            return datetime(int(text[:4]), int(text[5:]), 1)
+        if text[-1:] in ("Z", "z"):
+            text = text[:-1] + "+00:00"
+        return datetime.fromisoformat(text)
+    except ValueError:
+        # Only imported for the values fromisoformat cannot parse
+        from dateutil.parser import parse  # type: ignore
+
+        return parse(value)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL so that equivalent URLs compare equal.
+
+    Parameters
+    ----------
+    url : str
+        The URL to normalize.
+
+    Returns
+    -------
+    str
+        The URL with the scheme and host in lowercase, without the default
+        port, the fragment or the surrounding whitespace, and with ``/`` as
+        the path when it is empty.
+
+    Examples
+    --------
+    >>> normalize_url(" HTTPS://www.Example.com:443#top ")
+    'https://www.example.com/'
+    >>> normalize_url("http://example.com:8080/Page?b=1&a=2")
+    'http://example.com:8080/Page?b=1&a=2'
+
+    Notes
+    -----
+    The path and the query are case-sensitive, so they are kept unchanged.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    host, _, port = netloc.rpartition(":")
+    if host and "]" not in port and DEFAULT_PORTS.get(scheme) == port:
+        netloc = host
+    return urlunparse(
+        (scheme, netloc, parsed.path or "/", parsed.params, parsed.query, "")
+    )
@@ -1,16 +1,56 @@
+import hashlib
 import json
 import logging
+import tempfile
+import time
 import xml.etree.ElementTree as ET
 from collections import deque
 from datetime import datetime
-from time import sleep
-from typing import Dict, List, Literal, Optional
-from urllib.parse import urljoin
+from typing import (IO, TYPE_CHECKING, Any, Deque, Dict, Iterable, Iterator,
+                    List, Literal, Optional, Tuple, Union)
+from urllib.parse import urljoin, urlparse
+
+from requests.exceptions import HTTPError  # type: ignore
 
 from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
-from mr_apollo_2n.utils.base_class import BaseClass
+from mr_apollo_2n.utils.base_class import THROTTLED, BaseClass
+from mr_apollo_2n.utils.crawl_checkpoint import (CrawlCheckpoint, FrontierItem,
+                                                 SitemapFrontier)
+from mr_apollo_2n.utils.metrics import MetricsRegistry
+from mr_apollo_2n.utils.node_sinks import NodeBatchSink, NodeSink
+from mr_apollo_2n.utils.rate_limiter import HostRateLimiter, RateLimiter
 from mr_apollo_2n.utils.request_session_utils import RequestSession
-from mr_apollo_2n.utils.utils import build_domain_name
+from mr_apollo_2n.utils.response_cache import ResponseCache
+from mr_apollo_2n.utils.robots_txt import RobotsTxt
+from mr_apollo_2n.utils.seen_set import SeenSet, make_seen_set
+from mr_apollo_2n.utils.sitemap_state import SitemapState
+from mr_apollo_2n.utils.utils import (build_domain_name,
+                                      iter_decompressed_chunks)
+
+if TYPE_CHECKING:
+    from mr_apollo_2n.model.node_batch import NodeBatch
+
+# The max size in bytes of a sitemap kept in memory while it is hashed in
+# incremental mode, the bigger ones are spooled to a temporary file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# The errors of a child sitemap that is skipped instead of failing the crawl:
+# a fatal status code or an invalid document. Connection errors are raised, so
+# a checkpointed crawl can be resumed.
+SITEMAP_ERRORS = (HTTPError, ET.ParseError)
+
+
+def _read_chunks(file: IO[bytes], chunk_size: int) -> Iterator[bytes]:
+    """
+    Yields the chunks of a file from its current position, and closes it.
+    """
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
 
 
 class WebsiteNodeCrawler(BaseClass):
@@ -26,6 +66,18 @@ class WebsiteNodeCrawler(BaseClass):
         method: Optional[str] = "GET",
         allow_redirects: Optional[bool] = True,
         robots_resource: Optional[str] = "robots.txt",
+        stream_chunk_size: Optional[int] = 64 * 1024,
+        response_cache: Optional[ResponseCache] = None,
+        state_path: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        lazy_lastmod: bool = False,
+        dedupe_urls: Optional[Literal["exact", "bloom"]] = None,
+        bloom_capacity: int = 10_000_000,
+        bloom_error_rate: float = 0.001,
+        metrics: Optional[MetricsRegistry] = None,
+        robots_user_agent: Optional[str] = None,
+        respect_robots_txt: bool = False,
+        checkpoint_path: Optional[str] = None,
     ):
         """
         Reads the sitemap and publishes the urls to the topic.
@@ -36,8 +88,10 @@ class WebsiteNodeCrawler(BaseClass):
                 The Home URL of the website.
         request_headers : Optional[str], optional
                 The request headers to use (default is None).
-        sleep_time : int, optional
-                The sleep time between requests (default is 5).
+        sleep_time : float, optional
+                The initial secs between requests to the same host of the default
+                rate limiter, which adapts them to the health of the server
+                (default is 2.0). 0 disables the rate limiting.
         processed_by : Optional[str], optional
                 The name of the processor (default is None).
         processed_at : Optional[datetime], optional
@@ -48,6 +102,53 @@ class WebsiteNodeCrawler(BaseClass):
                 The request method to use (default is "GET").
         robots_resource : Optional[str], optional
                 The URL of the robots.txt file (default is ROBOTS).
+        stream_chunk_size : Optional[int], optional
+                The size in bytes of the chunks read by the streaming parser
+                (default is 64 KiB).
+        response_cache : Optional[ResponseCache], optional
+                The on-disk cache used to send conditional requests, so unchanged
+                robots.txt and sitemaps are not downloaded again (default is None).
+        state_path : Optional[str], optional
+                The path of the state file of the incremental mode (default is
+                None, which disables it). Child sitemaps whose lastmod did not
+                change since the previous crawl are not fetched again, and the
+                ones whose content did not change are not parsed again: their
+                entries are read from the state and yielded with
+                ``meta['unchanged']`` set.
+        rate_limiter : Optional[RateLimiter], optional
+                The per-host rate limiter of the requests (default is a
+                HostRateLimiter built from ``sleep_time``).
+        lazy_lastmod : bool, optional
+                Whether to keep the lastmod of the nodes as the raw string until
+                it is accessed (default is False).
+        dedupe_urls : Optional[Literal["exact", "bloom"]], optional
+                How the page URLs listed in several sitemaps are deduplicated
+                across the crawl: 'exact' keeps a set of all of them, 'bloom' a
+                fixed-size Bloom filter that may drop a few unique URLs
+                (default is None, which keeps the duplicates). The sitemaps are
+                always deduplicated exactly.
+        bloom_capacity : int, optional
+                The expected number of page URLs of the Bloom filter (default
+                is 10_000_000).
+        bloom_error_rate : float, optional
+                The false positive rate of the Bloom filter at full capacity
+                (default is 0.001).
+        metrics : Optional[MetricsRegistry], optional
+                The registry where the requests, the parse time and the nodes
+                of the crawl are recorded (default is None, which disables
+                them).
+        robots_user_agent : Optional[str], optional
+                The product token whose robots.txt rules and Crawl-delay apply
+                (default is None, which uses the ``*`` group).
+        respect_robots_txt : bool, optional
+                Whether to skip the child sitemaps and the URLs disallowed by
+                the robots.txt file of their host (default is False).
+        checkpoint_path : Optional[str], optional
+                The path of the SQLite database where the frontier, the crawled
+                sitemaps and the nodes are checkpointed, so a stopped crawl
+                resumes where it stopped when run again with the same path
+                (default is None). The nodes emitted before the stop are read
+                with ``CrawlCheckpoint.iter_nodes``.
         """
         super().__init__(logger_name=__name__, log_level=logging.INFO)
         if processed_at is None:
@@ -59,6 +160,25 @@ class WebsiteNodeCrawler(BaseClass):
         elif isinstance(request_headers, str):
             self.request_headers = json.loads(request_headers)
         self.sleep_time = sleep_time if sleep_time is not None else 2.0
+        if rate_limiter is None:
+            if self.sleep_time > 0:
+                rate_limiter = HostRateLimiter(initial_rate=1.0 / self.sleep_time)
+            else:
+                rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+        self.lazy_lastmod = lazy_lastmod
+        if dedupe_urls not in (None, "exact", "bloom"):
+            raise ValueError(
+                f"Unknown dedupe mode: {dedupe_urls!r}, use 'exact' or 'bloom'"
+            )
+        self.dedupe_urls = dedupe_urls
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.metrics = metrics
+        self.robots_user_agent = robots_user_agent
+        self.respect_robots_txt = respect_robots_txt
+        self._robots_txt: Dict[str, RobotsTxt] = {}
+        self.checkpoint_path = checkpoint_path
         self.processed_by_type = processed_by_type
         if processed_by is None:
             self.processed_by = (
@@ -71,26 +191,146 @@ class WebsiteNodeCrawler(BaseClass):
         self.request_data = request_data
         self.method = method
         self.robots_resource = robots_resource
+        self.stream_chunk_size = stream_chunk_size
+        self.state_path = state_path
         self.session_request = RequestSession(
             self.method,
             self.request_data,
             self.request_headers,
             self.allow_redirects,
+            cache=response_cache,
+            rate_limiter=self.rate_limiter,
+            metrics=self.metrics,
         )
 
     def fetch_and_parse(self, url: str) -> Optional[ET.Element]:
         """
         Fetch the URL and parse the XML content.
 
+        Gzip-compressed sitemaps are decompressed while they are downloaded.
+
         Parameters
         ----------
         url : str
                 The URL to fetch and parse.
         """
-        content = self.session_request.exec_request(url)
-        if content:
-            return ET.fromstring(content)
-        return None
+        parser = ET.XMLParser()
+        metrics = self.metrics
+        parse_secs = 0.0
+        has_content = False
+        for chunk in self._iter_content(url):
+            if metrics is None:
+                parser.feed(chunk)
+            else:
+                started_at = time.perf_counter()
+                parser.feed(chunk)
+                parse_secs += time.perf_counter() - started_at
+            has_content = has_content or not chunk.isspace()
+        if not has_content:
+            return None
+        if metrics is None:
+            return parser.close()
+        started_at = time.perf_counter()
+        root = parser.close()
+        metrics.observe("parse_seconds", parse_secs + time.perf_counter() - started_at)
+        return root
+
+    def _iter_content(self, url: str) -> Iterator[bytes]:
+        """
+        Yields the chunks of the body of the URL, decompressed if needed.
+
+        Parameters
+        ----------
+        url : str
+                The URL to fetch.
+        """
+        return iter_decompressed_chunks(
+            self.session_request.exec_stream_request(
+                url, chunk_size=self.stream_chunk_size
+            )
+        )
+
+    def iter_sitemap_entries(
+        self,
+        url: str,
+        digest: Optional[Any] = None,
+        chunks: Optional[Iterable[bytes]] = None,
+    ) -> Iterator[Tuple[str, Dict]]:
+        """
+        Fetch the URL and parse the XML content incrementally.
+
+        The body is read in chunks and fed to a pull parser. Every ``<url>`` and
+        ``<sitemap>`` entry is yielded as soon as it is complete and then
+        cleared from the tree, so the memory used does not depend on the size
+        of the sitemap. Gzip-compressed sitemaps are decompressed on the fly.
+
+        Parameters
+        ----------
+        url : str
+                The URL to fetch and parse.
+        digest : Optional[Any], optional
+                A hashlib object updated with the content of the sitemap
+                (default is None).
+        chunks : Optional[Iterable[bytes]], optional
+                The decompressed content of the sitemap, if it was already
+                fetched (default is None, which fetches the URL).
+
+        Yields
+        ------
+        Tuple[str, Dict]
+                The element type ('URL' or 'SITEMAP') and the data of the entry.
+        """
+        parser = ET.XMLPullParser(events=("start", "end"))
+        metrics = self.metrics
+        parse_secs = process_node_secs = 0.0
+        total_entries = 0
+        root = None
+        depth = 0
+        if chunks is None:
+            chunks = self._iter_content(url)
+        for chunk in chunks:
+            if digest is not None:
+                digest.update(chunk)
+            if metrics is None:
+                parser.feed(chunk)
+            else:
+                started_at = time.perf_counter()
+                parser.feed(chunk)
+                parse_secs += time.perf_counter() - started_at
+            for event, node in parser.read_events():
+                if event == "start":
+                    if root is None:
+                        root = node
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth != 1:
+                    continue
+                node_tag = node.tag
+                if node_tag.endswith("url"):
+                    element_type = "URL"
+                elif node_tag.endswith("sitemap"):
+                    element_type = "SITEMAP"
+                else:
+                    self.logger.warning(f"Unknown tag '{node_tag}' in sitemap '{url}'.")
+                    root.clear()  # type: ignore
+                    continue
+                if metrics is None:
+                    url_data = self.process_node(node)
+                else:
+                    started_at = time.perf_counter()
+                    url_data = self.process_node(node)
+                    process_node_secs += time.perf_counter() - started_at
+                    total_entries += 1
+                # Drop the entries already processed to keep the tree empty
+                root.clear()  # type: ignore
+                yield element_type, url_data
+        if root is not None:
+            parser.close()
+        if metrics is not None:
+            metrics.observe("parse_seconds", parse_secs)
+            metrics.observe("process_node_seconds", process_node_secs)
+            metrics.inc("sitemap_entries_total", total_entries)
 
     def extract_sitemaps(self) -> Optional[List[str]]:
         """
@@ -105,18 +345,58 @@ class WebsiteNodeCrawler(BaseClass):
         self.logger.info(f"Extracting sitemaps from '{url}'.")
         content = self.session_request.exec_request(url)
         if content:
-            lines = content.splitlines()
-            sitemaps = [
-                line.split(": ", 1)[1]
-                for line in lines
-                if line.lower().startswith("sitemap:")
-            ]
-            return sitemaps
+            robots_txt = RobotsTxt(content, self.robots_user_agent)
+            self._robots_txt[urlparse(url).netloc] = robots_txt
+            self.rate_limiter.set_crawl_delay(url, robots_txt.crawl_delay)
+            return robots_txt.sitemaps
         else:
             raise Exception(
                 f"Failed to retrieve or parse content from {self.robots_resource}"
             )
 
+    def get_robots_txt(self, url: str) -> RobotsTxt:
+        """
+        Returns the robots.txt file of the host of a URL.
+
+        The file of each host is fetched once and cached for the lifetime of
+        the crawler, and its Crawl-delay is passed to the rate limiter. A file
+        that cannot be fetched allows everything.
+
+        Parameters
+        ----------
+        url : str
+                A URL of the host.
+        """
+        parsed = urlparse(url)
+        host = parsed.netloc
+        if host in self._robots_txt:
+            return self._robots_txt[host]
+
+        if host == urlparse(self.home_url).netloc:
+            robots_url = urljoin(self.home_url, self.robots_resource)
+        else:
+            robots_url = urljoin(f"{parsed.scheme}://{host}/", self.robots_resource)
+        try:
+            content = self.session_request.exec_request(robots_url) or ""
+        except Exception as e:
+            self.logger.warning(f"Could not fetch '{robots_url}', allowing all: {e}")
+            content = ""
+        robots_txt = RobotsTxt(content, self.robots_user_agent)
+        self._robots_txt[host] = robots_txt
+        self.rate_limiter.set_crawl_delay(robots_url, robots_txt.crawl_delay)
+        return robots_txt
+
+    def _is_allowed(self, url: str) -> bool:
+        """
+        Whether the URL can be crawled, according to ``respect_robots_txt``.
+
+        Parameters
+        ----------
+        url : str
+                The URL to check.
+        """
+        return not self.respect_robots_txt or self.get_robots_txt(url).can_fetch(url)
+
     def process_all_sitemaps(self) -> Optional[List[WebsiteNodeModel]]:
         """
         Process all the sitemaps listed in a robots.txt file of a given URL.
@@ -131,17 +411,7 @@ class WebsiteNodeCrawler(BaseClass):
             self.logger.warning("No sitemaps found.")
             return None
         else:
-            processed_elements = []
-            for i, sm in enumerate(sitemaps):
-                self.logger.info(
-                    f"Processing sitemap {i + 1} of {len(sitemaps)}: '{sm}'."
-                )
-                elements_from_sitemap = self.process_sitemap(sm)
-                if elements_from_sitemap:
-                    processed_elements.extend(elements_from_sitemap)
-                else:
-                    self.logger.warning(f"Failed to process sitemap '{sm}'.")
-
+            processed_elements = list(self._iter_crawl(sitemaps))
             self.logger.info(
                 f"Total processed elements from all sitemaps: {len(processed_elements)}"
             )
@@ -157,76 +427,476 @@ class WebsiteNodeCrawler(BaseClass):
                 data[tag] = child.text  # type: ignore
         return data
 
-    def process_sitemap(self, url: str) -> Optional[List[WebsiteNodeModel]]:
+    def _build_meta(self, **extra) -> Dict:
         """
-        Processes a sitemap and returns a list of WebsiteNodeModel objects.
+        Builds the meta dict shared by the nodes of a sitemap.
+
+        Parameters
+        ----------
+        **extra
+                Additional metadata.
+        """
+        return {
+            "processed_by": self.processed_by,
+            "processed_at": self.processed_at,
+            "processed_by_type": self.processed_by_type,
+            "created_at": datetime.now(),
+            **extra,
+        }
+
+    def _build_node(
+        self,
+        url_data: Dict,
+        parent_url: str,
+        element_type: str,
+        meta: Dict,
+    ) -> WebsiteNodeModel:
+        """
+        Builds the WebsiteNodeModel of an entry extracted from a sitemap.
+
+        Parameters
+        ----------
+        url_data : Dict
+                The data of the entry, as returned by ``process_node``. It is
+                consumed by the model, so it must not be reused.
+        parent_url : str
+                The URL of the sitemap from which the entry was extracted.
+        element_type : str
+                The type of the element ('URL' or 'SITEMAP').
+        meta : Dict
+                The meta dict shared by the nodes of the sitemap, as returned
+                by ``_build_meta``.
+        """
+        return WebsiteNodeModel(
+            url_data["loc"],
+            parent_url,
+            element_type,  # type: ignore
+            url_data,
+            meta=meta,
+            lazy_lastmod=self.lazy_lastmod,
+        )
+
+    def _open_incremental_page(
+        self, url: str, lastmod: Optional[str], state: SitemapState
+    ) -> Tuple[Iterator[Tuple[str, Dict]], Optional[str], bool]:
+        """
+        Returns the entries of a sitemap in incremental mode.
+
+        The sitemaps whose lastmod did not change are read from the state
+        without being fetched. The other ones are fetched and hashed, and
+        parsed only if their content changed.
 
         Parameters
         ----------
         url : str
-                The URL of the sitemap to process.
+                The URL of the sitemap.
+        lastmod : Optional[str]
+                The lastmod listed for the sitemap in its parent index.
+        state : SitemapState
+                The state of the previous crawl.
+
+        Returns
+        -------
+        Tuple[Iterator[Tuple[str, Dict]], Optional[str], bool]
+                The entries, the hash of the content and whether the sitemap is
+                unchanged.
         """
-        root = self.fetch_and_parse(url)
-        if root is None:
-            self.logger.warning(f"Could not fetch or parse sitemap '{url}'.")
-            return None
+        if state.is_unchanged(url, lastmod) and state.has_entries(url):
+            return state.iter_entries(url), state.content_hash(url), True
 
-        queue = deque([(url, root)])
-        processed_elements = []
+        digest = hashlib.sha256()
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            for chunk in self._iter_content(url):
+                digest.update(chunk)
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        content_hash = digest.hexdigest()
+        if state.is_content_unchanged(url, content_hash) and state.has_entries(url):
+            spool.close()
+            return state.iter_entries(url), content_hash, True
+        spool.seek(0)
+        chunks = _read_chunks(spool, self.stream_chunk_size or 64 * 1024)  # type: ignore
+        return self.iter_sitemap_entries(url, chunks=chunks), content_hash, False
+
+    def make_url_seen_set(self) -> Optional[SeenSet]:
+        """
+        Builds the seen-set of the page URLs of a crawl, as set by
+        ``dedupe_urls``.
+        """
+        return make_seen_set(
+            self.dedupe_urls, self.bloom_capacity, self.bloom_error_rate
+        )
+
+    def iter_sitemap_nodes(
+        self,
+        url: str,
+        frontier: Optional[SitemapFrontier] = None,
+        seen_sitemaps: Optional[SeenSet] = None,
+        seen_urls: Optional[SeenSet] = None,
+        state: Optional[SitemapState] = None,
+    ) -> Iterator[WebsiteNodeModel]:
+        """
+        Walks a sitemap tree in BFS order yielding its nodes as they are parsed.
+
+        The tree is walked from a frontier, which can persist or distribute
+        the crawl: it is told when each sitemap is crawled, with its nodes, and
+        it can hold only some sitemaps of the tree, e.g. a single one whose
+        child sitemaps are crawled elsewhere.
+
+        The child sitemaps already seen in the crawl are neither yielded nor
+        fetched again, so repeated entries and cycles are walked only once. The
+        node of a child sitemap is yielded with its first entry. A child
+        sitemap that fails with one of ``SITEMAP_ERRORS`` is logged and
+        skipped, keeping the entries parsed before the error, while the errors
+        of the root sitemap and the connection errors are raised.
+
+        Parameters
+        ----------
+        url : str
+                The URL of the root sitemap.
+        frontier : Optional[SitemapFrontier], optional
+                The frontier the sitemaps are read from, e.g. the one of a
+                ``CrawlCheckpoint`` (default is None, which walks the whole
+                tree from an in-memory queue).
+        seen_sitemaps : Optional[SeenSet], optional
+                The sitemaps seen in the crawl, which must include the root one
+                (default is a new set with the root sitemap).
+        seen_urls : Optional[SeenSet], optional
+                The page URLs seen in the crawl, used to skip the duplicates
+                (default is None, which keeps them).
+        state : Optional[SitemapState], optional
+                The state of the previous crawl, from which the entries of the
+                unchanged sitemaps are read, updated with the crawled ones
+                (default is None).
+        """
+        if seen_sitemaps is None:
+            seen_sitemaps = SeenSet()
+            seen_sitemaps.add(url)
+        # Each item is the loc, the parent and the lastmod of a sitemap
+        queue: Union[SitemapFrontier, Deque[FrontierItem]]
+        if frontier is not None:
+            queue = frontier
+        else:
+            queue = deque([(url, "", None)])
+        total_nodes = 0
 
         while queue:
-            parent_url, current_root = queue.popleft()
+            parent_url, grandparent_url, parent_lastmod = queue.popleft()
+            meta = self._build_meta()
+            page_nodes: Optional[List[WebsiteNodeModel]] = (
+                [] if frontier is not None else None
+            )
+            # The entries of a parsed sitemap, stored in the state
+            page_entries: Optional[List[Tuple[str, str]]] = None
+            content_hash = None
+            unchanged = False
             total_enqueued = 0
             total_elements = 0
+            total_sitemaps = 0
+            total_duplicates = 0
+            total_disallowed = 0
+            # The node of a child sitemap is yielded with its first entry, so
+            # the child sitemaps that are empty or fail before their first
+            # entry are dropped
+            sitemap_data: Optional[Dict] = None
+            if grandparent_url:
+                sitemap_data = {"loc": parent_url}
+                if parent_lastmod is not None:
+                    sitemap_data["lastmod"] = parent_lastmod
+            # The error of a child sitemap that cannot be fetched or parsed,
+            # which is skipped keeping the entries parsed before the error.
+            # The errors of the root sitemap are raised.
+            error: Optional[Exception] = None
 
-            for sitemap_node in current_root:
-                node_tag = sitemap_node.tag
-                if node_tag.endswith("url"):
-                    url_data = self.process_node(sitemap_node)
-                    element = WebsiteNodeModel(
-                        url_data["loc"],
-                        parent_url,
-                        "URL",
-                        url_data.copy(),
-                        meta={
-                            "processed_by": self.processed_by,
-                            "processed_at": self.processed_at,
-                            "processed_by_type": self.processed_by_type,
-                            "created_at": datetime.now(),
-                        },
-                    )
-                    processed_elements.append(element)
-                    total_elements += 1
-                elif node_tag.endswith("sitemap"):
-                    url_data = self.process_node(sitemap_node)
-                    child_root = self.fetch_and_parse(url_data["loc"])
-                    if child_root:
-                        sitemap_element = WebsiteNodeModel(
-                            url_data["loc"],
-                            parent_url,
-                            "SITEMAP",
-                            url_data.copy(),
-                            meta={
-                                "processed_by": self.processed_by,
-                                "processed_at": self.processed_at,
-                                "processed_by_type": self.processed_by_type,
-                                "created_at": datetime.now(),
-                            },
+            try:
+                entries: Iterator[Tuple[str, Dict]] = iter(())
+                try:
+                    if state is None:
+                        entries = self.iter_sitemap_entries(parent_url)
+                    else:
+                        entries, content_hash, unchanged = self._open_incremental_page(
+                            parent_url, parent_lastmod, state
+                        )
+                        if unchanged:
+                            meta["unchanged"] = True
+                        else:
+                            page_entries = []
+                except SITEMAP_ERRORS as e:
+                    if not grandparent_url:
+                        raise
+                    error = e
+                while error is None:
+                    try:
+                        element_type, url_data = next(entries)
+                    except StopIteration:
+                        break
+                    except SITEMAP_ERRORS as e:
+                        if not grandparent_url:
+                            raise
+                        error = e
+                        break
+                    if page_entries is not None:
+                        page_entries.append((element_type, json.dumps(url_data)))
+                    if sitemap_data is not None:
+                        node = self._build_node(
+                            sitemap_data, grandparent_url, "SITEMAP", meta
+                        )
+                        sitemap_data = None
+                        total_sitemaps += 1
+                        if page_nodes is not None:
+                            page_nodes.append(node)
+                        yield node
+                    if "loc" not in url_data:
+                        self.logger.warning(
+                            f"Entry without 'loc' in sitemap '{parent_url}'.",
+                            extra=THROTTLED,
                         )
-                        processed_elements.append(sitemap_element)
+                        continue
+                    total_nodes += 1
+                    if not self._is_allowed(url_data["loc"]):
+                        total_disallowed += 1
+                        continue
+                    if element_type != "SITEMAP":
+                        if seen_urls is not None and not seen_urls.add(url_data["loc"]):
+                            total_duplicates += 1
+                            continue
+                        node = self._build_node(
+                            url_data, parent_url, element_type, meta
+                        )
+                        total_elements += 1
+                    else:
+                        loc, lastmod = url_data["loc"], url_data.get("lastmod")
+                        if not seen_sitemaps.add(loc):
+                            total_duplicates += 1
+                            continue
+                        queue.append((loc, parent_url, lastmod))
                         total_enqueued += 1
-                        queue.append((url_data["loc"], child_root))
-                else:
-                    self.logger.warning(f"Unknown tag '{node_tag}' in sitemap '{url}'.")
+                        continue
+                    if page_nodes is not None:
+                        page_nodes.append(node)
+                    yield node
+            except BaseException:
+                # Also reached when the consumer stops before the end
+                if frontier is not None:
+                    frontier.rollback()
+                raise
 
-            self.logger.info(
-                f"Processed page '{parent_url}', "
-                f"total successful elements {total_elements} added, "
-                f"and enqueued {total_enqueued} elements."
-            )
-            sleep(self.sleep_time)
+            if error is not None:
+                self.logger.warning(
+                    f"Skipping the rest of sitemap '{parent_url}', which could not "
+                    f"be fetched or parsed: {error}",
+                    extra=THROTTLED,
+                )
+            if frontier is not None:
+                # The nodes yielded before an error are kept
+                frontier.complete(parent_url, page_nodes or [])
+            if state is not None and error is None:
+                state.update(
+                    parent_url,
+                    grandparent_url,
+                    parent_lastmod,
+                    content_hash,
+                    page_entries,
+                )
+            if self.metrics is not None:
+                if error is None:
+                    self.metrics.inc("sitemap_pages_total")
+                else:
+                    self.metrics.inc("failed_sitemap_pages_total")
+                if unchanged:
+                    self.metrics.inc("unchanged_sitemap_pages_total")
+                self.metrics.inc("nodes_total", total_elements, element_type="URL")
+                self.metrics.inc(
+                    "nodes_total",
+                    total_sitemaps,
+                    element_type="SITEMAP",
+                )
+                self.metrics.inc("duplicates_total", total_duplicates)
+                self.metrics.inc("disallowed_total", total_disallowed)
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    f"Processed {'unchanged ' if unchanged else ''}page '{parent_url}', "
+                    f"total successful elements {total_elements} added, "
+                    f"and enqueued {total_enqueued} elements."
+                    + (
+                        f" Skipped {total_duplicates} duplicates."
+                        if total_duplicates
+                        else ""
+                    )
+                    + (
+                        f" Skipped {total_disallowed} disallowed by robots.txt."
+                        if total_disallowed
+                        else ""
+                    ),
+                    extra=THROTTLED,
+                )
 
         self.logger.debug(
-            f"Total processed elements from sitemap '{url}': {len(processed_elements)}"
+            f"Total processed elements from sitemap '{url}': {total_nodes}"
         )
+
+    def iter_nodes(self, url: Optional[str] = None) -> Iterator[WebsiteNodeModel]:
+        """
+        Yields the WebsiteNodeModel objects of the website as they are crawled.
+
+        Nothing is accumulated in memory, so the consumer can process or store
+        the nodes while the crawl is still running.
+
+        Parameters
+        ----------
+        url : Optional[str], optional
+                The URL of the sitemap to process. By default all the sitemaps
+                listed in the robots.txt file are processed.
+
+        Yields
+        ------
+        WebsiteNodeModel
+                The nodes of the website, in BFS order of each sitemap tree.
+                The node of a child sitemap is yielded just before its first
+                entry, so the child sitemaps that are empty are not yielded.
+                The child sitemaps answered with an error status or that cannot
+                be parsed are logged and skipped, keeping the entries parsed
+                before the error, while the errors of a root sitemap and the
+                connection errors are raised. In
+                incremental mode, the entries of the unchanged sitemaps are
+                read from the state and yielded with ``meta['unchanged']`` set.
+                Each sitemap is yielded once, and so is each page URL when
+                ``dedupe_urls`` is set.
+        """
+        if url is not None:
+            sitemaps = [url]
+        else:
+            sitemaps = self.extract_sitemaps() or []
+            if not sitemaps:
+                self.logger.warning("No sitemaps found.")
+        yield from self._iter_crawl(sitemaps)
+
+    def _iter_crawl(self, sitemaps: List[str]) -> Iterator[WebsiteNodeModel]:
+        """
+        Crawls the trees of the root sitemaps one after another.
+
+        The sitemaps and, if ``dedupe_urls`` is set, the page URLs are
+        deduplicated across all the trees. With a checkpoint, the trees already
+        crawled are skipped and the incomplete one is resumed. The crawl time
+        of each tree and the node rate of the crawl are recorded in the metrics.
+
+        Parameters
+        ----------
+        sitemaps : List[str]
+                The URLs of the root sitemaps.
+        """
+        state = SitemapState(self.state_path) if self.state_path else None
+        seen_sitemaps, seen_urls = SeenSet(), self.make_url_seen_set()
+        checkpoint = None
+        if self.checkpoint_path:
+            checkpoint = CrawlCheckpoint(self.checkpoint_path)
+            checkpoint.add_roots(sitemaps)
+            for loc in checkpoint.iter_sitemap_locs():
+                seen_sitemaps.add(loc)
+            if seen_urls is not None:
+                for loc in checkpoint.iter_node_locs("URL"):
+                    seen_urls.add(loc)
+
+        crawl_nodes, crawl_started_at = 0, time.perf_counter()
+        try:
+            for i, sm in enumerate(sitemaps):
+                self.logger.info(
+                    f"Processing sitemap {i + 1} of {len(sitemaps)}: '{sm}'."
+                )
+                if checkpoint is not None:
+                    if checkpoint.is_root_done(sm):
+                        self.logger.info(f"Skipping already crawled sitemap '{sm}'.")
+                        continue
+                elif not seen_sitemaps.add(sm):
+                    self.logger.info(f"Skipping already processed sitemap '{sm}'.")
+                    continue
+                total_nodes, started_at = 0, time.perf_counter()
+                for node in self.iter_sitemap_nodes(
+                    sm,
+                    checkpoint.frontier(sm) if checkpoint is not None else None,
+                    seen_sitemaps,
+                    seen_urls,
+                    state,
+                ):
+                    total_nodes += 1
+                    crawl_nodes += 1
+                    yield node
+                if self.metrics is not None:
+                    self.metrics.observe(
+                        "process_sitemap_seconds", time.perf_counter() - started_at
+                    )
+                if not total_nodes:
+                    self.logger.warning(f"Failed to process sitemap '{sm}'.")
+            if state is not None:
+                # Only saved once the crawl is complete
+                state.save()
+        finally:
+            if self.metrics is not None:
+                elapsed = time.perf_counter() - crawl_started_at
+                self.metrics.set(
+                    "nodes_per_second", crawl_nodes / elapsed if elapsed else 0
+                )
+            if checkpoint is not None:
+                checkpoint.close()
+            if state is not None:
+                state.close()
+
+    def export_nodes(self, sink: NodeSink, url: Optional[str] = None) -> int:
+        """
+        Crawls the website writing the nodes to a sink in batches.
+
+        Parameters
+        ----------
+        sink : NodeSink
+                The sink where the nodes are written. It is flushed at the end,
+                but not closed.
+        url : Optional[str], optional
+                The URL of the sitemap to process. By default all the sitemaps
+                listed in the robots.txt file are processed.
+
+        Returns
+        -------
+        int
+                The number of nodes written.
+        """
+        total_nodes = 0
+        for node in self.iter_nodes(url):
+            sink.write(node)
+            total_nodes += 1
+        sink.flush()
+        self.logger.info(f"Total exported elements: {total_nodes}")
+        return total_nodes
+
+    def collect_node_batch(self, url: Optional[str] = None) -> "NodeBatch":
+        """
+        Crawls the website into a columnar NodeBatch for bulk analysis.
+
+        Parameters
+        ----------
+        url : Optional[str], optional
+                The URL of the sitemap to process. By default all the sitemaps
+                listed in the robots.txt file are processed.
+        """
+        from mr_apollo_2n.model.node_batch import NodeBatch
+
+        sink = NodeBatchSink(NodeBatch())
+        self.export_nodes(sink, url)
+        return sink.batch
+
+    def process_sitemap(self, url: str) -> Optional[List[WebsiteNodeModel]]:
+        """
+        Processes a sitemap and returns a list of WebsiteNodeModel objects.
+
+        Parameters
+        ----------
+        url : str
+                The URL of the sitemap to process.
+        """
+        processed_elements = list(self.iter_nodes(url))
+        if not processed_elements:
+            self.logger.warning(f"Could not fetch or parse sitemap '{url}'.")
+            return None
         return processed_elements
@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from mr_apollo_2n.model.node_batch import NodeBatch
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def batch():
+    nodes = [
+        WebsiteNodeModel(
+            "https://www.example.com/sitemap-1.xml",
+            "https://www.example.com/sitemap.xml",
+            "SITEMAP",
+            {"lastmod": "2023-01-01"},
+            {},
+        ),
+        WebsiteNodeModel(
+            "https://www.example.com/a",
+            "https://www.example.com/sitemap-1.xml",
+            "URL",
+            {"lastmod": "2023-01-01T10:00:00Z", "priority": "0.8"},
+            {},
+        ),
+        WebsiteNodeModel(
+            "https://blog.example.com/b",
+            "https://www.example.com/sitemap-1.xml",
+            "URL",
+            {"lastmod": "2023-03-01", "changefreq": "daily", "priority": "0.2"},
+            {},
+        ),
+        WebsiteNodeModel(
+            "https://blog.example.com/c",
+            "https://www.example.com/sitemap-1.xml",
+            "URL",
+            {},
+            {},
+        ),
+    ]
+    return NodeBatch.from_nodes(nodes)
+
+
+def test_columns(batch):
+    assert len(batch) == 4
+    assert batch.priority.dtype == np.float32
+    assert np.isnan(batch.priority[0])
+    assert batch.lastmod.dtype == np.dtype("datetime64[us]")
+    assert np.isnat(batch.lastmod[3])
+    assert batch.lastmod[1] == np.datetime64("2023-01-01T10:00:00")
+    assert list(batch.column("changefreq")) == [None, None, "daily", None]
+    assert list(batch.column("element_type")) == ["SITEMAP", "URL", "URL", "URL"]
+    # The parents are stored once
+    assert len(batch.parents) == 2
+
+
+def test_filter(batch):
+    urls = batch.filter(element_type="URL")
+    assert list(urls.column("loc")) == [
+        "https://www.example.com/a",
+        "https://blog.example.com/b",
+        "https://blog.example.com/c",
+    ]
+    recent = batch.filter(
+        element_type="URL", modified_since=datetime(2023, 2, 1, tzinfo=timezone.utc)
+    )
+    assert list(recent.column("loc")) == ["https://blog.example.com/b"]
+    assert len(batch.filter(batch.priority > 0.5)) == 1
+    assert len(batch.filter(domain="unknown.com")) == 0
+    # An unknown changefreq does not select the nodes without changefreq
+    assert not batch.mask(changefreq="bogus").any()
+
+
+def test_group_by_domain(batch):
+    assert batch.count_by_domain() == {"www.example.com": 2, "blog.example.com": 2}
+    groups = batch.group_by_domain()
+    assert list(groups["blog.example.com"].column("loc")) == [
+        "https://blog.example.com/b",
+        "https://blog.example.com/c",
+    ]
+
+
+def test_lastmod_histogram(batch):
+    assert batch.lastmod_histogram("M") == {
+        datetime(2023, 1, 1).date(): 2,
+        datetime(2023, 3, 1).date(): 1,
+    }
+
+
+def test_iter_records(batch):
+    record = list(batch.iter_records())[2]
+    assert record["lastmod"] == datetime(2023, 3, 1, tzinfo=timezone.utc)
+    assert record["priority"] == pytest.approx(0.2)
+    assert record["changefreq"] == "daily"
+    assert list(batch.iter_records())[3]["priority"] is None
+
+
+def test_many_custom_changefreqs():
+    batch = NodeBatch()
+    for i in range(300):
+        batch.append(f"https://example.com/{i}", "", "URL", changefreq=f"custom-{i}")
+    assert len(batch.changefreq_codes) == len(batch) == 300
+    assert batch.column("changefreq")[-1] == "custom-299"
+    assert len(batch.filter(changefreq="custom-200")) == 1
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+
+from mr_apollo_2n.model.site_structure import PathTrie, SiteStructure
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+
+
+def make_node(loc, parent, element_type="URL", lastmod=None):
+    return WebsiteNodeModel(loc, parent, element_type, {"lastmod": lastmod}, {})
+
+
+def test_trie_merges_and_splits_labels():
+    trie = PathTrie()
+    trie.add("/category/shoes/red/1")
+    assert list(trie.root.children) == ["category"]  # type: ignore
+    assert trie.root.children["category"].label == "category/shoes/red"  # type: ignore
+
+    trie.add("/category/shirts/2")
+    trie.add("/category/shoes/red/3?page=2")
+    trie.add("/")
+    category = trie.root.children["category"]  # type: ignore
+    assert category.label == "category"
+    assert sorted(category.children) == ["shirts", "shoes"]  # type: ignore
+    assert sorted(trie.iter_paths()) == [
+        "/",
+        "/category/shirts/2",
+        "/category/shoes/red/1",
+        "/category/shoes/red/3?page=2",
+    ]
+    assert len(trie) == 4
+
+
+def test_trie_stats():
+    trie = PathTrie()
+    trie.add("/blog/a", datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp())
+    trie.add("/blog/2023/b", datetime(2023, 6, 1, tzinfo=timezone.utc).timestamp())
+    trie.add("/blog/2023/c")
+    trie.add("/shop/x/y/z")
+
+    blog = trie.stats("/blog")
+    assert blog is not None
+    assert (blog.pages, blog.total_pages, blog.fan_out) == (1, 3, 1)
+    assert (blog.depth, blog.max_depth, blog.lastmod_count) == (1, 3, 2)
+    assert blog.newest == datetime(2023, 6, 1, tzinfo=timezone.utc)
+    assert blog.oldest == datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+    # '/shop' is inside the merged label 'shop/x/y'
+    shop = trie.stats("/shop/")
+    assert shop is not None
+    assert (shop.pages, shop.total_pages, shop.fan_out, shop.max_depth) == (
+        0,
+        1,
+        1,
+        4,
+    )
+    assert shop.newest is None
+    assert trie.stats("/missing") is None
+
+    sections = trie.sections(1)
+    assert list(sections) == ["/blog", "/shop"]
+    assert sections["/blog"].total_pages == 3
+    assert list(trie.sections(2)) == ["/blog/2023", "/shop/x"]
+
+    # The statistics are aggregated again after a page is added
+    trie.add("/blog/2023/d")
+    assert trie.stats("/blog").total_pages == 4  # type: ignore
+
+
+def test_site_structure_from_nodes():
+    nodes = [
+        make_node("https://example.com/sitemap.xml", "", "SITEMAP"),
+        make_node(
+            "https://example.com/blog.xml",
+            "https://example.com/sitemap.xml",
+            "SITEMAP",
+        ),
+        make_node("https://example.com/blog/a", "https://example.com/blog.xml", "URL"),
+        make_node(
+            "https://example.com/blog/b",
+            "https://example.com/blog.xml",
+            "URL",
+            "2023-05-01",
+        ),
+        make_node("https://example.com/", "https://example.com/sitemap.xml", "URL"),
+        make_node("https://other.com/shop/c", "https://other.com/sitemap.xml"),
+    ]
+    structure = SiteStructure.from_nodes(nodes)
+
+    assert sorted(structure.tries) == ["example.com", "other.com"]
+    assert len(structure.tries["example.com"]) == 3
+    sections = structure.sections()
+    assert list(sections) == ["example.com/blog", "other.com/shop"]
+    assert sections["example.com/blog"].newest == datetime(
+        2023, 5, 1, tzinfo=timezone.utc
+    )
+
+    graph = structure.graph
+    assert graph.roots == ["https://example.com/sitemap.xml"]
+    assert graph.fan_out("https://example.com/sitemap.xml") == 2
+    stats = graph.stats()
+    assert stats["https://example.com/blog.xml"]["depth"] == 1
+    assert stats["https://example.com/blog.xml"]["urls"] == 2
+    assert stats["https://example.com/blog.xml"]["newest"] == datetime(
+        2023, 5, 1, tzinfo=timezone.utc
+    )
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
 import pytest
 
@@ -72,3 +72,58 @@ def test_website_node_model_to_dict(sample_data):
     }
 
     assert node.to_dict() == expected_dict
+
+
+def test_website_node_model_is_compact(sample_data):
+    """
+    Test that WebsiteNodeModel has no per-instance dict and shares strings.
+    """
+    nodes = [
+        WebsiteNodeModel(
+            loc,
+            "".join(["https://www.example.com/", "sitemap.xml"]),
+            "URL",
+            {"changefreq": "".join(["dai", "ly"])},
+            sample_data["meta"],
+        )
+        for loc in ("https://www.example.com/a", "https://www.example.com/b")
+    ]
+
+    assert not hasattr(nodes[0], "__dict__")
+    assert nodes[0].parent is nodes[1].parent
+    assert nodes[0].domain is nodes[1].domain
+    assert nodes[0].changefreq is nodes[1].changefreq
+    assert nodes[0].meta is nodes[1].meta
+
+
+def test_website_node_model_optional_attributes(sample_data):
+    """
+    Test that the optional attributes default to None.
+    """
+    node = WebsiteNodeModel(
+        sample_data["loc"], sample_data["parent"], "URL", {}, sample_data["meta"]
+    )
+
+    assert node.to_dict()["lastmod"] is None
+    assert node.to_dict()["properties"] == {}
+    assert "priority=None" in repr(node)
+    node.properties["key"] = "value"
+    assert node.properties == {"key": "value"}
+
+
+def test_website_node_model_lazy_lastmod(sample_data):
+    """
+    Test that the lastmod is kept raw until it is accessed.
+    """
+    node = WebsiteNodeModel(
+        sample_data["loc"],
+        sample_data["parent"],
+        "URL",
+        {"lastmod": "2022-01-01T12:00:00Z"},
+        sample_data["meta"],
+        lazy_lastmod=True,
+    )
+
+    assert node._lastmod == "2022-01-01T12:00:00Z"
+    assert node.lastmod == datetime(2022, 1, 1, 12, 0, tzinfo=timezone.utc)
+    assert node._lastmod is node.lastmod
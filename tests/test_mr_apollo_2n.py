@@ -1 +1,271 @@
+import json
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests  # type: ignore
+
 from mr_apollo_2n import mr_apollo_2n
+
+
+def test_cli_imports_are_lazy():
+    code = (
+        "import sys, mr_apollo_2n.mr_apollo_2n; "
+        "print(sorted({'requests', 'dateutil', 'xml.etree.ElementTree'} "
+        "& set(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_crawler_imports_are_lazy():
+    code = (
+        "import sys, mr_apollo_2n.utils.website_node_crawler; "
+        "print(sorted({'dateutil', 'mr_apollo_2n.model.node_batch'} "
+        "& set(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_help(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        mr_apollo_2n.main(["crawl", "--help"])
+    assert exit_info.value.code == 0
+    assert "home_url" in capsys.readouterr().out
+
+
+def test_version(capsys):
+    assert mr_apollo_2n.main(["--version"]) == 0
+    assert capsys.readouterr().out.strip()
+
+
+def test_crawl_to_file(requests_mock, tmp_path):
+    requests_mock.get(
+        "https://example.com/robots.txt",
+        text="Sitemap: https://example.com/sitemap.xml\n",
+    )
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text="<urlset><url><loc>https://example.com/a</loc></url></urlset>",
+    )
+    output = tmp_path / "nodes.jsonl"
+    metrics = tmp_path / "metrics.json"
+    status = mr_apollo_2n.main(
+        [
+            "crawl",
+            "https://example.com",
+            "--sleep-time",
+            "0",
+            "-o",
+            str(output),
+            "--metrics",
+            str(metrics),
+            "--quiet",
+        ]
+    )
+    assert status == 0
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [record["loc"] for record in records] == ["https://example.com/a"]
+    assert "requests_total" in json.loads(metrics.read_text())["counters"]
+
+
+def test_crawl_resumes_from_checkpoint(requests_mock, tmp_path, monkeypatch):
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/s1.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/s2.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    requests_mock.get(
+        "https://example.com/s1.xml",
+        text="<urlset><url><loc>https://example.com/a</loc></url></urlset>",
+    )
+    requests_mock.get(
+        "https://example.com/s2.xml", exc=requests.exceptions.ConnectionError
+    )
+    # The retries of the connection error do not wait
+    monkeypatch.setattr(time, "sleep", lambda secs: None)
+    output = tmp_path / "o.jsonl"
+    argv = [
+        "crawl",
+        "https://example.com",
+        "--sitemap",
+        "https://example.com/sitemap.xml",
+        "--sleep-time",
+        "0",
+        "--checkpoint",
+        str(tmp_path / "crawl.db"),
+        "-o",
+        str(output),
+        "-q",
+    ]
+    assert mr_apollo_2n.main(argv) == 1
+
+    requests_mock.get(
+        "https://example.com/s2.xml",
+        text="<urlset><url><loc>https://example.com/c</loc></url></urlset>",
+    )
+    assert mr_apollo_2n.main(argv) == 0
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [record["loc"] for record in records] == [
+        "https://example.com/s1.xml",
+        "https://example.com/a",
+        "https://example.com/s2.xml",
+        "https://example.com/c",
+    ]
+
+
+def test_crawl_error(requests_mock, capsys):
+    requests_mock.get("https://example.com/robots.txt", status_code=404)
+    assert mr_apollo_2n.main(["crawl", "https://example.com", "-q"]) == 1
+    assert "mr-apollo: error" in capsys.readouterr().err
+
+
+def test_worker(requests_mock, tmp_path):
+    from mr_apollo_2n.utils.sharded_crawler import WorkQueue
+
+    requests_mock.get(
+        "https://example.com/robots.txt", text="User-agent: *\nDisallow: /private\n"
+    )
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<urlset>"
+            "<url><loc>https://example.com/a</loc></url>"
+            "<url><loc>https://example.com/private/b</loc></url>"
+            "</urlset>"
+        ),
+    )
+    queue_path = str(tmp_path / "queue.db")
+    with WorkQueue(queue_path) as work_queue:
+        work_queue.add([("https://example.com/sitemap.xml", "", None)])
+
+    status = mr_apollo_2n.main(
+        [
+            "worker",
+            "https://example.com",
+            queue_path,
+            "--sleep-time",
+            "0",
+            "--respect-robots",
+            "-q",
+        ]
+    )
+    assert status == 0
+    with WorkQueue(queue_path) as work_queue:
+        assert [node.loc for node in work_queue.iter_nodes()] == [
+            "https://example.com/a"
+        ]
+
+
+class SitemapHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        host = self.headers["Host"]
+        if self.path == "/robots.txt":
+            body = f"Sitemap: http://{host}/sitemap.xml\n"
+        elif self.path == "/sitemap.xml":
+            body = f"<urlset><url><loc>http://{host}/a</loc></url></urlset>"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_port():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SitemapHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_sharded_crawl_removes_default_work_queue(server_port, tmp_path):
+    output = tmp_path / "o.jsonl"
+    argv = [
+        "crawl",
+        f"http://127.0.0.1:{server_port}/",
+        "--workers",
+        "2",
+        "--sleep-time",
+        "0",
+        "-o",
+        str(output),
+        "-q",
+    ]
+    for _ in range(2):
+        assert mr_apollo_2n.main(argv) == 0
+        records = [json.loads(line) for line in output.read_text().splitlines()]
+        assert [record["loc"] for record in records] == [
+            f"http://127.0.0.1:{server_port}/a"
+        ]
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["o.jsonl"]
+
+
+def test_sharded_crawl_rejects_state(tmp_path, capsys):
+    argv = ["crawl", "https://example.com", "--workers", "2", "--state", "x", "-q"]
+    assert mr_apollo_2n.main(argv) == 1
+    assert "--state cannot be used" in capsys.readouterr().err
+
+
+def test_discover_links_rejects_checkpoint(tmp_path, capsys):
+    argv = [
+        "crawl",
+        "https://example.com",
+        "--discover-links",
+        "--checkpoint",
+        str(tmp_path / "crawl.db"),
+        "-q",
+    ]
+    assert mr_apollo_2n.main(argv) == 1
+    assert "--checkpoint cannot be used with --discover-links" in (
+        capsys.readouterr().err
+    )
+    assert not (tmp_path / "crawl.db").exists()
+
+
+def test_infer_format():
+    assert mr_apollo_2n._infer_format("nodes.csv") == "csv"
+    assert mr_apollo_2n._infer_format("nodes.db") == "sqlite"
+    assert mr_apollo_2n._infer_format("nodes") == "jsonl"
+    assert mr_apollo_2n._infer_format("nodes.store") == "store"
+    assert mr_apollo_2n._infer_format("crawl.snap.gz") == "snapshot"
+
+
+def test_diff(tmp_path, capsys):
+    from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+    from mr_apollo_2n.utils.crawl_snapshot import SnapshotWriter
+
+    for name, locs in (("old", ["a", "b"]), ("new", ["b", "c"])):
+        with SnapshotWriter(str(tmp_path / f"{name}.snap")) as writer:
+            for loc in locs:
+                writer.write(
+                    WebsiteNodeModel(f"https://example.com/{loc}", "", "URL", {}, {})
+                )
+    status = mr_apollo_2n.main(
+        ["diff", str(tmp_path / "old.snap"), str(tmp_path / "new.snap")]
+    )
+    assert status == 0
+    changes = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(change["kind"], change["loc"]) for change in changes] == [
+        ("removed", "https://example.com/a"),
+        ("added", "https://example.com/c"),
+    ]
@@ -0,0 +1,247 @@
+import asyncio
+
+import pytest
+
+from mr_apollo_2n.utils.async_website_node_crawler import \
+    AsyncWebsiteNodeCrawler
+from mr_apollo_2n.utils.metrics import MetricsRegistry
+from mr_apollo_2n.utils.website_node_crawler import WebsiteNodeCrawler
+
+SITEMAP_INDEX = (
+    "<sitemapindex>"
+    "<sitemap><loc>https://example.com/sitemap-1.xml</loc></sitemap>"
+    "<sitemap><loc>https://example.com/sitemap-2.xml</loc></sitemap>"
+    "</sitemapindex>"
+)
+
+
+@pytest.fixture
+def sitemap_tree(requests_mock):
+    requests_mock.get(
+        "https://example.com/robots.txt",
+        text="Sitemap: https://example.com/sitemap.xml\n",
+    )
+    requests_mock.get("https://example.com/sitemap.xml", text=SITEMAP_INDEX)
+    for i in (1, 2):
+        requests_mock.get(
+            f"https://example.com/sitemap-{i}.xml",
+            text=(
+                "<urlset>"
+                f"<url><loc>https://example.com/{i}/a</loc></url>"
+                f"<url><loc>https://example.com/{i}/b</loc></url>"
+                "</urlset>"
+            ),
+        )
+    return requests_mock
+
+
+def _summary(elements):
+    return [(e.loc, e.parent, e.element_type) for e in elements]
+
+
+def test_process_sitemap_async_matches_sync(sitemap_tree):
+    crawler = AsyncWebsiteNodeCrawler("https://example.com", sleep_time=0)
+    sync_crawler = WebsiteNodeCrawler("https://example.com", sleep_time=0)
+
+    result = asyncio.run(
+        crawler.process_sitemap_async("https://example.com/sitemap.xml")
+    )
+    expected = sync_crawler.process_sitemap("https://example.com/sitemap.xml")
+
+    assert _summary(result) == _summary(expected)
+    assert ("https://example.com/2/b", "https://example.com/sitemap-2.xml", "URL") in (
+        _summary(result)
+    )
+
+
+def test_async_matches_sync_with_robots_txt_and_metrics(sitemap_tree):
+    sitemap_tree.get(
+        "https://example.com/robots.txt",
+        text="User-agent: *\nDisallow: /1/a\nDisallow: /sitemap-2.xml\n",
+    )
+    results, registries = [], []
+    for crawler_class in (AsyncWebsiteNodeCrawler, WebsiteNodeCrawler):
+        metrics = MetricsRegistry()
+        crawler = crawler_class(
+            "https://example.com",
+            sleep_time=0,
+            respect_robots_txt=True,
+            metrics=metrics,
+        )
+        if crawler_class is AsyncWebsiteNodeCrawler:
+            nodes = asyncio.run(
+                crawler.process_sitemap_async("https://example.com/sitemap.xml")
+            )
+        else:
+            nodes = crawler.process_sitemap("https://example.com/sitemap.xml")
+        results.append(_summary(nodes))
+        registries.append(metrics)
+
+    assert (
+        results[0]
+        == results[1]
+        == [
+            (
+                "https://example.com/sitemap-1.xml",
+                "https://example.com/sitemap.xml",
+                "SITEMAP",
+            ),
+            ("https://example.com/1/b", "https://example.com/sitemap-1.xml", "URL"),
+        ]
+    )
+    for name, labels in (
+        ("sitemap_pages_total", {}),
+        ("nodes_total", {"element_type": "URL"}),
+        ("nodes_total", {"element_type": "SITEMAP"}),
+        ("disallowed_total", {}),
+    ):
+        assert registries[0].get(name, **labels) == registries[1].get(name, **labels)
+    assert registries[0].get("disallowed_total") == 2
+
+
+@pytest.mark.parametrize("option", ["state_path", "checkpoint_path"])
+def test_unsupported_options(option, tmp_path):
+    with pytest.raises(ValueError):
+        AsyncWebsiteNodeCrawler("https://example.com", **{option: str(tmp_path / "x")})
+
+
+def test_process_all_sitemaps_async(sitemap_tree):
+    crawler = AsyncWebsiteNodeCrawler(
+        "https://example.com", sleep_time=0, max_concurrency_per_host=2
+    )
+    result = asyncio.run(crawler.process_all_sitemaps_async())
+    assert len(result) == 6
+    assert crawler.max_concurrency_per_host == 2
+
+
+def test_host_concurrency_is_bounded(sitemap_tree, monkeypatch):
+    crawler = AsyncWebsiteNodeCrawler(
+        "https://example.com", sleep_time=0, max_concurrency_per_host=1
+    )
+    in_flight = []
+    peak = []
+    iter_sitemap_entries = crawler.iter_sitemap_entries
+
+    def tracked_iter_sitemap_entries(url):
+        in_flight.append(url)
+        peak.append(len(in_flight))
+        try:
+            yield from iter_sitemap_entries(url)
+        finally:
+            in_flight.remove(url)
+
+    monkeypatch.setattr(crawler, "iter_sitemap_entries", tracked_iter_sitemap_entries)
+    asyncio.run(crawler.process_sitemap_async("https://example.com/sitemap.xml"))
+    assert max(peak) == 1
+
+
+def test_process_sitemap_async_skips_cycles(requests_mock):
+    index = requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/sitemap.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/sitemap-1.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    requests_mock.get(
+        "https://example.com/sitemap-1.xml",
+        text=(
+            "<urlset>"
+            "<url><loc>https://example.com/a</loc></url>"
+            "<url><loc>https://example.com/a#top</loc></url>"
+            "</urlset>"
+        ),
+    )
+    crawler = AsyncWebsiteNodeCrawler(
+        "https://example.com", sleep_time=0, dedupe_urls="exact"
+    )
+    nodes = asyncio.run(
+        crawler.process_sitemap_async("https://example.com/sitemap.xml")
+    )
+    assert [node.loc for node in nodes] == [
+        "https://example.com/sitemap-1.xml",
+        "https://example.com/a",
+    ]
+    assert index.call_count == 1
+
+
+def test_empty_child_sitemaps_are_dropped(requests_mock):
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/a.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/b.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/c.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    requests_mock.get("https://example.com/a.xml", text="")
+    requests_mock.get(
+        "https://example.com/b.xml",
+        text="<urlset><url><loc>https://example.com/x</loc></url></urlset>",
+    )
+    requests_mock.get("https://example.com/c.xml", text="<urlset>\n</urlset>")
+    crawler = AsyncWebsiteNodeCrawler("https://example.com", sleep_time=0)
+    sync_crawler = WebsiteNodeCrawler("https://example.com", sleep_time=0)
+
+    result = asyncio.run(
+        crawler.process_sitemap_async("https://example.com/sitemap.xml")
+    )
+    expected = sync_crawler.process_sitemap("https://example.com/sitemap.xml")
+
+    assert _summary(result) == _summary(expected)
+    assert [node.loc for node in result] == [
+        "https://example.com/b.xml",
+        "https://example.com/x",
+    ]
+
+
+def test_failed_child_sitemaps_are_skipped(sitemap_tree):
+    sitemap_tree.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/missing.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/sitemap-1.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/broken.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/sitemap-2.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    sitemap_tree.get("https://example.com/missing.xml", status_code=404)
+    sitemap_tree.get("https://example.com/broken.xml", text="<urlset><url>")
+    metrics = MetricsRegistry()
+    crawler = AsyncWebsiteNodeCrawler(
+        "https://example.com", sleep_time=0, metrics=metrics
+    )
+
+    nodes = asyncio.run(
+        crawler.process_sitemap_async("https://example.com/sitemap.xml")
+    )
+
+    assert [node.loc for node in nodes] == [
+        "https://example.com/sitemap-1.xml",
+        "https://example.com/1/a",
+        "https://example.com/1/b",
+        "https://example.com/sitemap-2.xml",
+        "https://example.com/2/a",
+        "https://example.com/2/b",
+    ]
+    assert metrics.get("failed_sitemap_pages_total") == 2
+    assert metrics.get("sitemap_pages_total") == 3
+
+
+def test_process_all_sitemaps_async_skips_failed_sitemaps(sitemap_tree):
+    sitemap_tree.get(
+        "https://example.com/robots.txt",
+        text=(
+            "Sitemap: https://example.com/missing.xml\n"
+            "Sitemap: https://example.com/sitemap.xml\n"
+        ),
+    )
+    sitemap_tree.get("https://example.com/missing.xml", status_code=404)
+    crawler = AsyncWebsiteNodeCrawler("https://example.com", sleep_time=0)
+    assert len(asyncio.run(crawler.process_all_sitemaps_async())) == 6
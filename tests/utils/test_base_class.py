@@ -1,9 +1,14 @@
 import logging
+import threading
+import time
 from io import StringIO
 
 import pytest
 
-from mr_apollo_2n.utils.base_class import BaseClass
+from mr_apollo_2n.utils.base_class import (THROTTLED, BaseClass,
+                                           RateLimitFilter, SamplingFilter,
+                                           _pipeline, configure_logging,
+                                           flush_logging)
 
 
 @pytest.fixture
@@ -30,3 +35,82 @@ def test_logger_msg(base_instance):
 
     handler.close()
     logger.removeHandler(handler)
+
+
+@pytest.fixture
+def log_output():
+    output = StringIO()
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(logging.Formatter("%(threadName)s %(message)s"))
+    previous_handlers = list(_pipeline.handlers)
+    configure_logging(handlers=[handler])
+    yield output
+    configure_logging(handlers=previous_handlers)
+
+
+def test_handler_is_attached_once():
+    instances = [BaseClass(logger_name="test_base_class.once") for _ in range(5)]
+    assert len(instances[0].logger.handlers) == 1
+
+
+def test_records_are_written_by_the_listener():
+    class ThreadHandler(logging.Handler):
+        def emit(self, record):
+            written.append((threading.current_thread().name, self.format(record)))
+
+    written = []
+    previous_handlers = list(_pipeline.handlers)
+    configure_logging(handlers=[ThreadHandler()])
+    logger = BaseClass(logger_name="test_base_class.listener").logger
+    logger.info("Queued %s", "message")
+    flush_logging()
+    configure_logging(handlers=previous_handlers)
+    [(thread_name, message)] = written
+    assert message == "Queued message"
+    assert thread_name != threading.current_thread().name
+
+
+def test_rate_limit_filter(log_output):
+    configure_logging(throttle=RateLimitFilter(burst=2, period=60))
+    logger = BaseClass(logger_name="test_base_class.rate_limit").logger
+    for i in range(5):
+        logger.info(f"Page {i}", extra=THROTTLED)
+    logger.info("Not throttled")
+    configure_logging()
+    flush_logging()
+    assert [line.split(" ", 1)[1] for line in log_output.getvalue().splitlines()] == [
+        "Page 0",
+        "Page 1",
+        "Not throttled",
+    ]
+
+
+def test_rate_limit_filter_reports_dropped_records():
+    log_filter = RateLimitFilter(burst=1, period=0.05)
+    records = [
+        logging.LogRecord("test", logging.INFO, "file.py", 1, f"Page {i}", None, None)
+        for i in range(3)
+    ]
+    for record in records:
+        record.throttled = True
+    assert [log_filter.filter(record) for record in records[:2]] == [True, False]
+    time.sleep(0.06)
+    assert log_filter.filter(records[2])
+    assert records[2].getMessage() == "Page 2 (1 similar messages dropped)"
+
+
+def test_sampling_filter():
+    log_filter = SamplingFilter(rate=3)
+    kept = []
+    for i in range(7):
+        record = logging.LogRecord(
+            "test", logging.INFO, "file.py", 1, f"Page {i}", None, None
+        )
+        record.throttled = True
+        if log_filter.filter(record):
+            kept.append(record.getMessage())
+    assert kept == [
+        "Page 0",
+        "Page 3 (2 similar messages dropped)",
+        "Page 6 (2 similar messages dropped)",
+    ]
@@ -0,0 +1,90 @@
+import pytest
+import requests  # type: ignore
+
+from mr_apollo_2n.utils.crawl_checkpoint import CrawlCheckpoint
+from mr_apollo_2n.utils.website_node_crawler import WebsiteNodeCrawler
+
+SITEMAP_INDEX = (
+    "<sitemapindex>"
+    "<sitemap><loc>https://example.com/sitemap-1.xml</loc></sitemap>"
+    "<sitemap><loc>https://example.com/sitemap-2.xml</loc></sitemap>"
+    "</sitemapindex>"
+)
+
+
+def urlset(*locs):
+    return (
+        "<urlset>"
+        + "".join(
+            f"<url><loc>{loc}</loc><lastmod>2024-01-01</lastmod></url>" for loc in locs
+        )
+        + "</urlset>"
+    )
+
+
+def test_frontier_is_checkpointed_per_sitemap(tmp_path):
+    with CrawlCheckpoint(str(tmp_path / "crawl.db")) as checkpoint:
+        checkpoint.add_roots(["https://example.com/sitemap.xml"])
+        frontier = checkpoint.frontier("https://example.com/sitemap.xml")
+        assert len(frontier) == 1
+        loc, parent, _ = frontier.popleft()
+        frontier.append(("https://example.com/child.xml", loc, None))
+        checkpoint.rollback()
+        assert len(frontier) == 1
+
+        frontier.append(("https://example.com/child.xml", loc, None))
+        checkpoint.complete(loc, [])
+        assert frontier.popleft()[0] == "https://example.com/child.xml"
+        assert not checkpoint.is_root_done("https://example.com/sitemap.xml")
+        checkpoint.complete("https://example.com/child.xml", [])
+        assert checkpoint.is_root_done("https://example.com/sitemap.xml")
+        assert not frontier
+        with pytest.raises(IndexError):
+            frontier.popleft()
+
+
+def test_crawl_resumes_after_failure(requests_mock, tmp_path):
+    path = str(tmp_path / "crawl.db")
+    requests_mock.get("https://example.com/sitemap.xml", text=SITEMAP_INDEX)
+    first = requests_mock.get(
+        "https://example.com/sitemap-1.xml",
+        text=urlset("https://example.com/a", "https://example.com/b"),
+    )
+    requests_mock.get(
+        "https://example.com/sitemap-2.xml", exc=requests.exceptions.ConnectionError
+    )
+
+    crawler = WebsiteNodeCrawler(
+        "https://example.com", sleep_time=0, checkpoint_path=path
+    )
+    crawler.session_request.retry_policy.max_tries = 1
+    with pytest.raises(requests.exceptions.ConnectionError):
+        list(crawler.iter_nodes("https://example.com/sitemap.xml"))
+
+    requests_mock.get(
+        "https://example.com/sitemap-2.xml", text=urlset("https://example.com/c")
+    )
+    resumed = WebsiteNodeCrawler(
+        "https://example.com", sleep_time=0, checkpoint_path=path
+    )
+    nodes = list(resumed.iter_nodes("https://example.com/sitemap.xml"))
+    assert [node.loc for node in nodes] == [
+        "https://example.com/sitemap-2.xml",
+        "https://example.com/c",
+    ]
+    assert first.call_count == 1
+
+    with CrawlCheckpoint(path) as checkpoint:
+        stored = list(checkpoint.iter_nodes())
+    assert [node.loc for node in stored] == [
+        "https://example.com/sitemap-1.xml",
+        "https://example.com/a",
+        "https://example.com/b",
+        "https://example.com/sitemap-2.xml",
+        "https://example.com/c",
+    ]
+    assert stored[1].lastmod.year == 2024
+    assert stored[1].parent == "https://example.com/sitemap-1.xml"
+
+    # A finished crawl is not crawled again
+    assert list(resumed.iter_nodes("https://example.com/sitemap.xml")) == []
@@ -0,0 +1,98 @@
+import gzip
+
+import pytest
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.crawl_snapshot import (SNAPSHOT_HEADER, SnapshotWriter,
+                                               diff_snapshots, iter_snapshot)
+
+
+def make_node(loc, lastmod=None, priority=None):
+    properties = {"lastmod": lastmod, "priority": priority}
+    return WebsiteNodeModel(
+        loc, "https://example.com/sitemap.xml", "URL", properties, {}
+    )
+
+
+def write_snapshot(path, nodes, run_size=2):
+    with SnapshotWriter(str(path), run_size=run_size, batch_size=1) as writer:
+        for node in nodes:
+            writer.write(node)
+
+
+def test_writer_sorts_and_deduplicates(tmp_path):
+    path = tmp_path / "crawl.snap"
+    write_snapshot(
+        path,
+        [
+            make_node("https://example.com/c"),
+            make_node("https://example.com/a", "2023-01-01"),
+            make_node("https://example.com/b"),
+            make_node("https://example.com/a/b"),
+            make_node("https://example.com/a", "2023-02-01"),
+        ],
+    )
+    entries = list(iter_snapshot(str(path)))
+    assert [entry.loc for entry in entries] == [
+        "https://example.com/a",
+        "https://example.com/a/b",
+        "https://example.com/b",
+        "https://example.com/c",
+    ]
+    assert entries[0].lastmod == "2023-01-01T00:00:00"
+    assert entries[1].lastmod == ""
+    # The runs are removed
+    assert [file.name for file in tmp_path.iterdir()] == ["crawl.snap"]
+
+
+def test_gzipped_snapshot(tmp_path):
+    path = tmp_path / "crawl.snap.gz"
+    write_snapshot(path, [make_node("https://example.com/a\tb")])
+    with gzip.open(path, "rt") as file:
+        assert file.readline().strip() == SNAPSHOT_HEADER
+    assert [entry.loc for entry in iter_snapshot(str(path))] == [
+        "https://example.com/a b"
+    ]
+
+
+def test_diff_snapshots(tmp_path):
+    old, new = tmp_path / "old.snap", tmp_path / "new.snap"
+    write_snapshot(
+        old,
+        [
+            make_node("https://example.com/removed"),
+            make_node("https://example.com/same", "2023-01-01"),
+            make_node("https://example.com/changed", "2023-01-01", "0.5"),
+        ],
+    )
+    write_snapshot(
+        new,
+        [
+            make_node("https://example.com/changed", "2023-02-01", "0.8"),
+            make_node("https://example.com/same", "2023-01-01"),
+            make_node("https://example.com/added"),
+        ],
+    )
+    changes = list(diff_snapshots(str(old), str(new)))
+    assert [(change.kind, change.loc) for change in changes] == [
+        ("added", "https://example.com/added"),
+        ("changed", "https://example.com/changed"),
+        ("removed", "https://example.com/removed"),
+    ]
+    assert changes[1].fields == ("lastmod", "priority")
+    assert changes[1].old.priority == "0.5"  # type: ignore
+    assert changes[1].to_dict()["new"]["lastmod"] == "2023-02-01T00:00:00"
+
+    changes = list(diff_snapshots(str(old), str(new), fields=["priority"]))
+    assert [change.fields for change in changes if change.kind == "changed"] == [
+        ("priority",)
+    ]
+    with pytest.raises(ValueError):
+        list(diff_snapshots(str(old), str(new), fields=["loc"]))
+
+
+def test_iter_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "nodes.jsonl"
+    path.write_text('{"loc": "https://example.com"}\n')
+    with pytest.raises(ValueError):
+        list(iter_snapshot(str(path)))
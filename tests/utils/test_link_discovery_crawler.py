@@ -0,0 +1,93 @@
+import pytest
+from requests import HTTPError
+
+from mr_apollo_2n.utils.link_discovery_crawler import (LinkDiscoveryCrawler,
+                                                       extract_links)
+
+PAGES = {
+    "/": (
+        '<a href="/a">A</a> <a href="b#section">B</a>'
+        '<a href="https://other.com/x">Other</a> <a href="mailto:me@example.com">'
+        '<a href="/file.pdf">PDF</a> <a href="/private/c">C</a>'
+    ),
+    "/a": '<a href="/">Home</a> <a href="/a/deep">Deep</a>',
+    "/b": '<a href="/a">A</a> <a rel="nofollow" href="/hidden">Hidden</a>',
+    "/a/deep": '<a href="/a/deeper">Deeper</a>',
+}
+
+
+@pytest.fixture
+def website(requests_mock):
+    requests_mock.get(
+        "https://example.com/robots.txt", text="User-agent: *\nDisallow: /private\n"
+    )
+    for path, html in PAGES.items():
+        requests_mock.get(f"https://example.com{path}", text=f"<html>{html}</html>")
+    return requests_mock
+
+
+def test_extract_links():
+    html = (
+        '<base href="https://example.com/dir/">'
+        '<a href="page">1</a><a href="/page#top">2</a><a href="/page">3</a>'
+        '<a href="javascript:void(0)">4</a><area href="https://EXAMPLE.com/map">'
+    )
+    assert extract_links(html, "https://example.com/") == [
+        "https://example.com/dir/page",
+        "https://example.com/page",
+        "https://example.com/map",
+    ]
+    assert (
+        extract_links('<meta name="robots" content="nofollow"><a href="/x">', "/") == []
+    )
+
+
+def test_iter_page_nodes(website):
+    crawler = LinkDiscoveryCrawler("https://example.com", sleep_time=0, max_depth=2)
+    nodes = {node.loc: node for node in crawler.iter_page_nodes()}
+    assert set(nodes) == {
+        "https://example.com/",
+        "https://example.com/a",
+        "https://example.com/b",
+        "https://example.com/a/deep",
+    }
+    assert nodes["https://example.com/a/deep"].parent == "https://example.com/a"
+    assert nodes["https://example.com/a/deep"].properties["depth"] == 2
+    assert {node.element_type for node in nodes.values()} == {"PAGE"}
+    assert nodes["https://example.com/"].parent == ""
+
+
+def test_page_budget(website):
+    crawler = LinkDiscoveryCrawler(
+        "https://example.com", sleep_time=0, max_pages=2, max_workers=1
+    )
+    nodes = crawler.process_links()
+    assert [node.loc for node in nodes] == [
+        "https://example.com/",
+        "https://example.com/a",
+    ]
+
+
+def test_falls_back_to_links_without_sitemaps(website):
+    crawler = LinkDiscoveryCrawler("https://example.com", sleep_time=0, max_depth=1)
+    nodes = crawler.process_all_sitemaps()
+    assert len(nodes) == 3
+
+
+def test_sitemap_errors_do_not_fall_back_to_links(website):
+    website.get(
+        "https://example.com/robots.txt",
+        text="Sitemap: https://example.com/sitemap.xml\n",
+    )
+    website.get("https://example.com/sitemap.xml", status_code=404)
+    crawler = LinkDiscoveryCrawler("https://example.com", sleep_time=0)
+    with pytest.raises(HTTPError):
+        crawler.process_all_sitemaps()
+    assert website.request_history[-1].url == "https://example.com/sitemap.xml"
+
+
+def test_iter_nodes_streams_the_fallback(website):
+    crawler = LinkDiscoveryCrawler("https://example.com", sleep_time=0, max_depth=1)
+    nodes = crawler.iter_nodes()
+    assert next(nodes).loc == "https://example.com/"
+    assert len(list(nodes)) == 2
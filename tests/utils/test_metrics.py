@@ -0,0 +1,44 @@
+import json
+
+from mr_apollo_2n.utils.metrics import MetricsRegistry
+
+
+def test_counters_and_gauges():
+    metrics = MetricsRegistry()
+    metrics.inc("requests_total", status=200)
+    metrics.inc("requests_total", 2, status=200)
+    metrics.inc("requests_total", status=503)
+    metrics.set("nodes_per_second", 12.5)
+    assert metrics.get("requests_total", status=200) == 3
+    assert metrics.get("requests_total", status=503) == 1
+    assert metrics.get("requests_total", status=404) is None
+    assert metrics.get("nodes_per_second") == 12.5
+
+
+def test_histogram_and_timer():
+    metrics = MetricsRegistry()
+    metrics.observe("request_seconds", 0.02)
+    metrics.observe("request_seconds", 3.0)
+    with metrics.timer("request_seconds"):
+        pass
+    histogram = metrics.histogram("request_seconds")
+    assert histogram.count == 3
+    assert histogram.max == 3.0
+    assert histogram.cumulative_counts()[-1] == 3
+
+
+def test_exports():
+    metrics = MetricsRegistry(prefix="crawler")
+    metrics.inc("requests_total", status=200)
+    metrics.observe("parse_seconds", 0.5)
+    snapshot = json.loads(metrics.to_json())
+    assert snapshot["counters"]["requests_total"] == [
+        {"labels": {"status": "200"}, "value": 1}
+    ]
+    assert snapshot["histograms"]["parse_seconds"][0]["value"]["count"] == 1
+    text = metrics.to_prometheus()
+    assert "# TYPE crawler_requests_total counter" in text
+    assert 'crawler_requests_total{status="200"} 1' in text
+    assert 'crawler_parse_seconds_bucket{le="0.5"} 1' in text
+    assert 'crawler_parse_seconds_bucket{le="+Inf"} 1' in text
+    assert "crawler_parse_seconds_count 1" in text
@@ -0,0 +1,90 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mr_apollo_2n.utils.multi_site_crawler import MultiSiteCrawler, crawl_site
+
+
+class SitemapHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        host = self.headers["Host"]
+        if self.path == "/robots.txt":
+            body = f"Sitemap: http://{host}/sitemap.xml\n"
+        elif self.path == "/sitemap.xml":
+            body = (
+                "<urlset>"
+                f"<url><loc>http://{host}/a</loc></url>"
+                f"<url><loc>http://{host}/b</loc></url>"
+                "</urlset>"
+            )
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_port():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SitemapHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_group_by_host():
+    crawler = MultiSiteCrawler(
+        [
+            "https://a.com/",
+            "https://b.com/",
+            "https://A.com/blog/",
+            "https://b.com/",
+        ]
+    )
+    assert crawler.group_by_host() == {
+        "a.com": ["https://a.com/", "https://A.com/blog/"],
+        "b.com": ["https://b.com/"],
+    }
+
+
+def test_crawl_site_isolates_errors(requests_mock):
+    requests_mock.get("https://example.com/robots.txt", status_code=404)
+    result = crawl_site("https://example.com", {"sleep_time": 0})
+    assert not result.ok
+    assert "HTTPError" in result.error
+
+
+def test_multi_site_crawler(server_port, tmp_path):
+    home_urls = [
+        f"http://127.0.0.1:{server_port}/",
+        f"http://localhost:{server_port}/",
+        f"http://localhost:{server_port}/missing/",
+    ]
+    crawler = MultiSiteCrawler(
+        home_urls,
+        max_workers=2,
+        crawler_kwargs={"sleep_time": 0},
+        show_progress=False,
+    )
+    results = {result.home_url: result for result in crawler.run()}
+    assert set(results) == set(home_urls)
+    assert results[home_urls[0]].total_nodes == 2
+    assert [node.loc for node in results[home_urls[1]].nodes] == [
+        f"http://localhost:{server_port}/a",
+        f"http://localhost:{server_port}/b",
+    ]
+    assert not results[home_urls[2]].ok
+
+    crawler.output_dir = str(tmp_path)
+    for result in crawler.iter_results():
+        if result.ok:
+            with open(result.output_path, encoding="utf-8") as file:
+                assert len(file.readlines()) == 2
@@ -0,0 +1,77 @@
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.node_sinks import (CsvNodeSink, JsonlNodeSink,
+                                           ParquetNodeSink, SqliteNodeSink)
+
+
+def _nodes(total):
+    return [
+        WebsiteNodeModel(
+            f"https://example.com/page{i}",
+            "https://example.com/sitemap.xml",
+            "URL",
+            {"lastmod": "2022-01-01T12:00:00", "custom_property": "custom_value"},
+            {"key1": "value1"},
+        )
+        for i in range(total)
+    ]
+
+
+def test_jsonl_sink_writes_in_batches(tmp_path):
+    path = tmp_path / "nodes.jsonl"
+    sink = JsonlNodeSink(str(path), batch_size=2)
+    for node in _nodes(3):
+        sink.write(node)
+    # The first full batch is already on disk before closing the sink
+    assert len(path.read_text().splitlines()) == 2
+    sink.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 3
+    assert lines[0]["loc"] == "https://example.com/page0"
+    assert lines[0]["lastmod"] == "2022-01-01T12:00:00"
+    assert lines[0]["priority"] is None
+    assert sink.total_written == 3
+
+
+def test_csv_sink(tmp_path):
+    path = tmp_path / "nodes.csv"
+    with CsvNodeSink(str(path)) as sink:
+        for node in _nodes(2):
+            sink.write(node)
+
+    with open(path, newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert [row["loc"] for row in rows] == [
+        "https://example.com/page0",
+        "https://example.com/page1",
+    ]
+    assert json.loads(rows[0]["properties"]) == {"custom_property": "custom_value"}
+
+
+def test_sqlite_sink(tmp_path):
+    path = tmp_path / "nodes.db"
+    with SqliteNodeSink(str(path), batch_size=2) as sink:
+        for node in _nodes(5):
+            sink.write(node)
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT COUNT(*) FROM website_nodes").fetchone() == (5,)
+    assert connection.execute(
+        "SELECT domain, element_type FROM website_nodes LIMIT 1"
+    ).fetchone() == ("example.com", "URL")
+    connection.close()
+
+
+def test_parquet_sink(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "nodes.parquet"
+    with ParquetNodeSink(str(path)) as sink:
+        for node in _nodes(3):
+            sink.write(node)
+    assert pq.read_table(path).num_rows == 3
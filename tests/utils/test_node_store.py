@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.node_store import NodeStore
+
+
+def make_node(loc, parent="https://example.com/sitemap.xml", lastmod=None):
+    element_type = "SITEMAP" if loc.endswith(".xml") else "URL"
+    return WebsiteNodeModel(loc, parent, element_type, {"lastmod": lastmod}, {})
+
+
+@pytest.fixture
+def store(tmp_path):
+    with NodeStore(str(tmp_path / "nodes.db"), batch_size=2) as store:
+        store.add(
+            [
+                make_node("https://example.com/blog.xml"),
+                make_node(
+                    "https://example.com/blog/a",
+                    "https://example.com/blog.xml",
+                    "2023-01-01",
+                ),
+                make_node(
+                    "https://example.com/blog/b",
+                    "https://example.com/blog.xml",
+                    "2023-06-01T12:00:00+02:00",
+                ),
+                make_node("https://example.com/blogger", lastmod="2023-07-01"),
+                make_node("https://other.com/blog/c", "https://other.com/sitemap.xml"),
+            ]
+        )
+        yield store
+
+
+def test_query_by_path_prefix_and_lastmod(store):
+    assert list(store.query_locs(path_prefix="/blog/")) == [
+        "https://example.com/blog/a",
+        "https://example.com/blog/b",
+        "https://other.com/blog/c",
+    ]
+    assert list(
+        store.query_locs(
+            path_prefix="https://example.com/blog/", modified_since="2023-03-01"
+        )
+    ) == ["https://example.com/blog/b"]
+    since = datetime(2023, 6, 1, 10, 0, tzinfo=timezone.utc)
+    assert list(store.query_locs(domain="example.com", modified_since=since)) == [
+        "https://example.com/blog/b",
+        "https://example.com/blogger",
+    ]
+
+
+def test_children_are_rebuilt_as_nodes(store):
+    children = list(store.children("https://example.com/blog.xml"))
+    assert [node.loc for node in children] == [
+        "https://example.com/blog/a",
+        "https://example.com/blog/b",
+    ]
+    assert children[0].lastmod == datetime(2023, 1, 1)
+    assert children[0].element_type == "URL"
+
+
+def test_counts(store):
+    assert len(store) == 5
+    assert store.count(element_type="SITEMAP") == 1
+    assert store.count(path_prefix="/blog") == 5
+    assert store.count(path_prefix="/blog", element_type="URL") == 4
+    assert store.count_by("domain") == {"example.com": 4, "other.com": 1}
+    assert store.count_by("parent", domain="other.com") == {
+        "https://other.com/sitemap.xml": 1
+    }
+    with pytest.raises(ValueError):
+        store.count_by("loc")
+
+
+def test_store_is_persistent(tmp_path):
+    path = str(tmp_path / "nodes.db")
+    with NodeStore(path) as store:
+        for i in range(3):
+            store.write(make_node(f"https://example.com/{i}"))
+    with NodeStore(path) as store:
+        assert store._has_indexes()
+        store.add(make_node("https://example.com/3"))
+        assert store.count_by("element_type") == {"URL": 4}
+        assert list(store.query_locs(limit=2)) == [
+            "https://example.com/0",
+            "https://example.com/1",
+        ]
@@ -0,0 +1,72 @@
+from email.utils import formatdate
+from time import time
+
+import pytest
+
+from mr_apollo_2n.utils.rate_limiter import (HostRateLimiter, TokenBucket,
+                                             parse_retry_after)
+
+
+def test_token_bucket_spaces_reservations():
+    bucket = TokenBucket(rate=2.0, capacity=1.0)
+    now = bucket.updated_at
+    assert bucket.reserve(now) == 0.0
+    assert bucket.reserve(now) == pytest.approx(0.5)
+    assert bucket.reserve(now) == pytest.approx(1.0)
+
+
+def test_rate_grows_when_healthy_and_backs_off_on_429():
+    limiter = HostRateLimiter(initial_rate=1.0, increase_step=0.5, max_rate=2.0)
+    for _ in range(5):
+        limiter.record("https://example.com/a", 200, 0.1)
+    assert limiter.rate("https://example.com") == 2.0
+
+    limiter.record("https://example.com/a", 429, 0.1)
+    assert limiter.rate("https://example.com") == 1.0
+    limiter.record("https://example.com/a", 200, 10.0)
+    assert limiter.rate("https://example.com") == 0.5
+    # Other hosts are not affected
+    assert limiter.rate("https://other.com") == 1.0
+
+
+def test_crawl_delay_caps_rate():
+    limiter = HostRateLimiter(initial_rate=5.0, min_rate=1.0)
+    limiter.set_crawl_delay("https://example.com/robots.txt", 10)
+    assert limiter.rate("https://example.com") == pytest.approx(0.1)
+    limiter.record("https://example.com/a", 200, 0.1)
+    assert limiter.rate("https://example.com") == pytest.approx(0.1)
+    limiter.record("https://example.com/a", 503, 0.1)
+    assert limiter.rate("https://example.com") == pytest.approx(0.1)
+
+
+def test_retry_after_pauses_host(mocker):
+    sleep = mocker.patch("mr_apollo_2n.utils.rate_limiter.time.sleep")
+    limiter = HostRateLimiter(initial_rate=100.0, max_rate=100.0)
+    limiter.record("https://example.com/a", 429, 0.1, retry_after=30)
+    limiter.acquire("https://example.com/a")
+    assert sleep.call_args[0][0] == pytest.approx(30, abs=1)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after(formatdate(time() + 60, usegmt=True)) == pytest.approx(
+        60, abs=2
+    )
+
+
+def test_parse_retry_after_is_bounded():
+    assert parse_retry_after("inf") is None
+    assert parse_retry_after("nan") is None
+    assert parse_retry_after("-5") == 0.0
+    assert parse_retry_after("1e12", max_delay=300) == 300
+    assert parse_retry_after(formatdate(time() + 3600, usegmt=True), 60) == 60
+
+
+def test_share_scales_the_politeness_budget():
+    limiter = HostRateLimiter(initial_rate=1.0, increase_step=0.5, share=0.25)
+    assert limiter.rate("https://example.com") == 0.25
+    limiter.record("https://example.com/a", 200, 0.1)
+    assert limiter.rate("https://example.com") == 0.375
+    limiter.set_crawl_delay("https://example.com", 2.0)
+    assert limiter.rate("https://example.com") == 0.125
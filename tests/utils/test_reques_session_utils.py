@@ -1,9 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
 
 import pytest
 from requests.exceptions import ConnectionError, HTTPError  # type: ignore
 
+from mr_apollo_2n.utils.metrics import MetricsRegistry
 from mr_apollo_2n.utils.request_session_utils import RequestSession
+from mr_apollo_2n.utils.response_cache import ResponseCache
+from mr_apollo_2n.utils.retry_policy import RetryPolicy
 
 
 def test_exec_request_success():
@@ -44,3 +48,167 @@ def test_exec_request_unexpected_exception():
         session = RequestSession("GET", {}, {}, True, retry_delay=1, retry_tries=1)
         with pytest.raises(Exception):
             session.exec_request("http://example.com")
+
+
+def test_exec_stream_request_yields_chunks(requests_mock):
+    requests_mock.get("http://example.com/sitemap.xml", content=b"0123456789")
+    session = RequestSession("GET", {}, {}, True, retry_delay=1, retry_tries=1)
+    chunks = list(
+        session.exec_stream_request("http://example.com/sitemap.xml", chunk_size=4)
+    )
+    assert b"".join(chunks) == b"0123456789"
+    assert len(chunks) == 3
+
+
+def test_exec_request_not_modified_uses_cache(requests_mock, tmp_path):
+    url = "http://example.com/sitemap.xml"
+    requests_mock.get(
+        url,
+        [
+            {"text": "<urlset/>", "headers": {"ETag": '"v1"'}},
+            {"status_code": 304},
+        ],
+    )
+    session = RequestSession(
+        "GET", {}, {}, True, retry_delay=1, retry_tries=1, cache=ResponseCache(tmp_path)
+    )
+
+    assert session.exec_request(url) == "<urlset/>"
+    assert session.exec_request(url) == "<urlset/>"
+    assert requests_mock.request_history[1].headers["If-None-Match"] == '"v1"'
+
+
+def test_exec_stream_request_not_modified_uses_cache(requests_mock, tmp_path):
+    url = "http://example.com/sitemap.xml"
+    requests_mock.get(
+        url,
+        [
+            {
+                "content": b"<urlset/>",
+                "headers": {"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"},
+            },
+            {"status_code": 304},
+        ],
+    )
+    session = RequestSession(
+        "GET", {}, {}, True, retry_delay=1, retry_tries=1, cache=ResponseCache(tmp_path)
+    )
+
+    assert b"".join(session.exec_stream_request(url)) == b"<urlset/>"
+    assert b"".join(session.exec_stream_request(url)) == b"<urlset/>"
+    assert (
+        requests_mock.request_history[1].headers["If-Modified-Since"]
+        == "Wed, 21 Oct 2015 07:28:00 GMT"
+    )
+
+
+def test_exec_request_retries_with_backoff(requests_mock, mocker):
+    sleep = mocker.patch("mr_apollo_2n.utils.request_session_utils.time.sleep")
+    url = "http://example.com/sitemap.xml"
+    requests_mock.get(
+        url,
+        [
+            {"status_code": 503, "headers": {"Retry-After": "7"}},
+            {"status_code": 500},
+            {"text": "Success"},
+        ],
+    )
+    session = RequestSession(retry_policy=RetryPolicy(max_tries=3, jitter=False))
+
+    assert session.exec_request(url) == "Success"
+    assert [call[0][0] for call in sleep.call_args_list] == [7, 2]
+
+
+def test_exec_request_clamps_the_retry_after(requests_mock, mocker):
+    sleep = mocker.patch("mr_apollo_2n.utils.request_session_utils.time.sleep")
+    url = "http://example.com/sitemap.xml"
+    requests_mock.get(
+        url,
+        [
+            {"status_code": 503, "headers": {"Retry-After": "1e12"}},
+            {"status_code": 503, "headers": {"Retry-After": "inf"}},
+            {"text": "Success"},
+        ],
+    )
+    rate_limiter = Mock()
+    session = RequestSession(
+        retry_policy=RetryPolicy(max_tries=3, jitter=False, max_retry_after=30),
+        rate_limiter=rate_limiter,
+    )
+
+    assert session.exec_request(url) == "Success"
+    assert [call[0][0] for call in sleep.call_args_list] == [30, 2]
+    assert [call[0][3] for call in rate_limiter.record.call_args_list] == [
+        30,
+        None,
+        None,
+    ]
+
+
+def test_exec_request_fatal_status_is_not_retried(requests_mock):
+    url = "http://example.com/missing.xml"
+    requests_mock.get(url, status_code=404)
+    session = RequestSession(retry_tries=3)
+
+    with pytest.raises(HTTPError):
+        session.exec_request(url)
+    assert requests_mock.call_count == 1
+
+
+def test_retry_supported_codes_are_stored():
+    session = RequestSession(retry_supported_codes=[404])
+    assert session.retry_supported_codes == [404]
+    assert session.retry_policy.is_retryable_status(404)
+    assert not session.retry_policy.is_retryable_status(503)
+
+
+def test_metrics_record_requests_and_retries(requests_mock, mocker):
+    mocker.patch("mr_apollo_2n.utils.request_session_utils.time.sleep")
+    url = "http://example.com/sitemap.xml"
+    requests_mock.get(url, [{"status_code": 503}, {"content": b"0123456789"}])
+    metrics = MetricsRegistry()
+    session = RequestSession(
+        retry_policy=RetryPolicy(max_tries=2, jitter=False), metrics=metrics
+    )
+
+    assert b"".join(session.exec_stream_request(url, chunk_size=4)) == b"0123456789"
+    assert metrics.get("requests_total", status=503) == 1
+    assert metrics.get("requests_total", status=200) == 1
+    assert metrics.get("request_retries_total") == 1
+    assert metrics.get("response_bytes_total") == 10
+    assert metrics.histogram("request_seconds").count == 2
+    assert metrics.histogram("transfer_seconds").count == 1
+
+
+def test_fetch_many(requests_mock):
+    for i in range(20):
+        requests_mock.get(f"http://example.com/{i}.xml", text=f"body {i}")
+    requests_mock.get("http://example.com/missing.xml", status_code=404)
+    session = RequestSession(pool_maxsize=4)
+
+    urls = [f"http://example.com/{i}.xml" for i in range(20)]
+    results = dict(session.fetch_many(iter(urls + ["http://example.com/missing.xml"])))
+    assert len(results) == 21
+    assert all(results[url] == f"body {i}" for i, url in enumerate(urls))
+    assert isinstance(results["http://example.com/missing.xml"], HTTPError)
+
+
+def test_fetch_many_caps_the_threads_at_the_pool_size(mocker):
+    session = RequestSession(pool_maxsize=4)
+    session.exec_request = Mock(return_value="body")
+    executor = mocker.patch(
+        "mr_apollo_2n.utils.request_session_utils.ThreadPoolExecutor",
+        wraps=ThreadPoolExecutor,
+    )
+    assert len(dict(session.fetch_many(["http://example.com"], max_workers=16))) == 1
+    assert executor.call_args.kwargs["max_workers"] == 4
+    assert session.session.get_adapter("https://example.com")._pool_maxsize == 4
+
+
+def test_session_uses_pooled_adapter_and_timeout():
+    session = RequestSession(timeout=5, pool_maxsize=32)
+    adapter = session.session.get_adapter("https://example.com")
+    assert adapter._pool_maxsize == 32
+    session.session.request = Mock(return_value=Mock(status_code=200))
+    session.exec_request("https://example.com")
+    assert session.session.request.call_args.kwargs["timeout"] == 5
@@ -0,0 +1,42 @@
+import os
+
+from mr_apollo_2n.utils.response_cache import ResponseCache
+
+
+def test_store_and_read(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.store("https://example.com/sitemap.xml", b"<urlset/>", {"ETag": '"v1"'})
+
+    assert cache.conditional_headers("https://example.com/sitemap.xml") == {
+        "If-None-Match": '"v1"'
+    }
+    assert cache.read_text("https://example.com/sitemap.xml") == "<urlset/>"
+    # The entries are loaded again from disk
+    assert ResponseCache(str(tmp_path)).get("https://example.com/sitemap.xml")
+
+
+def test_responses_without_validators_are_not_stored(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.store("https://example.com/robots.txt", b"Sitemap: x", {})
+    assert cache.get("https://example.com/robots.txt") is None
+    assert cache.conditional_headers("https://example.com/robots.txt") == {}
+
+
+def test_evict_by_size(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_size_bytes=10)
+    headers = {"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    cache.store("https://example.com/1.xml", b"123456", headers)
+    cache.store("https://example.com/2.xml", b"123456", headers)
+
+    assert cache.get("https://example.com/1.xml") is None
+    assert cache.get("https://example.com/2.xml") is not None
+    assert cache.total_size == 6
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_evict_by_age(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_age=60)
+    cache.store("https://example.com/1.xml", b"1", {"ETag": '"v1"'})
+    cache.get("https://example.com/1.xml")["validated_at"] -= 120
+    cache.evict()
+    assert cache.get("https://example.com/1.xml") is None
@@ -0,0 +1,28 @@
+from mr_apollo_2n.utils.retry_policy import RetryPolicy
+
+
+def test_exponential_backoff_is_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=False)
+    assert [policy.compute_delay(retry) for retry in range(1, 5)] == [1, 2, 4, 5]
+
+
+def test_jitter_stays_under_backoff():
+    policy = RetryPolicy(base_delay=2.0, max_delay=60.0)
+    delays = [policy.compute_delay(3) for _ in range(100)]
+    assert all(0 <= delay <= 8.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_retry_after_is_honoured_up_to_a_cap():
+    policy = RetryPolicy(base_delay=1.0, jitter=False, max_retry_after=30)
+    assert policy.compute_delay(1, retry_after=10) == 10
+    assert policy.compute_delay(1, retry_after=3600) == 30
+    assert (
+        RetryPolicy(jitter=False, respect_retry_after=False).compute_delay(1, 10) == 1
+    )
+
+
+def test_retryable_status_codes():
+    assert RetryPolicy().is_retryable_status(429)
+    assert not RetryPolicy().is_retryable_status(404)
+    assert RetryPolicy(retryable_status_codes=[404]).is_retryable_status(404)
@@ -0,0 +1,73 @@
+from mr_apollo_2n.utils.robots_txt import RobotsTxt
+
+ROBOTS_TXT = """
+# Comment
+User-agent: *
+Disallow: /private/
+Allow: /private/public/
+Disallow: /*.pdf$
+Disallow: /search?
+Crawl-delay: 5
+
+User-agent: MrApollo
+User-agent: other-bot
+Disallow: /
+Allow: /blog/
+Crawl-delay: 1
+
+Sitemap:https://example.com/sitemap.xml
+sitemap: https://example.com/news.xml # News
+"""
+
+
+def test_sitemaps_and_crawl_delay():
+    robots_txt = RobotsTxt(ROBOTS_TXT)
+    assert robots_txt.sitemaps == [
+        "https://example.com/sitemap.xml",
+        "https://example.com/news.xml",
+    ]
+    assert robots_txt.crawl_delay == 5
+
+
+def test_longest_match_wins():
+    robots_txt = RobotsTxt(ROBOTS_TXT)
+    assert robots_txt.can_fetch("https://example.com/")
+    assert not robots_txt.can_fetch("https://example.com/private/data")
+    assert robots_txt.can_fetch("https://example.com/private/public/data")
+    assert not robots_txt.can_fetch("https://example.com/docs/file.pdf")
+    assert robots_txt.can_fetch("https://example.com/docs/file.pdf?download=1")
+    assert not robots_txt.can_fetch("https://example.com/search?q=apollo")
+    assert robots_txt.can_fetch("https://example.com/search")
+    assert robots_txt.can_fetch("/robots.txt")
+
+
+def test_allow_wins_ties():
+    robots_txt = RobotsTxt("User-agent: *\nDisallow: /page\nAllow: /page\n")
+    assert robots_txt.can_fetch("https://example.com/page")
+
+
+def test_user_agent_group():
+    robots_txt = RobotsTxt(ROBOTS_TXT, user_agent="MrApollo")
+    assert robots_txt.crawl_delay == 1
+    assert robots_txt.can_fetch("https://example.com/blog/post")
+    assert not robots_txt.can_fetch("https://example.com/private/public/data")
+
+
+def test_empty_rules_allow_all():
+    robots_txt = RobotsTxt("User-agent: *\nDisallow:\n")
+    assert robots_txt.can_fetch("https://example.com/anything")
+    assert RobotsTxt("").crawl_delay is None
+
+
+def test_filter():
+    robots_txt = RobotsTxt(ROBOTS_TXT)
+    urls = [
+        "https://example.com/a",
+        "https://example.com/private/b",
+        "https://example.com/c.pdf",
+        "https://example.com/private/public/d#top",
+    ]
+    assert list(robots_txt.filter(urls)) == [
+        "https://example.com/a",
+        "https://example.com/private/public/d#top",
+    ]
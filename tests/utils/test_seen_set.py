@@ -0,0 +1,35 @@
+import pytest
+
+from mr_apollo_2n.utils.seen_set import BloomFilter, SeenSet, make_seen_set
+
+
+def test_seen_set_normalizes_urls():
+    seen = SeenSet()
+    assert seen.add("https://Example.com/page")
+    assert not seen.add("https://example.com:443/page#top")
+    assert "HTTPS://example.com/page" in seen
+    assert len(seen) == 1
+
+
+def test_bloom_filter_never_forgets():
+    seen = BloomFilter(capacity=1000, error_rate=0.01)
+    urls = [f"https://example.com/{i}" for i in range(1000)]
+    assert sum(seen.add(url) for url in urls) >= 990
+    assert all(url in seen for url in urls)
+    assert not any(seen.add(url) for url in urls)
+
+
+def test_bloom_filter_false_positive_rate():
+    seen = BloomFilter(capacity=10000, error_rate=0.01)
+    for i in range(10000):
+        seen.add(f"https://example.com/{i}")
+    false_positives = sum(f"https://example.org/{i}" in seen for i in range(10000))
+    assert false_positives < 300
+
+
+def test_make_seen_set():
+    assert make_seen_set(None) is None
+    assert type(make_seen_set("exact")) is SeenSet
+    assert isinstance(make_seen_set("bloom", capacity=100), BloomFilter)
+    with pytest.raises(ValueError):
+        make_seen_set("fuzzy")
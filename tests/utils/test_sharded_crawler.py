@@ -0,0 +1,220 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.node_sinks import JsonlNodeSink
+from mr_apollo_2n.utils.sharded_crawler import (ShardedCrawler, WorkQueue,
+                                                run_worker)
+
+HOME_URL = "https://example.com"
+INDEX = (
+    "<sitemapindex>"
+    "<sitemap><loc>https://example.com/a.xml</loc></sitemap>"
+    "<sitemap><loc>https://example.com/b.xml</loc></sitemap>"
+    "<sitemap><loc>https://example.com/a.xml</loc></sitemap>"
+    "</sitemapindex>"
+)
+
+
+def urlset(*paths):
+    entries = "".join(f"<url><loc>https://example.com{p}</loc></url>" for p in paths)
+    return f"<urlset>{entries}</urlset>"
+
+
+@pytest.fixture
+def site(requests_mock):
+    requests_mock.get(f"{HOME_URL}/robots.txt", text="User-agent: *\nDisallow:\n")
+    requests_mock.get(f"{HOME_URL}/sitemap.xml", text=INDEX)
+    requests_mock.get(f"{HOME_URL}/a.xml", text=urlset("/a1", "/a2"))
+    requests_mock.get(f"{HOME_URL}/b.xml", text=urlset("/b1"))
+    return requests_mock
+
+
+def node(loc):
+    return WebsiteNodeModel(loc, f"{HOME_URL}/a.xml", "URL", {}, {})
+
+
+def test_claim_and_complete(tmp_path):
+    with WorkQueue(str(tmp_path / "queue.db")) as work_queue:
+        assert work_queue.add([(f"{HOME_URL}/a.xml", "", None)]) == 1
+        assert work_queue.add([(f"{HOME_URL}/a.xml", "", None)]) == 0
+
+        item = work_queue.claim("w1")
+        assert item == (f"{HOME_URL}/a.xml", "", None)
+        assert work_queue.claim("w2") is None
+        assert not work_queue.is_finished()
+
+        child = (f"{HOME_URL}/c.xml", f"{HOME_URL}/a.xml", None)
+        assert work_queue.complete(item[0], "w1", [node(f"{HOME_URL}/a1")], [child])
+        assert work_queue.counts() == {
+            "pending": 1,
+            "claimed": 0,
+            "done": 1,
+            "failed": 0,
+        }
+        assert work_queue.claim("w2") == child
+        assert work_queue.complete(child[0], "w2", [node(f"{HOME_URL}/c1")])
+        assert work_queue.is_finished()
+        assert [n.loc for n in work_queue.iter_nodes()] == [
+            f"{HOME_URL}/a1",
+            f"{HOME_URL}/c1",
+        ]
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    with WorkQueue(str(tmp_path / "queue.db")) as work_queue:
+        work_queue.add([(f"{HOME_URL}/a.xml", "", None)])
+        assert work_queue.claim("w1", lease=600) is not None
+        assert work_queue.claim("w2", lease=600) is None
+        assert work_queue.claim("w2", lease=-1) is not None
+
+        # The late completion of the first worker is discarded
+        assert not work_queue.complete(f"{HOME_URL}/a.xml", "w1", [node("x")])
+        assert work_queue.complete(f"{HOME_URL}/a.xml", "w2", [node("y")])
+        assert [n.loc for n in work_queue.iter_nodes()] == ["y"]
+
+
+def test_fail_retries_then_gives_up(tmp_path):
+    with WorkQueue(str(tmp_path / "queue.db")) as work_queue:
+        work_queue.add([(f"{HOME_URL}/a.xml", "", None)])
+        work_queue.claim("w1")
+        work_queue.fail(f"{HOME_URL}/a.xml", "w1", "timeout", max_attempts=2)
+        assert work_queue.counts()["pending"] == 1
+        work_queue.claim("w1")
+        work_queue.fail(f"{HOME_URL}/a.xml", "w1", "timeout", max_attempts=2)
+        assert work_queue.counts()["failed"] == 1
+        assert work_queue.is_finished()
+
+
+def test_run_worker(site, tmp_path):
+    queue_path = str(tmp_path / "queue.db")
+    with WorkQueue(queue_path) as work_queue:
+        work_queue.add([(f"{HOME_URL}/sitemap.xml", "", None)])
+
+    completed = run_worker(queue_path, HOME_URL, {"sleep_time": 0}, worker_id="w1")
+
+    assert completed == 3
+    with WorkQueue(queue_path) as work_queue:
+        assert work_queue.counts()["done"] == 3
+        nodes = list(work_queue.iter_nodes())
+    assert [(n.loc, n.element_type) for n in nodes] == [
+        (f"{HOME_URL}/a.xml", "SITEMAP"),
+        (f"{HOME_URL}/a1", "URL"),
+        (f"{HOME_URL}/a2", "URL"),
+        (f"{HOME_URL}/b.xml", "SITEMAP"),
+        (f"{HOME_URL}/b1", "URL"),
+    ]
+    assert site.call_count == 4
+
+
+def test_run_worker_records_failures(site, tmp_path):
+    site.get(f"{HOME_URL}/b.xml", status_code=500)
+    queue_path = str(tmp_path / "queue.db")
+    with WorkQueue(queue_path) as work_queue:
+        work_queue.add([(f"{HOME_URL}/sitemap.xml", "", None)])
+
+    run_worker(queue_path, HOME_URL, {"sleep_time": 0}, max_attempts=1)
+
+    with WorkQueue(queue_path) as work_queue:
+        assert work_queue.counts() == {
+            "pending": 0,
+            "claimed": 0,
+            "done": 2,
+            "failed": 1,
+        }
+
+
+def test_run_worker_rejects_checkpoints(tmp_path):
+    with pytest.raises(ValueError):
+        run_worker(str(tmp_path / "queue.db"), HOME_URL, {"checkpoint_path": "x"})
+
+
+class SitemapTreeHandler(BaseHTTPRequestHandler):
+    requested = []
+
+    def do_GET(self):
+        self.requested.append(self.path)
+        host = self.headers["Host"]
+        if self.path == "/robots.txt":
+            body = f"Sitemap: http://{host}/index.xml\n"
+        elif self.path == "/index.xml":
+            body = "<sitemapindex>" + "".join(
+                f"<sitemap><loc>http://{host}/s{i}.xml</loc></sitemap>"
+                for i in range(6)
+            )
+            body += "</sitemapindex>"
+        elif self.path.startswith("/s"):
+            name = self.path[1:-4]
+            body = "<urlset>" + "".join(
+                f"<url><loc>http://{host}/{name}/{i}</loc></url>" for i in range(3)
+            )
+            body += "</urlset>"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_port():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SitemapTreeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_sharded_crawler(server_port, tmp_path):
+    home_url = f"http://127.0.0.1:{server_port}/"
+    crawler = ShardedCrawler(
+        home_url,
+        str(tmp_path / "queue.db"),
+        num_workers=3,
+        crawler_kwargs={"sleep_time": 0},
+        poll_interval=0.05,
+    )
+
+    counts = crawler.run()
+
+    assert counts == {"pending": 0, "claimed": 0, "done": 7, "failed": 0}
+    locs = [node.loc for node in crawler.iter_nodes()]
+    assert len(locs) == 6 + 6 * 3
+    assert len(set(locs)) == len(locs)
+
+    output = str(tmp_path / "nodes.jsonl")
+    with JsonlNodeSink(output) as sink:
+        assert crawler.export_nodes(sink) == len(locs)
+    with open(output) as file:
+        assert [json.loads(line)["loc"] for line in file] == locs
+
+
+def test_sharded_crawler_starts_a_new_crawl(server_port, tmp_path):
+    crawler = ShardedCrawler(
+        f"http://127.0.0.1:{server_port}/",
+        str(tmp_path / "queue.db"),
+        num_workers=2,
+        crawler_kwargs={"sleep_time": 0},
+        poll_interval=0.05,
+    )
+    crawler.run()
+    total_nodes = len(list(crawler.iter_nodes()))
+
+    SitemapTreeHandler.requested.clear()
+    assert crawler.run()["done"] == 7
+    assert "/index.xml" in SitemapTreeHandler.requested
+    assert len(list(crawler.iter_nodes())) == total_nodes
+
+    # A finished crawl is not crawled again when resumed
+    SitemapTreeHandler.requested.clear()
+    assert crawler.run(resume=True)["done"] == 7
+    assert "/index.xml" not in SitemapTreeHandler.requested
@@ -0,0 +1,76 @@
+from mr_apollo_2n.utils.sitemap_state import SitemapState
+
+
+def test_is_unchanged(tmp_path):
+    state = SitemapState(str(tmp_path / "state.json"))
+    state.update("https://example.com/sitemap.xml", "", None, "hash0")
+    state.update(
+        "https://example.com/child.xml",
+        "https://example.com/sitemap.xml",
+        "2023-01-01",
+        "hash1",
+    )
+    state.save()
+
+    state = SitemapState(str(tmp_path / "state.json"))
+    assert state.is_unchanged("https://example.com/child.xml", "2023-01-01")
+    assert not state.is_unchanged("https://example.com/child.xml", "2023-02-01")
+    assert not state.is_unchanged("https://example.com/child.xml", None)
+    assert not state.is_unchanged("https://example.com/other.xml", "2023-01-01")
+
+
+def test_save_drops_sitemaps_no_longer_listed(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = SitemapState(path)
+    state.update("https://example.com/sitemap.xml", "", None, "h")
+    state.update(
+        "https://example.com/a.xml", "https://example.com/sitemap.xml", "1", "h"
+    )
+    state.update("https://example.com/a-1.xml", "https://example.com/a.xml", "1", "h")
+    state.update(
+        "https://example.com/b.xml", "https://example.com/sitemap.xml", "1", "h"
+    )
+    state.save()
+
+    # b.xml is no longer listed
+    state = SitemapState(path)
+    state.update("https://example.com/sitemap.xml", "", None, "h2")
+    state.update(
+        "https://example.com/a.xml", "https://example.com/sitemap.xml", "1", "h"
+    )
+    state.update("https://example.com/a-1.xml", "https://example.com/a.xml", "1", "h")
+    state.save()
+
+    assert set(SitemapState(path).sitemaps) == {
+        "https://example.com/sitemap.xml",
+        "https://example.com/a.xml",
+        "https://example.com/a-1.xml",
+    }
+    assert state.sitemaps["https://example.com/sitemap.xml"]["content_changed"]
+
+
+def test_entries_are_committed_by_save(tmp_path):
+    path = str(tmp_path / "state.json")
+    entries = [("URL", '{"loc": "https://example.com/a"}')]
+    state = SitemapState(path)
+    state.update("https://example.com/sitemap.xml", "", None, "h", entries)
+    state.close()
+
+    # Not saved
+    state = SitemapState(path)
+    assert not state.has_entries("https://example.com/sitemap.xml")
+    state.update("https://example.com/sitemap.xml", "", None, "h", entries)
+    state.update("https://example.com/old.xml", "", None, "h", entries)
+    state.save()
+    state.close()
+
+    state = SitemapState(path)
+    assert state.is_content_unchanged("https://example.com/sitemap.xml", "h")
+    assert list(state.iter_entries("https://example.com/sitemap.xml")) == [
+        ("URL", {"loc": "https://example.com/a"})
+    ]
+    # old.xml is a root not crawled this time, kept until it is dropped
+    state.sitemaps.pop("https://example.com/old.xml")
+    state.save()
+    assert not state.has_entries("https://example.com/old.xml")
+    state.close()
@@ -1,8 +1,11 @@
+import gzip
 from xml.etree.ElementTree import Element
 
 import pytest
 
 from mr_apollo_2n.model.website_node_model import WebsiteNodeModel
+from mr_apollo_2n.utils.metrics import MetricsRegistry
+from mr_apollo_2n.utils.node_sinks import JsonlNodeSink
 from mr_apollo_2n.utils.website_node_crawler import WebsiteNodeCrawler
 
 
@@ -37,3 +40,426 @@ def test_process_sitemap(website_node_crawler, requests_mock):
     result = website_node_crawler.process_sitemap("https://example.com/sitemap.xml")
     assert len(result) > 0
     assert all(isinstance(item, WebsiteNodeModel) for item in result)
+
+
+def test_iter_sitemap_entries_streams_entries(requests_mock):
+    crawler = WebsiteNodeCrawler("https://example.com", stream_chunk_size=16)
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            "<url><loc>https://example.com/a</loc><priority>0.5</priority></url>"
+            "<sitemap><loc>https://example.com/child.xml</loc></sitemap>"
+            "<url><loc>https://example.com/b</loc></url>"
+            "</urlset>"
+        ),
+    )
+    entries = list(crawler.iter_sitemap_entries("https://example.com/sitemap.xml"))
+    assert entries == [
+        ("URL", {"loc": "https://example.com/a", "priority": "0.5"}),
+        ("SITEMAP", {"loc": "https://example.com/child.xml"}),
+        ("URL", {"loc": "https://example.com/b"}),
+    ]
+
+
+def test_iter_nodes_yields_bfs_order(requests_mock):
+    crawler = WebsiteNodeCrawler("https://example.com", sleep_time=0)
+    requests_mock.get(
+        "https://example.com/robots.txt",
+        text="Sitemap: https://example.com/sitemap.xml\n",
+    )
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/child.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    requests_mock.get(
+        "https://example.com/child.xml",
+        text="<urlset><url><loc>https://example.com/page</loc></url></urlset>",
+    )
+
+    nodes = crawler.iter_nodes()
+    first = next(nodes)
+    # The child sitemap is yielded once it is fetched, before its entries
+    assert requests_mock.call_count == 3
+    assert (first.loc, first.element_type) == (
+        "https://example.com/child.xml",
+        "SITEMAP",
+    )
+
+    second = next(nodes)
+    assert (second.loc, second.parent) == (
+        "https://example.com/page",
+        "https://example.com/child.xml",
+    )
+    assert list(nodes) == []
+
+
+def test_failed_child_sitemaps_are_skipped(requests_mock):
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/missing.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/broken.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/child.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    requests_mock.get("https://example.com/missing.xml", status_code=404)
+    requests_mock.get(
+        "https://example.com/broken.xml",
+        text="<urlset><url><loc>https://example.com/a</loc></url><url>",
+    )
+    requests_mock.get(
+        "https://example.com/child.xml",
+        text="<urlset><url><loc>https://example.com/b</loc></url></urlset>",
+    )
+    metrics = MetricsRegistry()
+    crawler = WebsiteNodeCrawler("https://example.com", sleep_time=0, metrics=metrics)
+
+    nodes = crawler.process_sitemap("https://example.com/sitemap.xml")
+
+    # The entries parsed before the error are kept
+    assert [node.loc for node in nodes] == [
+        "https://example.com/broken.xml",
+        "https://example.com/a",
+        "https://example.com/child.xml",
+        "https://example.com/b",
+    ]
+    assert metrics.get("failed_sitemap_pages_total") == 2
+    assert metrics.get("sitemap_pages_total") == 2
+
+
+def test_export_nodes(website_node_crawler, requests_mock, tmp_path):
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<urlset>"
+            "<url><loc>https://example.com/a</loc></url>"
+            "<url><loc>https://example.com/b</loc></url>"
+            "</urlset>"
+        ),
+    )
+    path = tmp_path / "nodes.jsonl"
+    with JsonlNodeSink(str(path), batch_size=1) as sink:
+        total = website_node_crawler.export_nodes(
+            sink, "https://example.com/sitemap.xml"
+        )
+    assert total == 2
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_gzip_sitemap(website_node_crawler, requests_mock):
+    content = b"<urlset><url><loc>https://example.com/page</loc></url></urlset>"
+    requests_mock.get(
+        "https://example.com/sitemap-1.xml.gz", content=gzip.compress(content)
+    )
+    root = website_node_crawler.fetch_and_parse("https://example.com/sitemap-1.xml.gz")
+    assert root.tag == "urlset"
+    entries = list(
+        website_node_crawler.iter_sitemap_entries(
+            "https://example.com/sitemap-1.xml.gz"
+        )
+    )
+    assert entries == [("URL", {"loc": "https://example.com/page"})]
+
+
+def test_incremental_crawl_skips_unchanged_sitemaps(requests_mock, tmp_path):
+    state_path = str(tmp_path / "state.json")
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/a.xml</loc>"
+            "<lastmod>2023-01-01</lastmod></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    child = requests_mock.get(
+        "https://example.com/a.xml",
+        text="<urlset><url><loc>https://example.com/page</loc></url></urlset>",
+    )
+
+    first = WebsiteNodeCrawler(
+        "https://example.com", sleep_time=0, state_path=state_path
+    )
+    assert len(first.process_sitemap("https://example.com/sitemap.xml")) == 2
+
+    second = WebsiteNodeCrawler(
+        "https://example.com", sleep_time=0, state_path=state_path
+    )
+    nodes = second.process_sitemap("https://example.com/sitemap.xml")
+    assert child.call_count == 1
+    assert [(node.loc, node.meta.get("unchanged")) for node in nodes] == [
+        ("https://example.com/a.xml", True),
+        ("https://example.com/page", True),
+    ]
+    assert nodes[1].parent == "https://example.com/a.xml"
+
+
+def test_incremental_crawl_skips_identical_content(requests_mock, tmp_path):
+    state_path = str(tmp_path / "state.json")
+    index = requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/a.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    child = requests_mock.get(
+        "https://example.com/a.xml",
+        text="<urlset><url><loc>https://example.com/page</loc></url></urlset>",
+    )
+
+    def crawl():
+        crawler = WebsiteNodeCrawler(
+            "https://example.com", sleep_time=0, state_path=state_path
+        )
+        nodes = crawler.process_sitemap("https://example.com/sitemap.xml")
+        return [(node.loc, node.meta.get("unchanged", False)) for node in nodes]
+
+    assert crawl() == [
+        ("https://example.com/a.xml", False),
+        ("https://example.com/page", False),
+    ]
+    # Without lastmod the child is fetched again, but not parsed
+    assert crawl() == [
+        ("https://example.com/a.xml", True),
+        ("https://example.com/page", True),
+    ]
+    assert (index.call_count, child.call_count) == (2, 2)
+
+    requests_mock.get(
+        "https://example.com/a.xml",
+        text="<urlset><url><loc>https://example.com/other</loc></url></urlset>",
+    )
+    assert crawl() == [
+        ("https://example.com/a.xml", False),
+        ("https://example.com/other", False),
+    ]
+
+
+def test_extract_sitemaps_sets_crawl_delay(requests_mock):
+    crawler = WebsiteNodeCrawler("https://example.com", sleep_time=1)
+    requests_mock.get(
+        "https://example.com/robots.txt",
+        text=(
+            "User-agent: other\nCrawl-delay: 1\n\n"
+            "User-agent: *\nCrawl-delay: 20\n"
+            "Sitemap: https://example.com/sitemap.xml\n"
+        ),
+    )
+    crawler.extract_sitemaps()
+    assert crawler.rate_limiter.rate("https://example.com") == pytest.approx(0.05)
+
+
+def test_nodes_of_a_sitemap_share_meta(website_node_crawler, requests_mock):
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<urlset>"
+            "<url><loc>https://example.com/a</loc></url>"
+            "<url><loc>https://example.com/b</loc></url>"
+            "</urlset>"
+        ),
+    )
+    first, second = website_node_crawler.iter_nodes("https://example.com/sitemap.xml")
+    assert first.meta is second.meta
+    assert first.meta["processed_by"] == website_node_crawler.processed_by
+
+
+def test_collect_node_batch(website_node_crawler, requests_mock):
+    pytest.importorskip("numpy")
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<urlset>"
+            "<url><loc>https://example.com/a</loc><priority>0.5</priority></url>"
+            "<url><loc>https://example.com/b</loc></url>"
+            "</urlset>"
+        ),
+    )
+    batch = website_node_crawler.collect_node_batch("https://example.com/sitemap.xml")
+    assert len(batch) == 2
+    assert batch.count_by_domain() == {"example.com": 2}
+
+
+def test_cyclic_sitemap_index_is_walked_once(website_node_crawler, requests_mock):
+    index = requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/sitemap.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/sitemap-1.xml</loc></sitemap>"
+            "<sitemap><loc>https://EXAMPLE.com/sitemap-1.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    child = requests_mock.get(
+        "https://example.com/sitemap-1.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/sitemap.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    nodes = website_node_crawler.process_sitemap("https://example.com/sitemap.xml")
+    assert [node.loc for node in nodes] == ["https://example.com/sitemap-1.xml"]
+    assert index.call_count == 1
+    assert child.call_count == 1
+
+
+@pytest.mark.parametrize("dedupe_urls", [None, "exact", "bloom"])
+def test_dedupe_urls_across_sitemaps(requests_mock, dedupe_urls):
+    requests_mock.get(
+        "https://example.com/robots.txt",
+        text=(
+            "Sitemap: https://example.com/sitemap-1.xml\n"
+            "Sitemap: https://example.com/sitemap-2.xml\n"
+            "Sitemap: https://example.com/sitemap-1.xml\n"
+        ),
+    )
+    for i in (1, 2):
+        requests_mock.get(
+            f"https://example.com/sitemap-{i}.xml",
+            text=(
+                "<urlset>"
+                "<url><loc>https://example.com/shared</loc></url>"
+                f"<url><loc>https://example.com/{i}</loc></url>"
+                "</urlset>"
+            ),
+        )
+    crawler = WebsiteNodeCrawler(
+        "https://example.com", sleep_time=0, dedupe_urls=dedupe_urls
+    )
+    locs = [node.loc for node in crawler.process_all_sitemaps()]
+    if dedupe_urls is None:
+        assert len(locs) == 4
+    else:
+        assert locs == [
+            "https://example.com/shared",
+            "https://example.com/1",
+            "https://example.com/2",
+        ]
+    assert requests_mock.call_count == 3
+
+
+def test_unknown_dedupe_mode():
+    with pytest.raises(ValueError):
+        WebsiteNodeCrawler("https://example.com", dedupe_urls="fuzzy")
+
+
+def test_crawl_metrics(requests_mock, tmp_path):
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<urlset>"
+            "<url><loc>https://example.com/a</loc></url>"
+            "<url><loc>https://example.com/b</loc></url>"
+            "</urlset>"
+        ),
+    )
+    metrics = MetricsRegistry()
+    crawler = WebsiteNodeCrawler("https://example.com", sleep_time=0, metrics=metrics)
+    crawler.process_sitemap("https://example.com/sitemap.xml")
+    assert metrics.get("requests_total", status=200) == 1
+    assert metrics.get("response_bytes_total") > 0
+    assert metrics.get("sitemap_entries_total") == 2
+    assert metrics.get("nodes_total", element_type="URL") == 2
+    assert metrics.histogram("parse_seconds").count == 1
+    assert metrics.histogram("process_sitemap_seconds").count == 1
+    assert metrics.get("nodes_per_second") > 0
+
+    # The streaming entry points record the crawl timing too
+    metrics = MetricsRegistry()
+    crawler = WebsiteNodeCrawler("https://example.com", sleep_time=0, metrics=metrics)
+    with JsonlNodeSink(str(tmp_path / "nodes.jsonl")) as sink:
+        crawler.export_nodes(sink, "https://example.com/sitemap.xml")
+    assert metrics.histogram("process_sitemap_seconds").count == 1
+    assert metrics.get("nodes_per_second") > 0
+
+
+def test_respect_robots_txt(requests_mock):
+    robots = requests_mock.get(
+        "https://example.com/robots.txt",
+        text="User-agent: *\nDisallow: /private\nSitemap:https://example.com/sitemap.xml\n",
+    )
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/private.xml</loc></sitemap>"
+            "<sitemap><loc>https://example.com/public.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    requests_mock.get(
+        "https://example.com/public.xml",
+        text=(
+            "<urlset>"
+            "<url><loc>https://example.com/a</loc></url>"
+            "<url><loc>https://example.com/private/b</loc></url>"
+            "</urlset>"
+        ),
+    )
+    crawler = WebsiteNodeCrawler(
+        "https://example.com", sleep_time=0, respect_robots_txt=True
+    )
+    nodes = crawler.process_all_sitemaps()
+    assert [node.loc for node in nodes] == [
+        "https://example.com/public.xml",
+        "https://example.com/a",
+    ]
+    assert robots.call_count == 1
+
+
+class SingleSitemapFrontier:
+    def __init__(self, item):
+        self.items = [item]
+        self.children = []
+        self.completed = []
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def popleft(self):
+        return self.items.pop()
+
+    def append(self, item):
+        self.children.append(item)
+
+    def complete(self, loc, nodes):
+        self.completed.append((loc, [node.loc for node in nodes]))
+
+    def rollback(self):
+        self.children = []
+
+
+def test_iter_sitemap_nodes_with_a_frontier(requests_mock):
+    requests_mock.get(
+        "https://example.com/sitemap.xml",
+        text=(
+            "<sitemapindex>"
+            "<sitemap><loc>https://example.com/child.xml</loc></sitemap>"
+            "</sitemapindex>"
+        ),
+    )
+    frontier = SingleSitemapFrontier(("https://example.com/sitemap.xml", "", None))
+    crawler = WebsiteNodeCrawler("https://example.com", sleep_time=0)
+
+    nodes = list(
+        crawler.iter_sitemap_nodes("https://example.com/sitemap.xml", frontier)
+    )
+
+    # The child sitemap is handed to the frontier, which does not crawl it
+    assert nodes == []
+    assert frontier.children == [
+        ("https://example.com/child.xml", "https://example.com/sitemap.xml", None)
+    ]
+    assert frontier.completed == [("https://example.com/sitemap.xml", [])]
+    assert requests_mock.call_count == 1